@@ -1,18 +1,28 @@
 # -*- coding: utf-8 -*-
 import discord
 import asyncio
-import json
 import os
 import datetime
-import requests
 import random
 import aiohttp
 import io
-import sqlite3
 from discord import Game, Embed
 from discord.ext import commands
 from discord.ui import Button, View
 from collections import defaultdict, deque
+from ia_cliente import cliente_ia
+from persistencia import ArmazemSistemas
+from banco import BancoAssincrono
+from agendador import Agendador, interpretar_duracao, formatar_duracao, tratadores_discord
+from automod import CacheFiltros, adicionar_palavras
+from historico import HistoricoConversas
+from prompt import MontadorPrompt
+from cache import CacheRespostas
+from roteador import RoteadorIA, provedores_padrao
+from restauracao import RestauradorServidor, normalizar_backup, resumir, resumir_plano, canal_resumo
+from snapshots import ArmazemSnapshots
+from extrato import Extrato
+from armazenamento import abrir, RepositorioEconomia
 
 # CONFIGURAÇÃO DO VILÃO
 with open('.env', 'r') as f:
@@ -26,7 +36,15 @@ DISCORD_TOKEN = env_vars.get('DISCORD_TOKEN')
 DEEPSEEK_API_KEY = env_vars.get('DEEPSEEK_API_KEY')
 
 intents = discord.Intents.all()
-bot = commands.Bot(command_prefix='!', intents=intents)
+
+class BotPrefixo(commands.Bot):
+    async def close(self):
+        """Fecha o agendador e a sessão HTTP da IA antes de desconectar"""
+        await agendador.fechar()
+        await cliente_ia.fechar()
+        await super().close()
+
+bot = BotPrefixo(command_prefix='!', intents=intents)
 
 # SISTEMAS AVANÇADOS
 memory_storage = {}
@@ -46,52 +64,25 @@ reminder_systems = {}
 poll_systems = {}
 
 # BANCO DE DADOS VILÃO
-def init_database():
-    conn = sqlite3.connect('villain_bot.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            user_id TEXT PRIMARY KEY,
-            level INTEGER DEFAULT 1,
-            xp INTEGER DEFAULT 0,
-            coins INTEGER DEFAULT 1000,
-            warnings INTEGER DEFAULT 0,
-            profile_data TEXT
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS moderation (
-            case_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT,
-            mod_id TEXT,
-            action TEXT,
-            reason TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS economy (
-            user_id TEXT PRIMARY KEY,
-            wallet INTEGER DEFAULT 0,
-            bank INTEGER DEFAULT 0,
-            last_daily DATETIME
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
-
-init_database()
-
-def deepseek_chat(messages, user_id):
-    headers = {
-        'Authorization': f'Bearer {DEEPSEEK_API_KEY}',
-        'Content-Type': 'application/json'
-    }
-    
+# Tabelas do esquema 'villain' (armazenamento.py); BANCO_URL no .env troca o SQLite por um Postgres
+motor = abrir(env_vars.get('BANCO_URL') or 'villain_bot.db', 'villain')
+db = motor.banco if motor.dialeto == 'sqlite' else BancoAssincrono('villain_bot.db')
+# Histórico de economy.wallet (lançamentos + checkpoints), só no SQLite
+economia = RepositorioEconomia(motor, Extrato('economy', 'wallet', ('user_id',)) if motor.dialeto == 'sqlite' else None)
+tarefa_extrato = None
+historico = HistoricoConversas(banco=db, bot='botdc')
+agendador = Agendador(db, bot='botdc')
+for tipo, tratador in tratadores_discord(bot).items():
+    agendador.registrar(tipo, tratador)
+montador_prompt = MontadorPrompt()
+respostas_ia = CacheRespostas()
+# DeepSeek e, com GROK_API_KEY no .env, o Grok como reserva (failover/hedge)
+roteador_ia = RoteadorIA(provedores_padrao(cliente_ia, DEEPSEEK_API_KEY, env_vars.get('GROK_API_KEY')))
+restaurador = RestauradorServidor()
+snapshots = ArmazemSnapshots('backups')
+
+async def deepseek_chat(messages, user_id, canal=None):
+    """Com `canal`, a resposta é transmitida aos poucos e enviada nele"""
     payload = {
         'model': 'deepseek-chat',
         'messages': messages,
@@ -101,56 +92,53 @@ def deepseek_chat(messages, user_id):
     }
     
     try:
-        response = requests.post('https://api.deepseek.com/v1/chat/completions', 
-                               json=payload, headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json()['choices'][0]['message']['content']
-        return "👍"
-    except:
-        return "Entendi!"
-
-def save_systems():
-    data = {
-        'memory': memory_storage,
-        'conversation_history': conversation_history,
-        'welcome_systems': welcome_systems,
-        'auto_moderations': auto_moderations,
-        'reaction_roles': reaction_roles,
-        'ticket_systems': ticket_systems,
-        'level_systems': level_systems,
-        'economy_systems': economy_systems,
-        'mod_logs': mod_logs,
-        'custom_commands': custom_commands,
-        'poll_systems': poll_systems
-    }
-    with open('systems.json', 'w') as f:
-        json.dump(data, f)
+        if canal is None:
+            content = await respostas_ia.obter(
+                respostas_ia.chave(messages),
+                lambda: roteador_ia.completar(payload)
+            )
+        else:
+            content = await roteador_ia.responder(canal, payload, respostas_ia)
+        if content is not None:
+            return content
+        resposta = "👍"
+    except Exception:
+        resposta = "Entendi!"
+    
+    if canal is not None:
+        await canal.send(resposta)
+    return resposta
+
+armazem = ArmazemSistemas('systems.json', {
+    'memory': memory_storage,
+    'conversation_history': conversation_history,
+    'welcome_systems': welcome_systems,
+    'auto_moderations': auto_moderations,
+    'reaction_roles': reaction_roles,
+    'ticket_systems': ticket_systems,
+    'level_systems': level_systems,
+    'economy_systems': economy_systems,
+    'mod_logs': mod_logs,
+    'custom_commands': custom_commands,
+    'poll_systems': poll_systems
+})
+
+filtros_automod = CacheFiltros()
 
 def load_systems():
-    global memory_storage, conversation_history, welcome_systems, auto_moderations
-    global reaction_roles, ticket_systems, level_systems, economy_systems
-    global mod_logs, custom_commands, poll_systems
-    
-    try:
-        with open('systems.json', 'r') as f:
-            data = json.load(f)
-            memory_storage = data.get('memory', {})
-            conversation_history = data.get('conversation_history', {})
-            welcome_systems = data.get('welcome_systems', {})
-            auto_moderations = data.get('auto_moderations', {})
-            reaction_roles = data.get('reaction_roles', {})
-            ticket_systems = data.get('ticket_systems', {})
-            level_systems = data.get('level_systems', {})
-            economy_systems = data.get('economy_systems', {})
-            mod_logs = data.get('mod_logs', {})
-            custom_commands = data.get('custom_commands', {})
-            poll_systems = data.get('poll_systems', {})
-    except:
-        pass
+    armazem.carregar()
+    # Históricos antigos do systems.json passam para o HistoricoConversas (SQLite)
+    for user_id in historico.importar(conversation_history):
+        armazem.marcar('conversation_history', user_id)
 
 @bot.event
 async def on_ready():
+    global tarefa_extrato
     load_systems()
+    armazem.iniciar()
+    agendador.iniciar()
+    if tarefa_extrato is None:
+        tarefa_extrato = asyncio.ensure_future(economia.manter())
     await bot.change_presence(activity=Game(name="!help | Modo Vilão"))
     print(f'BOT VILÃO PROFISSIONAL ATIVADO! {bot.user.name}')
 
@@ -169,40 +157,25 @@ async def on_message(message):
     
     # AUTO MODERAÇÃO
     if guild_id in auto_moderations and auto_moderations[guild_id]['enabled']:
-        content = message.content.lower()
-        if any(word in content for word in auto_moderations[guild_id]['banned_words']):
+        if filtros_automod.filtro(guild_id, auto_moderations[guild_id]).encontrar(message.content):
             await message.delete()
             await message.channel.send(f"{message.author.mention} Mensagem removida por conter palavras proibidas!", delete_after=5)
     
     # RESPOSTA IA
     if bot.user.mentioned_in(message) or isinstance(message.channel, discord.DMChannel):
         user_id = str(message.author.id)
-        if user_id not in conversation_history:
-            conversation_history[user_id] = []
-        
-        user_history = conversation_history[user_id][-6:]
-        
-        messages = [
-            {"role": "system", "content": "Você é um usuário normal. Responda de forma curta, natural e humana. Use até 2 linhas. Sem emojis excessivos."}
-        ]
-        
-        for msg in user_history:
-            role = "user" if msg['author'] == 'user' else "assistant"
-            messages.append({"role": role, "content": msg['content']})
-        
-        messages.append({"role": "user", "content": message.content.replace(f'<@{bot.user.id}>', '').strip()})
-        
-        response = deepseek_chat(messages, user_id)
+        user_history = await historico.recentes(user_id, 6)
         
-        conversation_history[user_id].append({"author": "user", "content": message.content})
-        conversation_history[user_id].append({"author": "bot", "content": response})
-        
-        if len(conversation_history[user_id]) > 30:
-            conversation_history[user_id] = conversation_history[user_id][-30:]
+        messages = montador_prompt.montar(
+            "Você é um usuário normal. Responda de forma curta, natural e humana. Use até 2 linhas. Sem emojis excessivos.",
+            user_history,
+            message.content.replace(f'<@{bot.user.id}>', '').strip()
+        )
         
-        save_systems()
+        # A resposta é enviada aos poucos no canal enquanto a IA escreve
+        response = await deepseek_chat(messages, user_id, message.channel)
         
-        await message.channel.send(response)
+        await historico.adicionar(user_id, message.content, response)
     
     await bot.process_commands(message)
 
@@ -249,6 +222,11 @@ async def clear(ctx, amount: int = 10):
 @commands.has_permissions(manage_roles=True)
 async def mute(ctx, member: discord.Member, duration: str = "30m", *, reason="Sem motivo"):
     """SILENCIAR USUÁRIO"""
+    segundos = interpretar_duracao(duration)
+    if segundos is None:
+        await ctx.send("❌ Duração inválida! Use por exemplo `30m`, `2h` ou `1d`")
+        return
+    
     muted_role = discord.utils.get(ctx.guild.roles, name="Silenciado")
     if not muted_role:
         muted_role = await ctx.guild.create_role(name="Silenciado")
@@ -256,9 +234,10 @@ async def mute(ctx, member: discord.Member, duration: str = "30m", *, reason="Se
             await channel.set_permissions(muted_role, send_messages=False)
     
     await member.add_roles(muted_role, reason=reason)
+    await agendador.agendar(segundos, "desmutar", {"guild_id": ctx.guild.id, "user_id": member.id})
     embed = Embed(title="🔇 Usuário Silenciado", color=0x666666)
     embed.add_field(name="Usuário", value=member.mention, inline=True)
-    embed.add_field(name="Duração", value=duration, inline=True)
+    embed.add_field(name="Duração", value=formatar_duracao(segundos), inline=True)
     embed.add_field(name="Motivo", value=reason, inline=True)
     await ctx.send(embed=embed)
 
@@ -316,7 +295,7 @@ async def reactionrole(ctx, message_id: str, emoji: str, role: discord.Role):
         message = await ctx.channel.fetch_message(int(message_id))
         await message.add_reaction(emoji)
         reaction_roles[guild_id][emoji] = role.id
-        save_systems()
+        armazem.marcar('reaction_roles', guild_id)
         await ctx.send(f"✅ Reaction Role adicionado: {emoji} → {role.name}")
     except:
         await ctx.send("❌ Erro ao criar Reaction Role")
@@ -337,32 +316,12 @@ async def on_raw_reaction_add(payload):
 @bot.command()
 async def daily(ctx):
     """RESGATAR RECOMPENSA DIÁRIA"""
-    user_id = str(ctx.author.id)
-    conn = sqlite3.connect('villain_bot.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT wallet, last_daily FROM economy WHERE user_id = ?', (user_id,))
-    result = cursor.fetchone()
-    
-    if not result:
-        cursor.execute('INSERT INTO economy (user_id, wallet, last_daily) VALUES (?, ?, ?)', 
-                      (user_id, 100, datetime.datetime.now().isoformat()))
-        conn.commit()
-        await ctx.send("🎁 Recompensa diária: **100 moedas**!")
-    else:
-        wallet, last_daily = result
-        last_date = datetime.datetime.fromisoformat(last_daily) if last_daily else datetime.datetime.min
-        
-        if (datetime.datetime.now() - last_date).days >= 1:
-            amount = random.randint(80, 150)
-            cursor.execute('UPDATE economy SET wallet = wallet + ?, last_daily = ? WHERE user_id = ?',
-                          (amount, datetime.datetime.now().isoformat(), user_id))
-            conn.commit()
-            await ctx.send(f"🎁 Recompensa diária: **{amount} moedas**!")
-        else:
-            await ctx.send("⏰ Você já resgatou sua recompensa hoje!")
+    amount = await economia.resgatar_daily(str(ctx.author.id), random.randint(80, 150), primeira=100)
     
-    conn.close()
+    if amount is None:
+        await ctx.send("⏰ Você já resgatou sua recompensa hoje!")
+    else:
+        await ctx.send(f"🎁 Recompensa diária: **{amount} moedas**!")
 
 @bot.command()
 async def balance(ctx, member: discord.Member = None):
@@ -370,14 +329,7 @@ async def balance(ctx, member: discord.Member = None):
     target = member or ctx.author
     user_id = str(target.id)
     
-    conn = sqlite3.connect('villain_bot.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT wallet, bank FROM economy WHERE user_id = ?', (user_id,))
-    result = cursor.fetchone()
-    conn.close()
-    
-    wallet = result[0] if result else 0
-    bank = result[1] if result else 0
+    wallet, bank = await economia.saldo(user_id)
     
     embed = Embed(title=f"💰 Carteira de {target.name}", color=0xffd700)
     embed.add_field(name="Carteira", value=f"🪙 {wallet}", inline=True)
@@ -392,14 +344,7 @@ async def rank(ctx, member: discord.Member = None):
     target = member or ctx.author
     user_id = str(target.id)
     
-    conn = sqlite3.connect('villain_bot.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT level, xp FROM users WHERE user_id = ?', (user_id,))
-    result = cursor.fetchone()
-    conn.close()
-    
-    level = result[0] if result else 1
-    xp = result[1] if result else 0
+    level, xp = await economia.nivel(user_id)
     xp_needed = level * 100
     
     embed = Embed(title=f"🏅 Rank de {target.name}", color=0x00ff00)
@@ -422,7 +367,7 @@ async def setwelcome(ctx, channel: discord.TextChannel, *, message):
         'channel_id': channel.id,
         'message': message
     }
-    save_systems()
+    armazem.marcar('welcome_systems', guild_id)
     await ctx.send("✅ Sistema de boas-vindas configurado!")
 
 # AUTO MODERAÇÃO
@@ -442,10 +387,19 @@ async def automod(ctx, action: str, *, words=None):
         await ctx.send("❌ Auto moderação desativada!")
     elif action == "add" and words:
         banned_words = [word.strip().lower() for word in words.split(',')]
-        auto_moderations[guild_id]['banned_words'].extend(banned_words)
-        await ctx.send(f"✅ {len(banned_words)} palavras adicionadas à lista negra!")
-    
-    save_systems()
+        adicionadas = adicionar_palavras(auto_moderations[guild_id]['banned_words'], banned_words)
+        await ctx.send(f"✅ {adicionadas} palavras adicionadas à lista negra!")
+    elif action == "remove" and words:
+        removidas = {word.strip().lower() for word in words.split(',')}
+        auto_moderations[guild_id]['banned_words'] = [w for w in auto_moderations[guild_id]['banned_words'] if w not in removidas]
+        await ctx.send("✅ Palavras removidas da lista negra!")
+    elif action in ("boundary", "leet") and words in ("on", "off"):
+        chave = 'word_boundary' if action == "boundary" else 'leet'
+        auto_moderations[guild_id][chave] = words == "on"
+        await ctx.send(f"✅ Opção `{action}` {'ativada' if words == 'on' else 'desativada'}!")
+    
+    filtros_automod.invalidar(guild_id)
+    armazem.marcar('auto_moderations', guild_id)
 
 # SISTEMA DE PESQUISA
 @bot.command()
@@ -483,15 +437,25 @@ async def timer(ctx, seconds: int):
         await ctx.send("⏰ Timer máximo: 1 hora")
         return
     
+    await agendador.agendar(seconds, "lembrete", {
+        "canal_id": ctx.channel.id,
+        "mensagem": f"🔔 {ctx.author.mention} Timer finalizado!"
+    })
     await ctx.send(f"⏰ Timer definido para {seconds} segundos")
-    await asyncio.sleep(seconds)
-    await ctx.send(f"🔔 {ctx.author.mention} Timer finalizado!")
 
 @bot.command()
 async def remind(ctx, time: str, *, reminder):
     """DEFINIR LEMBRETE"""
-    await ctx.send(f"✅ Lembrete definido: '{reminder}' para {time}")
-    # Implementar parser de tempo para segundos
+    segundos = interpretar_duracao(time)
+    if segundos is None:
+        await ctx.send("❌ Tempo inválido! Use por exemplo `30m`, `2h` ou `1d`")
+        return
+    
+    await agendador.agendar(segundos, "lembrete", {
+        "canal_id": ctx.channel.id,
+        "mensagem": f"🔔 {ctx.author.mention} Lembrete: {reminder}"
+    })
+    await ctx.send(f"✅ Lembrete definido: '{reminder}' para daqui a {formatar_duracao(segundos)}")
 
 # SISTEMA DE DIVERSÃO
 @bot.command()
@@ -641,83 +605,43 @@ async def backup(ctx):
             }
             backup_data['channels'][str(channel.id)] = channel_data
     
-    filename = f"backup_{guild.id}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(backup_data, f, indent=2, ensure_ascii=False)
-    
-    await ctx.send(f"✅ Backup completo salvo como `{filename}`!")
+    manifesto, inalterado = await asyncio.to_thread(snapshots.salvar, guild.id, guild.name, normalizar_backup(backup_data))
+    await asyncio.to_thread(snapshots.podar, guild.id)
+    if inalterado:
+        await ctx.send(f"✅ Nada mudou desde o backup `{manifesto['id']}`")
+    else:
+        await ctx.send(f"✅ Backup completo salvo como `{manifesto['id']}`!")
 
 @bot.command()
-async def restore(ctx, filename: str):
-    """RESTAURA BACKUP - DESTRÓI TUDO E RECRIA"""
+async def restore(ctx, filename: str, modo: str = "completo"):
+    """RESTAURA BACKUP - DESTRÓI TUDO E RECRIA (modo diff/simular: só as diferenças)"""
     if not ctx.author.guild_permissions.administrator:
         await ctx.send("❌ Acesso negado!")
         return
     
+    if modo not in ("completo", "diff", "simular"):
+        await ctx.send("❌ Modo inválido! Use `completo`, `diff` ou `simular`.")
+        return
+    
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            backup_data = json.load(f)
+        backup = await asyncio.to_thread(snapshots.carregar, ctx.guild.id, filename)
     except:
         await ctx.send("❌ Arquivo de backup não encontrado!")
         return
     
     guild = ctx.guild
     
-    for channel in guild.channels:
-        try:
-            await channel.delete()
-        except:
-            pass
+    if modo in ("diff", "simular"):
+        plano, relatorio = await restaurador.reconciliar(guild, backup, simular=modo == "simular")
+        if relatorio is None:
+            await ctx.send("🔍 Plano (nada foi alterado):\n" + resumir_plano(plano))
+            return
+    else:
+        relatorio = await restaurador.restaurar(guild, backup)
     
-    for role in guild.roles:
-        if role.name != "@everyone" and not role.managed:
-            try:
-                await role.delete()
-            except:
-                pass
-    
-    await asyncio.sleep(2)
-    
-    role_mapping = {}
-    for role_data in sorted(backup_data['roles'], key=lambda x: x['position']):
-        try:
-            new_role = await guild.create_role(
-                name=role_data['name'],
-                color=discord.Color(role_data['color']),
-                permissions=discord.Permissions(role_data['permissions'])
-            )
-            role_mapping[role_data['name']] = new_role
-        except:
-            pass
-    
-    categories = {}
-    for channel_id, channel_data in backup_data['channels'].items():
-        try:
-            if channel_data.get('topic') is not None:
-                if channel_data['category'] and channel_data['category'] not in categories:
-                    categories[channel_data['category']] = await guild.create_category(channel_data['category'])
-                
-                category = categories.get(channel_data['category'])
-                await guild.create_text_channel(
-                    channel_data['name'],
-                    topic=channel_data['topic'],
-                    category=category,
-                    position=channel_data['position']
-                )
-            else:
-                if channel_data['category'] and channel_data['category'] not in categories:
-                    categories[channel_data['category']] = await guild.create_category(channel_data['category'])
-                
-                category = categories.get(channel_data['category'])
-                await guild.create_voice_channel(
-                    channel_data['name'],
-                    category=category,
-                    position=channel_data['position']
-                )
-        except:
-            pass
-    
-    await ctx.send("✅ Servidor restaurado do backup com sucesso!")
+    destino = canal_resumo(guild, ctx.channel)
+    if destino:
+        await destino.send("✅ Servidor restaurado do backup!\n" + resumir(relatorio))
 
 @bot.command()
 async def secure_channel(ctx):
@@ -789,4 +713,11 @@ async def guess(ctx):
 
 # INICIALIZAÇÃO DO BOT VILÃO SUPREMO
 if __name__ == "__main__":
-    bot.run(DISCORD_TOKEN)
+    try:
+        bot.run(DISCORD_TOKEN)
+    finally:
+        armazem.descarregar()
+        historico.descarregar()
+        db.fechar()
+        if motor.dialeto != 'sqlite':
+            motor.fechar()
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import heapq
+import json
+import re
+import time
+
+UNIDADES = {
+    's': 1, 'seg': 1,
+    'm': 60, 'min': 60,
+    'h': 3600,
+    'd': 86400,
+    'w': 604800, 'sem': 604800
+}
+DURACAO = re.compile(r'(\d+)\s*(seg|sem|min|s|m|h|d|w)?', re.I)
+
+
+def interpretar_duracao(texto):
+    """Converte '30m', '2h', '1d', '1h30m' ou '90' (segundos) em segundos; None se inválido"""
+    texto = texto.strip().lower().replace(' ', '')
+    if not texto:
+        return None
+    total = 0
+    posicao = 0
+    for parte in DURACAO.finditer(texto):
+        if parte.start() != posicao:
+            return None
+        total += int(parte.group(1)) * UNIDADES[parte.group(2) or 's']
+        posicao = parte.end()
+    if posicao != len(texto) or total <= 0:
+        return None
+    return total
+
+
+def formatar_duracao(segundos):
+    partes = []
+    for sufixo, tamanho in (('d', 86400), ('h', 3600), ('m', 60), ('s', 1)):
+        quantidade, segundos = divmod(int(segundos), tamanho)
+        if quantidade:
+            partes.append(f"{quantidade}{sufixo}")
+    return ' '.join(partes) or '0s'
+
+
+def _criar_tabela(conn):
+    """agendamentos com coluna `bot`: cada bot que divide o banco só dispara os seus"""
+    colunas = [coluna[1] for coluna in conn.execute('PRAGMA table_info(agendamentos)').fetchall()]
+    if 'bot' in colunas:
+        return
+    if colunas:
+        conn.execute("ALTER TABLE agendamentos ADD COLUMN bot TEXT NOT NULL DEFAULT ''")
+    else:
+        conn.execute('''CREATE TABLE agendamentos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            bot TEXT NOT NULL DEFAULT '',
+            quando REAL NOT NULL,
+            tipo TEXT NOT NULL,
+            dados TEXT
+        )''')
+    conn.execute('DROP INDEX IF EXISTS idx_agendamentos_quando')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_agendamentos_bot_quando ON agendamentos (bot, quando)')
+
+
+def _inserir(conn, bot, quando, tipo, dados):
+    _criar_tabela(conn)
+    return conn.execute('INSERT INTO agendamentos (bot, quando, tipo, dados) VALUES (?, ?, ?, ?)',
+                        (bot, quando, tipo, dados)).lastrowid
+
+
+def _janela(conn, bot, inicio, fim):
+    _criar_tabela(conn)
+    if bot and inicio == float('-inf'):
+        # Linhas de antes da coluna `bot` não dizem de quem são: o primeiro bot
+        # que sobe fica com elas, para nenhuma disparar duas vezes
+        conn.execute("UPDATE agendamentos SET bot = ? WHERE bot = ''", (bot,))
+    return conn.execute('SELECT id, quando, tipo, dados FROM agendamentos WHERE bot = ? AND quando > ? AND quando <= ?',
+                        (bot, inicio, fim)).fetchall()
+
+
+def _apagar(conn, ids):
+    conn.executemany('DELETE FROM agendamentos WHERE id = ?', [(i,) for i in ids])
+
+
+class Agendador:
+    """Lembretes, timers e fim de mute que sobrevivem a reinícios
+
+    Tudo fica na tabela agendamentos; em memória só fica um heap com o que
+    vence na próxima `janela` de segundos, recarregado do índice por
+    `quando` conforme o tempo passa. Uma única tarefa dorme até o próximo
+    vencimento, então milhões de agendamentos pendentes custam uma corrotina
+    e O(log n) por inserção. Ao iniciar, o que venceu com o bot desligado
+    dispara na hora (com o atraso informado ao tratador). Bots que dividem
+    o banco passam `bot` e só veem os próprios agendamentos. Um tratador que
+    passa de `tempo_limite` segundos é cancelado e conta como falha, para
+    tratadores travados não ocuparem as `concorrencia` vagas para sempre.
+    """
+
+    def __init__(self, banco, janela=3600, concorrencia=20, tempo_limite=60, bot=''):
+        self.banco = banco
+        self.bot = bot
+        self.janela = janela
+        self.tempo_limite = tempo_limite
+        self.tratadores = {}
+        self._heap = []
+        self._no_heap = set()
+        self._limite = None
+        self._cancelados = set()
+        self._concluidos = []
+        self._semaforo = asyncio.Semaphore(concorrencia)
+        self._evento = None
+        self._tarefa = None
+        self.disparados = 0
+        self.atrasados = 0
+        self.falhas = 0
+
+    def registrar(self, tipo, tratador):
+        """`tratador(dados, atraso)` é chamado quando um agendamento do tipo vence"""
+        self.tratadores[tipo] = tratador
+
+    def iniciar(self):
+        """Inicia o despachante no loop atual (idempotente)"""
+        if self._tarefa is None or self._tarefa.done():
+            self._evento = asyncio.Event()
+            self._tarefa = asyncio.get_running_loop().create_task(self._executar())
+
+    async def fechar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            # wait_for (no despachante) engole o cancelamento se o evento for
+            # ativado no mesmo instante; cancela de novo até a tarefa acabar
+            while not self._tarefa.done():
+                await asyncio.wait({self._tarefa}, timeout=0.1)
+                self._tarefa.cancel()
+        if self._concluidos:
+            await self.banco.executar(_apagar, self._concluidos)
+            self._concluidos = []
+
+    async def agendar(self, segundos, tipo, dados):
+        """Agenda `tipo` para daqui a `segundos`; devolve o id do agendamento"""
+        quando = time.time() + segundos
+        agendamento_id = await self.banco.executar(_inserir, self.bot, quando, tipo, json.dumps(dados, ensure_ascii=False))
+        if self._limite is not None and quando <= self._limite:
+            self._empilhar(quando, agendamento_id, tipo, dados)
+            if self._heap[0][1] == agendamento_id and self._evento is not None:
+                self._evento.set()
+        return agendamento_id
+
+    async def cancelar(self, agendamento_id):
+        if agendamento_id in self._no_heap:
+            self._cancelados.add(agendamento_id)
+        return await self.banco.alterar('DELETE FROM agendamentos WHERE id = ? AND bot = ?', (agendamento_id, self.bot))
+
+    def _empilhar(self, quando, agendamento_id, tipo, dados):
+        # A recarga da janela e agendar() podem ver a mesma linha
+        if agendamento_id not in self._no_heap:
+            self._no_heap.add(agendamento_id)
+            heapq.heappush(self._heap, (quando, agendamento_id, tipo, dados))
+
+    async def _carregar(self, agora):
+        """Traz para o heap o que vence até agora + janela (na primeira vez, também os atrasados)"""
+        inicio = self._limite if self._limite is not None else float('-inf')
+        fim = agora + self.janela
+        for agendamento_id, quando, tipo, dados in await self.banco.executar(_janela, self.bot, inicio, fim):
+            self._empilhar(quando, agendamento_id, tipo, json.loads(dados) if dados else None)
+        self._limite = fim
+
+    async def _executar(self):
+        while True:
+            self._evento.clear()
+            agora = time.time()
+            if self._limite is None or agora + self.janela / 2 >= self._limite:
+                await self._carregar(agora)
+
+            while self._heap and self._heap[0][0] <= agora:
+                quando, agendamento_id, tipo, dados = heapq.heappop(self._heap)
+                self._no_heap.discard(agendamento_id)
+                if agendamento_id in self._cancelados:
+                    self._cancelados.discard(agendamento_id)
+                    continue
+                await self._semaforo.acquire()
+                asyncio.ensure_future(self._disparar(agendamento_id, tipo, dados, agora - quando))
+
+            if self._concluidos:
+                concluidos, self._concluidos = self._concluidos, []
+                await self.banco.executar(_apagar, concluidos)
+
+            proximo = self._heap[0][0] if self._heap else float('inf')
+            espera = max(0.0, min(proximo, self._limite - self.janela / 2) - time.time())
+            try:
+                await asyncio.wait_for(self._evento.wait(), timeout=espera)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _disparar(self, agendamento_id, tipo, dados, atraso):
+        try:
+            tratador = self.tratadores.get(tipo)
+            if tratador is None:
+                print(f"Agendamento {agendamento_id} sem tratador para '{tipo}'")
+            else:
+                await asyncio.wait_for(tratador(dados, atraso), self.tempo_limite)
+            self.disparados += 1
+            if atraso > 60:
+                self.atrasados += 1
+        except asyncio.TimeoutError:
+            self.falhas += 1
+            print(f"Agendamento {agendamento_id} ({tipo}) passou de {self.tempo_limite}s e foi cancelado")
+        except Exception as e:
+            self.falhas += 1
+            print(f"Erro no agendamento {agendamento_id} ({tipo}): {e}")
+        finally:
+            # Mesmo com erro sai da tabela: um tratador quebrado não pode disparar para sempre
+            self._concluidos.append(agendamento_id)
+            self._semaforo.release()
+            if self._evento is not None:
+                # Acorda o despachante para apagar os concluídos em lote
+                self._evento.set()
+
+    def estatisticas(self):
+        return {
+            'em_memoria': len(self._heap),
+            'disparados': self.disparados,
+            'atrasados': self.atrasados,
+            'falhas': self.falhas
+        }
+
+
+def tratadores_discord(bot, cargo_mute="Silenciado"):
+    """Tratadores padrão: 'lembrete' envia a mensagem no canal e 'desmutar' tira o cargo de mute"""
+    async def canal(canal_id):
+        return bot.get_channel(canal_id) or await bot.fetch_channel(canal_id)
+
+    async def lembrete(dados, atraso):
+        destino = await canal(dados["canal_id"])
+        texto = dados["mensagem"]
+        if atraso > 60:
+            texto += f" (atrasado {formatar_duracao(atraso)}, o bot estava fora do ar)"
+        await destino.send(texto)
+
+    async def desmutar(dados, atraso):
+        guild = bot.get_guild(dados["guild_id"])
+        if guild is None:
+            return
+        member = guild.get_member(dados["user_id"])
+        if member is None:
+            try:
+                member = await guild.fetch_member(dados["user_id"])
+            except Exception:
+                return
+        cargo = next((role for role in guild.roles if role.name == cargo_mute), None)
+        if cargo is not None and cargo in member.roles:
+            await member.remove_roles(cargo, reason="Fim do silenciamento")
+
+    return {"lembrete": lembrete, "desmutar": desmutar}
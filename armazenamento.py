@@ -0,0 +1,546 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import datetime
+import re
+import sqlite3
+import zlib
+
+from banco import BancoAssincrono, PRAGMAS
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+
+# ESQUEMAS
+# Cada esquema é uma lista de (versão, descrição, passos). Um passo é SQL
+# portável ({id_auto} vira a chave autoincremental de cada motor) ou uma
+# função(conn) que só roda no SQLite, para converter bancos antigos.
+
+def _economia_por_servidor(conn):
+    """Converte a economia antiga do imperio.db (chave só user_id) para (guild_id, user_id)"""
+    colunas = [coluna[1] for coluna in conn.execute('PRAGMA table_info(economia)').fetchall()]
+    if 'guild_id' in colunas:
+        return
+
+    conn.execute('''
+        CREATE TABLE economia_nova (
+            guild_id INTEGER NOT NULL DEFAULT 0,
+            user_id INTEGER NOT NULL,
+            coins INTEGER DEFAULT 100,
+            daily_streak INTEGER DEFAULT 0,
+            last_daily TEXT,
+            xp INTEGER DEFAULT 0,
+            level INTEGER DEFAULT 1,
+            PRIMARY KEY (guild_id, user_id)
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO economia_nova (guild_id, user_id, coins, daily_streak, last_daily, xp, level)
+        SELECT 0, user_id, coins, daily_streak, last_daily, xp, level FROM economia
+    ''')
+    conn.execute('DROP TABLE economia')
+    conn.execute('ALTER TABLE economia_nova RENAME TO economia')
+
+
+USERS = '''
+    CREATE TABLE IF NOT EXISTS users (
+        user_id TEXT PRIMARY KEY,
+        level INTEGER DEFAULT 1,
+        xp INTEGER DEFAULT 0,
+        coins BIGINT DEFAULT 1000,
+        warnings INTEGER DEFAULT 0
+    )
+'''
+
+ECONOMY = '''
+    CREATE TABLE IF NOT EXISTS economy (
+        user_id TEXT PRIMARY KEY,
+        wallet BIGINT DEFAULT 0,
+        bank BIGINT DEFAULT 0,
+        last_daily TEXT
+    )
+'''
+
+ESQUEMAS = {
+    # bot_data.db: bt.py e bot7.py
+    'bot_data': [
+        (1, 'users, economy e server_config', [
+            USERS,
+            ECONOMY,
+            '''
+            CREATE TABLE IF NOT EXISTS server_config (
+                guild_id TEXT PRIMARY KEY,
+                welcome_channel TEXT,
+                mod_log_channel TEXT,
+                auto_mod INTEGER DEFAULT 0
+            )
+            '''
+        ])
+    ],
+    # villain_bot.db: Botdc.py e bot.py
+    'villain': [
+        (1, 'users, moderation e economy', [
+            USERS,
+            'ALTER TABLE users ADD COLUMN profile_data TEXT',
+            ECONOMY,
+            '''
+            CREATE TABLE IF NOT EXISTS moderation (
+                case_id {id_auto},
+                user_id TEXT,
+                mod_id TEXT,
+                action TEXT,
+                reason TEXT,
+                timestamp TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            '''
+        ])
+    ],
+    # imperio.db: cong.py
+    'imperio': [
+        (1, 'economia, loja, inventario, warns e config', [
+            '''
+            CREATE TABLE IF NOT EXISTS economia (
+                guild_id BIGINT NOT NULL DEFAULT 0,
+                user_id BIGINT NOT NULL,
+                coins BIGINT DEFAULT 100,
+                daily_streak INTEGER DEFAULT 0,
+                last_daily TEXT,
+                xp BIGINT DEFAULT 0,
+                level INTEGER DEFAULT 1,
+                PRIMARY KEY (guild_id, user_id)
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS loja (
+                item_id {id_auto},
+                nome TEXT,
+                preco BIGINT,
+                descricao TEXT
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS inventario (
+                user_id BIGINT,
+                item_id INTEGER,
+                quantidade INTEGER DEFAULT 1
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS warns (
+                id {id_auto},
+                user_id BIGINT,
+                moderator_id BIGINT,
+                reason TEXT,
+                timestamp TEXT
+            )
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS config (
+                guild_id BIGINT PRIMARY KEY,
+                antiraid INTEGER DEFAULT 0,
+                antilink INTEGER DEFAULT 0,
+                welcome_channel BIGINT,
+                welcome_message TEXT
+            )
+            '''
+        ]),
+        (2, 'economia por servidor e índice do ranking', [
+            _economia_por_servidor,
+            'CREATE INDEX IF NOT EXISTS idx_economia_ranking ON economia (guild_id, level DESC, xp DESC)'
+        ]),
+        (3, 'inventario com chave (guild_id, user_id, item_id); linhas repetidas viram uma, no servidor 0', [
+            'ALTER TABLE inventario RENAME TO inventario_antigo',
+            '''
+            CREATE TABLE inventario (
+                guild_id BIGINT NOT NULL DEFAULT 0,
+                user_id BIGINT NOT NULL,
+                item_id INTEGER NOT NULL,
+                quantidade INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (guild_id, user_id, item_id)
+            )
+            ''',
+            '''
+            INSERT INTO inventario (guild_id, user_id, item_id, quantidade)
+            SELECT 0, user_id, item_id, SUM(COALESCE(quantidade, 1)) FROM inventario_antigo
+            WHERE user_id IS NOT NULL AND item_id IS NOT NULL
+            GROUP BY user_id, item_id
+            ''',
+            'DROP TABLE inventario_antigo'
+        ])
+    ]
+}
+
+DIALETOS = {
+    'sqlite': {'id_auto': 'INTEGER PRIMARY KEY AUTOINCREMENT'},
+    'postgres': {'id_auto': 'BIGSERIAL PRIMARY KEY'}
+}
+
+VERSOES = '''
+    CREATE TABLE IF NOT EXISTS versao_esquema (
+        esquema TEXT PRIMARY KEY,
+        versao INTEGER NOT NULL,
+        atualizado TEXT
+    )
+'''
+GRAVAR_VERSAO = '''
+    INSERT INTO versao_esquema (esquema, versao, atualizado) VALUES (?, ?, ?)
+    ON CONFLICT (esquema) DO UPDATE SET versao = excluded.versao, atualizado = excluded.atualizado
+'''
+
+
+def conectar(caminho, **opcoes):
+    """sqlite3.connect com os mesmos PRAGMAs do BancoAssincrono (WAL, busy_timeout...)"""
+    conn = sqlite3.connect(caminho, **opcoes)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def migrar(conn, esquema):
+    """Aplica numa conexão sqlite3 as migrações pendentes de `esquema`; devolve a versão final
+
+    Roda sob BEGIN IMMEDIATE: com vários processos no mesmo arquivo, só um
+    migra e os outros esperam (busy_timeout) e já encontram a versão nova.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute(VERSOES)
+        linha = conn.execute('SELECT versao FROM versao_esquema WHERE esquema = ?', (esquema,)).fetchone()
+        versao = linha[0] if linha else 0
+        for numero, _, passos in ESQUEMAS[esquema]:
+            if numero <= versao:
+                continue
+            for passo in passos:
+                if callable(passo):
+                    passo(conn)
+                    continue
+                try:
+                    conn.execute(passo.format(**DIALETOS['sqlite']))
+                except sqlite3.OperationalError as e:
+                    # ALTER TABLE ADD COLUMN não tem IF NOT EXISTS no SQLite
+                    if 'duplicate column' not in str(e):
+                        raise
+            versao = numero
+            conn.execute(GRAVAR_VERSAO, (esquema, versao, datetime.datetime.now().isoformat()))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return versao
+
+
+def _para_postgres(sql):
+    """Troca os placeholders ? por $1, $2... (fora de literais)"""
+    partes = sql.split("'")
+    contador = 0
+
+    def trocar(_):
+        nonlocal contador
+        contador += 1
+        return f'${contador}'
+
+    for i in range(0, len(partes), 2):
+        partes[i] = re.sub(r'\?', trocar, partes[i])
+    return "'".join(partes)
+
+
+def _linhas_afetadas(status):
+    ultimo = status.rsplit(' ', 1)[-1]
+    return int(ultimo) if ultimo.isdigit() else 0
+
+
+def _sem_suspender(corrotina):
+    """Roda até o fim uma corrotina que só aguarda operações da TransacaoSQLite"""
+    try:
+        corrotina.send(None)
+    except StopIteration as fim:
+        return fim.value
+    corrotina.close()
+    raise RuntimeError('Transação SQLite só pode aguardar operações da própria transação')
+
+
+class TransacaoSQLite:
+    """Operações de uma transação no SQLite; rodam direto na thread do banco"""
+
+    dialeto = 'sqlite'
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def executar(self, sql, params=()):
+        return self.conn.execute(sql, params).rowcount
+
+    async def executar_muitos(self, sql, linhas):
+        self.conn.executemany(sql, linhas)
+
+    async def buscar_um(self, sql, params=()):
+        return self.conn.execute(sql, params).fetchone()
+
+    async def buscar_todos(self, sql, params=()):
+        return self.conn.execute(sql, params).fetchall()
+
+
+class TransacaoPostgres:
+    dialeto = 'postgres'
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def executar(self, sql, params=()):
+        return _linhas_afetadas(await self.conn.execute(_para_postgres(sql), *params))
+
+    async def executar_muitos(self, sql, linhas):
+        await self.conn.executemany(_para_postgres(sql), linhas)
+
+    async def buscar_um(self, sql, params=()):
+        linha = await self.conn.fetchrow(_para_postgres(sql), *params)
+        return tuple(linha) if linha is not None else None
+
+    async def buscar_todos(self, sql, params=()):
+        return [tuple(linha) for linha in await self.conn.fetch(_para_postgres(sql), *params)]
+
+
+class MotorSQLite:
+    """SQLite (padrão) sobre o BancoAssincrono: uma thread e uma conexão por processo
+
+    `transacao(funcao)` roda a corrotina `funcao(tx, ...)` inteira na thread
+    do banco, sem voltar ao loop entre um comando e outro, então ela não
+    pode aguardar nada além dos métodos de `tx`. Código que ainda fala
+    direto com o sqlite3 usa `banco` (o mesmo BancoAssincrono).
+    """
+
+    dialeto = 'sqlite'
+
+    def __init__(self, caminho, esquema, **opcoes):
+        self.caminho = caminho
+        self.esquema = esquema
+        self.banco = BancoAssincrono(caminho, **opcoes)
+        self.versao = self.banco.executar_sincrono(migrar, esquema)
+
+    async def transacao(self, funcao, *args):
+        return await self.banco.executar(lambda conn: _sem_suspender(funcao(TransacaoSQLite(conn), *args)))
+
+    async def transacao_agrupada(self, funcao, *args):
+        """Como transacao(), com commit em grupo (BancoAssincrono.executar_agrupado)"""
+        return await self.banco.executar_agrupado(lambda conn: _sem_suspender(funcao(TransacaoSQLite(conn), *args)))
+
+    async def executar(self, sql, params=()):
+        return await self.banco.alterar(sql, params)
+
+    async def buscar_um(self, sql, params=()):
+        return await self.banco.buscar_um(sql, params)
+
+    async def buscar_todos(self, sql, params=()):
+        return await self.banco.buscar_todos(sql, params)
+
+    def fechar(self):
+        self.banco.fechar()
+
+
+class MotorPostgres:
+    """Postgres (ou compatível) via asyncpg, com pool de conexões
+
+    O pool é criado na primeira operação, sob uma trava: corrotinas que
+    chegam juntas esperam o mesmo pool em vez de abrir outro. As migrações
+    rodam nesse momento, sob um advisory lock para que só um processo
+    migre. Passos em Python (conversões de bancos SQLite antigos) são
+    pulados.
+    """
+
+    dialeto = 'postgres'
+
+    def __init__(self, dsn, esquema, minimo=1, maximo=10):
+        if asyncpg is None:
+            raise RuntimeError("Postgres requer o pacote asyncpg (pip install asyncpg)")
+        self.dsn = dsn
+        self.esquema = esquema
+        self.minimo = minimo
+        self.maximo = maximo
+        self.versao = None
+        self._pool = None
+        self._trava = asyncio.Lock()
+
+    async def _conexoes(self):
+        if self._pool is None:
+            async with self._trava:
+                if self._pool is None:
+                    pool = await asyncpg.create_pool(self.dsn, min_size=self.minimo, max_size=self.maximo)
+                    try:
+                        self.versao = await self._migrar(pool)
+                    except Exception:
+                        pool.terminate()
+                        raise
+                    self._pool = pool
+        return self._pool
+
+    async def _migrar(self, pool):
+        async with pool.acquire() as conn, conn.transaction():
+            await conn.execute('SELECT pg_advisory_xact_lock($1)', zlib.crc32(self.esquema.encode()))
+            tx = TransacaoPostgres(conn)
+            await tx.executar(VERSOES)
+            linha = await tx.buscar_um('SELECT versao FROM versao_esquema WHERE esquema = ?', (self.esquema,))
+            versao = linha[0] if linha else 0
+            for numero, _, passos in ESQUEMAS[self.esquema]:
+                if numero <= versao:
+                    continue
+                for passo in passos:
+                    if callable(passo):
+                        continue
+                    if passo.lstrip().upper().startswith('ALTER TABLE') and 'ADD COLUMN' in passo.upper():
+                        passo = passo.replace('ADD COLUMN', 'ADD COLUMN IF NOT EXISTS')
+                    await tx.executar(passo.format(**DIALETOS['postgres']))
+                versao = numero
+                await tx.executar(GRAVAR_VERSAO, (self.esquema, versao, datetime.datetime.now().isoformat()))
+            return versao
+
+    async def transacao(self, funcao, *args):
+        pool = await self._conexoes()
+        async with pool.acquire() as conn, conn.transaction():
+            return await funcao(TransacaoPostgres(conn), *args)
+
+    transacao_agrupada = transacao
+
+    async def executar(self, sql, params=()):
+        pool = await self._conexoes()
+        return _linhas_afetadas(await pool.execute(_para_postgres(sql), *params))
+
+    async def buscar_um(self, sql, params=()):
+        pool = await self._conexoes()
+        linha = await pool.fetchrow(_para_postgres(sql), *params)
+        return tuple(linha) if linha is not None else None
+
+    async def buscar_todos(self, sql, params=()):
+        pool = await self._conexoes()
+        return [tuple(linha) for linha in await pool.fetch(_para_postgres(sql), *params)]
+
+    def fechar(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+
+def abrir(url, esquema):
+    """Motor para `url`: postgres://... usa o Postgres, qualquer outra coisa é o caminho do SQLite"""
+    if url.startswith(('postgres://', 'postgresql://')):
+        return MotorPostgres(url, esquema)
+    return MotorSQLite(url, esquema)
+
+
+# REPOSITÓRIOS
+
+def _lancar(tx, extrato, user_id, delta, motivo, ref=None):
+    # O extrato só existe no SQLite: o lançamento vai pela mesma conexão, na mesma transação
+    if extrato is not None:
+        extrato.lancar(tx.conn, (user_id,), delta, motivo, ref)
+
+
+async def _resgatar_daily(tx, extrato, user_id, valor, primeira, agora, limite):
+    # Começa pelo UPDATE condicional: a transação já nasce escrevendo, sem
+    # janela entre conferir o último daily e pagar (nem entre processos)
+    if await tx.executar('''
+        UPDATE economy SET wallet = wallet + ?, last_daily = ?
+        WHERE user_id = ? AND (last_daily IS NULL OR last_daily <= ?)
+    ''', (valor, agora, user_id, limite)):
+        ganho = valor
+    elif await tx.executar('''
+        INSERT INTO economy (user_id, wallet, last_daily) VALUES (?, ?, ?)
+        ON CONFLICT (user_id) DO NOTHING
+    ''', (user_id, primeira, agora)):
+        ganho = primeira
+    else:
+        return None
+    _lancar(tx, extrato, user_id, ganho, 'daily')
+    return ganho
+
+
+async def _transferir(tx, extrato, de, para, quantia):
+    if not await tx.buscar_um('UPDATE economy SET wallet = wallet - ? WHERE user_id = ? AND wallet >= ? RETURNING wallet',
+                              (quantia, de, quantia)):
+        return False
+    await tx.executar('''
+        INSERT INTO economy (user_id, wallet) VALUES (?, ?)
+        ON CONFLICT (user_id) DO UPDATE SET wallet = economy.wallet + excluded.wallet
+    ''', (para, quantia))
+    _lancar(tx, extrato, de, -quantia, 'transferencia', para)
+    _lancar(tx, extrato, para, quantia, 'transferencia', de)
+    return True
+
+
+async def _apostar(tx, extrato, user_id, aposta, premio, motivo):
+    linha = await tx.buscar_um('''
+        UPDATE economy SET wallet = wallet + ? WHERE user_id = ? AND wallet >= ? RETURNING wallet
+    ''', (premio - aposta, user_id, aposta))
+    if linha is None:
+        return None
+    _lancar(tx, extrato, user_id, premio - aposta, motivo)
+    return linha[0]
+
+
+class RepositorioEconomia:
+    """Saldo, nível, daily, transferências e apostas das tabelas economy/users
+
+    Usado pelos quatro bots de prefixo (bot_data.db e villain_bot.db). Cada
+    operação é um UPDATE condicional ou um UPSERT, portável entre SQLite e
+    Postgres e segura com vários processos no mesmo banco. Com um `extrato`
+    (só no SQLite, que é onde ele guarda o histórico) cada mudança de saldo
+    é lançada nele dentro da mesma transação; `manter()` faz os checkpoints.
+    """
+
+    def __init__(self, motor, extrato=None):
+        if extrato is not None and motor.dialeto != 'sqlite':
+            raise ValueError("O extrato só funciona com o motor SQLite")
+        self.motor = motor
+        self.extrato = extrato
+        if extrato is not None:
+            motor.banco.executar_sincrono(extrato.criar_tabelas)
+
+    async def saldo(self, user_id):
+        """(carteira, banco)"""
+        linha = await self.motor.buscar_um('SELECT wallet, bank FROM economy WHERE user_id = ?', (user_id,))
+        return linha if linha else (0, 0)
+
+    async def nivel(self, user_id):
+        """(level, xp)"""
+        linha = await self.motor.buscar_um('SELECT level, xp FROM users WHERE user_id = ?', (user_id,))
+        return linha if linha else (1, 0)
+
+    async def resgatar_daily(self, user_id, valor, primeira=None, intervalo=datetime.timedelta(days=1)):
+        """Moedas ganhas, ou None se o último daily foi há menos de `intervalo`
+
+        `primeira` é o valor para quem ainda não tem conta (padrão: `valor`).
+        """
+        agora = datetime.datetime.now()
+        return await self.motor.transacao(_resgatar_daily, self.extrato, user_id, valor,
+                                          valor if primeira is None else primeira,
+                                          agora.isoformat(), (agora - intervalo).isoformat())
+
+    async def transferir(self, de, para, quantia):
+        """Débito condicional + crédito numa transação (commit em grupo); False se faltou saldo"""
+        return await self.motor.transacao_agrupada(_transferir, self.extrato, de, para, quantia)
+
+    async def apostar(self, user_id, aposta, premio, motivo='loteria'):
+        """Aplica premio - aposta se o usuário tiver `aposta` na carteira; novo saldo ou None"""
+        return await self.motor.transacao(_apostar, self.extrato, user_id, aposta, premio, motivo)
+
+    async def consultar_extrato(self, user_id, quando=None, limite=10):
+        """(saldo atual, saldo pelo extrato, saldo em `quando` ou None, últimos lançamentos)"""
+        def consultar(conn):
+            atual, recalculado = self.extrato.conferir(conn, (user_id,))
+            saldo_em = self.extrato.saldo_em(conn, (user_id,), quando) if quando is not None else None
+            return atual, recalculado, saldo_em, self.extrato.movimentos(conn, (user_id,), limite, quando)
+        return await self.motor.banco.executar(consultar)
+
+    async def manter(self, intervalo=300):
+        """Faz checkpoint dos saldos de tempos em tempos"""
+        if self.extrato is None:
+            return
+        while True:
+            await asyncio.sleep(intervalo)
+            try:
+                await self.motor.banco.executar(self.extrato.checkpoint)
+            except Exception as e:
+                print(f"Erro ao gravar o checkpoint do extrato: {e}")
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+import re
+import unicodedata
+from collections import deque
+
+LEET = str.maketrans({
+    '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's',
+    '7': 't', '8': 'b', '@': 'a', '$': 's'
+})
+
+
+def normalizar(texto, leet=False):
+    """Minúsculas sem acentos (e opcionalmente sem leetspeak)"""
+    texto = texto.casefold()
+    if not texto.isascii():
+        texto = ''.join(c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c))
+    if leet:
+        texto = texto.translate(LEET)
+    return texto
+
+
+def _padrao_trie(palavras):
+    """Monta uma regex em forma de trie: o custo por mensagem quase não cresce com a lista"""
+    trie = {}
+    for palavra in palavras:
+        no = trie
+        for c in palavra:
+            no = no.setdefault(c, {})
+        no[''] = True
+
+    def montar(no):
+        if '' in no and len(no) == 1:
+            return None
+
+        alternativas = []
+        caracteres = []
+        for c in sorted(chave for chave in no if chave):
+            resto = montar(no[c])
+            if resto is None:
+                caracteres.append(re.escape(c))
+            else:
+                alternativas.append(re.escape(c) + resto)
+
+        if caracteres:
+            alternativas.append(caracteres[0] if len(caracteres) == 1 else '[' + ''.join(caracteres) + ']')
+
+        padrao = alternativas[0] if len(alternativas) == 1 else '(?:' + '|'.join(alternativas) + ')'
+        if '' in no:
+            padrao = '(?:' + padrao + ')?'
+        return padrao
+
+    return montar(trie) or ''
+
+
+class FiltroPalavras:
+    """Lista de palavras proibidas compilada numa única regex"""
+
+    def __init__(self, palavras, palavra_inteira=False, leet=False):
+        self.leet = leet
+        termos = {normalizar(p.strip(), leet) for p in palavras}
+        termos.discard('')
+        self.termos = termos
+        self.regex = None
+        if termos:
+            padrao = _padrao_trie(termos)
+            if palavra_inteira:
+                padrao = r'(?<!\w)(?:' + padrao + r')(?!\w)'
+            self.regex = re.compile(padrao)
+
+    def encontrar(self, texto):
+        """Primeiro termo proibido encontrado no texto, ou None"""
+        if self.regex is None:
+            return None
+        achado = self.regex.search(normalizar(texto, self.leet))
+        return achado.group(0) if achado else None
+
+
+class CacheFiltros:
+    """Um FiltroPalavras por servidor, recompilado só quando a config muda"""
+
+    def __init__(self):
+        self._filtros = {}
+
+    def filtro(self, guild_id, config):
+        filtro = self._filtros.get(guild_id)
+        if filtro is None:
+            filtro = FiltroPalavras(
+                config.get('banned_words', []),
+                palavra_inteira=config.get('word_boundary', False),
+                leet=config.get('leet', False)
+            )
+            self._filtros[guild_id] = filtro
+        return filtro
+
+    def invalidar(self, guild_id):
+        self._filtros.pop(guild_id, None)
+
+
+def adicionar_palavras(lista, novas):
+    """Adiciona sem duplicar; devolve quantas entraram de fato"""
+    existentes = set(lista)
+    adicionadas = 0
+    for palavra in novas:
+        if palavra and palavra not in existentes:
+            lista.append(palavra)
+            existentes.add(palavra)
+            adicionadas += 1
+    return adicionadas
+
+
+LINK = re.compile(
+    r'(?:https?://|www\.|discord(?:\.gg|(?:app)?\.com/invite)/)\S'
+    r'|\b[a-z0-9-]+\.(?:com|net|org|gg|io|xyz|br|me|ly|tv)\b',
+    re.IGNORECASE
+)
+
+
+def contem_link(texto):
+    """Detecta links/convites; mensagens sem ponto saem sem rodar a regex"""
+    if '.' not in texto:
+        return False
+    return LINK.search(texto) is not None
+
+
+class DetectorRaid:
+    """Janela deslizante de entradas por servidor, O(1) por evento
+
+    Se `limite` membros entram em até `janela` segundos o servidor fica em
+    modo raid por `duracao` segundos.
+    """
+
+    def __init__(self, limite=10, janela=10.0, duracao=300.0):
+        self.limite = limite
+        self.janela = janela
+        self.duracao = duracao
+        self._entradas = {}
+        self._raid_ate = {}
+
+    def registrar(self, guild_id, agora):
+        """Registra uma entrada; devolve True se o servidor está em modo raid"""
+        entradas = self._entradas.get(guild_id)
+        if entradas is None:
+            entradas = self._entradas[guild_id] = deque(maxlen=self.limite)
+        entradas.append(agora)
+
+        if len(entradas) == self.limite and agora - entradas[0] <= self.janela:
+            self._raid_ate[guild_id] = agora + self.duracao
+        return self.em_raid(guild_id, agora)
+
+    def em_raid(self, guild_id, agora):
+        return self._raid_ate.get(guild_id, 0.0) > agora
+
+    def encerrar(self, guild_id):
+        self._raid_ate.pop(guild_id, None)
+        self._entradas.pop(guild_id, None)
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-16000',
+    'PRAGMA busy_timeout=5000'
+)
+
+
+class BancoAssincrono:
+    """Conexão SQLite única (WAL) cujas consultas rodam numa thread dedicada
+
+    Toda consulta passa pela mesma thread, então o loop do Discord nunca
+    espera por disco e a conexão (com seu cache de statements preparados)
+    é aberta uma única vez.
+    """
+
+    def __init__(self, caminho, cache_statements=256, max_lote=200):
+        self.caminho = caminho
+        self.cache_statements = cache_statements
+        self.max_lote = max_lote
+        self._conn = None
+        self._lote = []
+        self._tarefa_lote = None
+        self.lotes = 0
+        self.operacoes_agrupadas = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'sqlite-{caminho}')
+
+    def _conexao(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.caminho, check_same_thread=False, cached_statements=self.cache_statements)
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            self._conn = conn
+        return self._conn
+
+    def _rodar(self, funcao, args):
+        conn = self._conexao()
+        try:
+            resultado = funcao(conn, *args)
+            conn.commit()
+            return resultado
+        except Exception:
+            conn.rollback()
+            raise
+
+    async def executar(self, funcao, *args):
+        """Roda funcao(conn, *args) numa transação na thread do banco"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._rodar, funcao, args)
+
+    async def executar_agrupado(self, funcao, *args):
+        """Como executar(), mas junta as chamadas que chegam ao mesmo tempo num commit só
+
+        Cada chamada roda num SAVEPOINT próprio: uma exceção desfaz só ela e
+        volta para quem chamou, as outras do lote são gravadas normalmente.
+        Para operações pequenas e frequentes (transferências, compras).
+        """
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self._lote.append((funcao, args, futuro))
+        if self._tarefa_lote is None or self._tarefa_lote.done():
+            self._tarefa_lote = loop.create_task(self._esvaziar_lote())
+        return await futuro
+
+    async def _esvaziar_lote(self):
+        loop = asyncio.get_running_loop()
+        while self._lote:
+            lote, self._lote = self._lote[:self.max_lote], self._lote[self.max_lote:]
+            try:
+                resultados = await loop.run_in_executor(self._executor, self._rodar_lote, lote)
+            except Exception as e:
+                resultados = [(None, e)] * len(lote)
+            self.lotes += 1
+            self.operacoes_agrupadas += len(lote)
+            for (_, _, futuro), (resultado, erro) in zip(lote, resultados):
+                if futuro.done():
+                    continue
+                if erro is not None:
+                    futuro.set_exception(erro)
+                else:
+                    futuro.set_result(resultado)
+
+    def _rodar_lote(self, lote):
+        conn = self._conexao()
+        resultados = []
+        try:
+            if not conn.in_transaction:
+                conn.execute('BEGIN')
+            for funcao, args, _ in lote:
+                conn.execute('SAVEPOINT operacao')
+                try:
+                    resultados.append((funcao(conn, *args), None))
+                    conn.execute('RELEASE operacao')
+                except Exception as e:
+                    conn.execute('ROLLBACK TO operacao')
+                    conn.execute('RELEASE operacao')
+                    resultados.append((None, e))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return resultados
+
+    def executar_sincrono(self, funcao, *args):
+        """Como executar(), mas bloqueando; só para o desligamento, fora do loop"""
+        return self._executor.submit(self._rodar, funcao, args).result()
+
+    async def buscar_um(self, sql, params=()):
+        return await self.executar(lambda conn: conn.execute(sql, params).fetchone())
+
+    async def buscar_todos(self, sql, params=()):
+        return await self.executar(lambda conn: conn.execute(sql, params).fetchall())
+
+    async def alterar(self, sql, params=()):
+        """Executa um INSERT/UPDATE/DELETE e devolve o número de linhas afetadas"""
+        return await self.executar(lambda conn: conn.execute(sql, params).rowcount)
+
+    def fechar(self):
+        def _fechar():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        self._executor.submit(_fechar).result()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""Vazão do Agendador: agendar(), disparo de vencidos e tratadores travados
+
+Uso: python benchmarks/bench_agendador.py [quantidade]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agendador import Agendador, _inserir
+from banco import BancoAssincrono
+
+
+def _vencidos(conn, quantidade):
+    agora = time.time()
+    for i in range(quantidade):
+        _inserir(conn, '', agora - 1 - i % 100, 'teste', None)
+
+
+async def medir_agendar(banco, quantidade):
+    agendador = Agendador(banco)
+    inicio = time.perf_counter()
+    for i in range(quantidade):
+        await agendador.agendar(3600 + i, 'teste', {'i': i})
+    duracao = time.perf_counter() - inicio
+    print(f"agendar(): {quantidade} em {duracao:.2f}s ({quantidade / duracao:,.0f}/s)")
+
+
+async def medir_disparo(banco, quantidade):
+    await banco.executar(_vencidos, quantidade)
+    agendador = Agendador(banco)
+    feitos = asyncio.Event()
+    contador = [0]
+
+    async def tratador(dados, atraso):
+        contador[0] += 1
+        if contador[0] == quantidade:
+            feitos.set()
+
+    agendador.registrar('teste', tratador)
+    inicio = time.perf_counter()
+    agendador.iniciar()
+    await feitos.wait()
+    duracao = time.perf_counter() - inicio
+    await agendador.fechar()
+    print(f"disparo de vencidos: {quantidade} em {duracao:.2f}s ({quantidade / duracao:,.0f}/s)")
+
+
+async def medir_travados(banco, travados=20, normais=100, tempo_limite=1.0):
+    """`travados` tratadores que nunca terminam ocupam todas as vagas; os outros ainda disparam"""
+    agendador = Agendador(banco, concorrencia=travados, tempo_limite=tempo_limite)
+    feitos = asyncio.Event()
+    disparados = []
+
+    async def travado(dados, atraso):
+        await asyncio.Event().wait()
+
+    async def normal(dados, atraso):
+        disparados.append(dados)
+        if len(disparados) == normais:
+            feitos.set()
+
+    agendador.registrar('travado', travado)
+    agendador.registrar('normal', normal)
+    for i in range(travados):
+        await agendador.agendar(0, 'travado', None)
+    for i in range(normais):
+        await agendador.agendar(0, 'normal', i)
+    inicio = time.perf_counter()
+    agendador.iniciar()
+    await asyncio.wait_for(feitos.wait(), tempo_limite * 5)
+    duracao = time.perf_counter() - inicio
+    await agendador.fechar()
+    print(f"{travados} travados + {normais} normais: normais disparados em {duracao:.2f}s "
+          f"(tempo_limite {tempo_limite}s, falhas {agendador.falhas})")
+
+
+async def principal(quantidade):
+    with tempfile.TemporaryDirectory() as diretorio:
+        for medir in (medir_agendar, medir_disparo, medir_travados):
+            banco = BancoAssincrono(os.path.join(diretorio, f'{medir.__name__}.db'))
+            try:
+                await (medir(banco, quantidade) if medir is not medir_travados else medir(banco))
+            finally:
+                banco.fechar()
+
+
+if __name__ == '__main__':
+    asyncio.run(principal(int(sys.argv[1]) if len(sys.argv) > 1 else 100000))
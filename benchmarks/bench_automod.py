@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Automod com muitas palavras proibidas: any(word in content) x FiltroPalavras
+
+"antes" é o teste antigo do on_message (uma busca por palavra da lista em
+cada mensagem). "depois" usa o FiltroPalavras do CacheFiltros, também com
+palavra inteira e leetspeak ligados. Sem as opções, os dois precisam achar
+as mesmas mensagens.
+
+Uso: python benchmarks/bench_automod.py [termos] [mensagens]
+"""
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from automod import CacheFiltros
+
+VOCABULARIO = (
+    "oi tudo bem alguém joga hoje vamo de ranked kkkk mano que isso foi mal "
+    "partida servidor canal voz bora amanhã não sei talvez depois do almoço "
+    "boa noite galera valeu obrigado link evento sorteio nível moeda loja"
+).split()
+
+
+def _termos(quantidade, sorteio):
+    termos = set()
+    while len(termos) < quantidade:
+        termos.add(''.join(sorteio.choice(string.ascii_lowercase) for _ in range(sorteio.randint(5, 10))))
+    return sorted(termos)
+
+
+def _mensagens(quantidade, termos, sorteio, proporcao=0.02):
+    """Conversa comum de 3 a 25 palavras; `proporcao` das mensagens traz um termo proibido"""
+    mensagens = []
+    for _ in range(quantidade):
+        palavras = [sorteio.choice(VOCABULARIO) for _ in range(sorteio.randint(3, 25))]
+        if sorteio.random() < proporcao:
+            palavras.insert(sorteio.randrange(len(palavras) + 1), sorteio.choice(termos).upper())
+        mensagens.append(' '.join(palavras))
+    return mensagens
+
+
+def medir_antes(termos, mensagens):
+    inicio = time.perf_counter()
+    achadas = [any(word in content.lower() for word in termos) for content in mensagens]
+    return time.perf_counter() - inicio, achadas
+
+
+def medir_depois(termos, mensagens, **opcoes):
+    cache = CacheFiltros()
+    config = {'banned_words': termos, 'word_boundary': opcoes.get('palavra_inteira', False),
+              'leet': opcoes.get('leet', False)}
+    inicio = time.perf_counter()
+    cache.filtro(1, config)
+    compilacao = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    achadas = [cache.filtro(1, config).encontrar(content) is not None for content in mensagens]
+    return compilacao, time.perf_counter() - inicio, achadas
+
+
+def principal(quantidade_termos, quantidade_mensagens):
+    sorteio = random.Random(8)
+    termos = _termos(quantidade_termos, sorteio)
+    mensagens = _mensagens(quantidade_mensagens, termos, sorteio)
+
+    duracao, esperadas = medir_antes(termos, mensagens)
+    print(f"antes: {len(termos)} termos, {len(mensagens)} mensagens em {duracao:.2f}s "
+          f"({duracao / len(mensagens) * 1e6:,.0f} µs/mensagem), {sum(esperadas)} bloqueadas")
+
+    for opcoes in ({}, {'palavra_inteira': True}, {'palavra_inteira': True, 'leet': True}):
+        compilacao, duracao, achadas = medir_depois(termos, mensagens, **opcoes)
+        nome = '+'.join(opcoes) or 'substring'
+        diferentes = sum(1 for a, b in zip(achadas, esperadas) if a != b)
+        print(f"depois ({nome}): compilação {compilacao * 1000:.0f} ms, {duracao:.2f}s "
+              f"({duracao / len(mensagens) * 1e6:,.1f} µs/mensagem), {sum(achadas)} bloqueadas, "
+              f"{diferentes} diferentes do antes")
+
+
+if __name__ == '__main__':
+    argumentos = [int(a) for a in sys.argv[1:]]
+    quantidade_termos, quantidade_mensagens = argumentos + [10000, 5000][len(argumentos):]
+    principal(quantidade_termos, quantidade_mensagens)
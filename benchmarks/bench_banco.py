@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Comandos por segundo de daily/saldo: conexão por comando x RepositorioEconomia
+
+"antes" reproduz os comandos de bt.py antes do BancoAssincrono: um
+sqlite3.connect por invocação, tudo no loop. "depois" usa o
+RepositorioEconomia (uma conexão WAL, thread dedicada, commit em grupo).
+Também mede o maior atraso do loop enquanto os comandos rodam.
+
+Uso: python benchmarks/bench_banco.py [comandos] [usuarios]
+"""
+import asyncio
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from armazenamento import MotorSQLite, RepositorioEconomia
+
+
+def _criar_antigo(caminho):
+    conn = sqlite3.connect(caminho)
+    conn.execute('CREATE TABLE IF NOT EXISTS economy (user_id TEXT PRIMARY KEY, wallet INTEGER DEFAULT 0, '
+                 'bank INTEGER DEFAULT 0, last_daily TEXT)')
+    conn.commit()
+    conn.close()
+
+
+async def daily_antigo(caminho, user_id):
+    conn = sqlite3.connect(caminho)
+    cursor = conn.cursor()
+    cursor.execute('SELECT wallet, last_daily FROM economy WHERE user_id = ?', (user_id,))
+    result = cursor.fetchone()
+    now = datetime.datetime.now().isoformat()
+    coins = random.randint(150, 300)
+    if not result:
+        cursor.execute('INSERT INTO economy (user_id, wallet, last_daily) VALUES (?, ?, ?)', (user_id, coins, now))
+    elif not result[1] or (datetime.datetime.now() - datetime.datetime.fromisoformat(result[1])).days >= 1:
+        cursor.execute('UPDATE economy SET wallet = wallet + ?, last_daily = ? WHERE user_id = ?', (coins, now, user_id))
+    conn.commit()
+    conn.close()
+
+
+async def saldo_antigo(caminho, user_id):
+    conn = sqlite3.connect(caminho)
+    cursor = conn.cursor()
+    cursor.execute('SELECT wallet, bank FROM economy WHERE user_id = ?', (user_id,))
+    result = cursor.fetchone()
+    conn.close()
+    return result
+
+
+async def _batimento(atrasos, marca, intervalo=0.005):
+    while True:
+        marca[0] = time.perf_counter()
+        await asyncio.sleep(intervalo)
+        atrasos.append(time.perf_counter() - marca[0] - intervalo)
+
+
+async def _rodar(nome, comandos, usuarios, daily, saldo, concorrencia=50):
+    sorteio = random.Random(4)
+    restantes = iter(range(comandos))
+    atrasos = []
+    marca = [time.perf_counter()]
+
+    async def trabalhador():
+        for i in restantes:
+            user_id = str(sorteio.randrange(usuarios))
+            # Um daily para cada quatro consultas de saldo
+            await (daily(user_id) if i % 5 == 0 else saldo(user_id))
+
+    batimento = asyncio.ensure_future(_batimento(atrasos, marca))
+    await asyncio.sleep(0)
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+    # A batida que ainda não voltou também conta (o loop pode ter ficado preso até aqui)
+    atrasos.append(time.perf_counter() - marca[0] - 0.005)
+    batimento.cancel()
+    print(f"{nome}: {comandos} comandos em {duracao:.2f}s ({comandos / duracao:,.0f}/s), "
+          f"maior atraso do loop {max(atrasos, default=0) * 1000:.0f} ms")
+
+
+async def principal(comandos, usuarios):
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, 'antes.db')
+        _criar_antigo(caminho)
+        await _rodar("antes", comandos, usuarios,
+                     lambda user_id: daily_antigo(caminho, user_id),
+                     lambda user_id: saldo_antigo(caminho, user_id))
+
+        motor = MotorSQLite(os.path.join(diretorio, 'depois.db'), 'bot_data')
+        try:
+            economia = RepositorioEconomia(motor)
+            await _rodar("depois", comandos, usuarios,
+                         lambda user_id: economia.resgatar_daily(user_id, random.randint(150, 300)),
+                         economia.saldo)
+        finally:
+            motor.fechar()
+
+
+if __name__ == '__main__':
+    argumentos = [int(a) for a in sys.argv[1:]]
+    comandos, usuarios = argumentos + [20000, 5000][len(argumentos):]
+    asyncio.run(principal(comandos, usuarios))
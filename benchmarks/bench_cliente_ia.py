@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""Carga no ClienteIA contra um servidor falso de chat completions
+
+Mede vazão, reuso de conexões (keep-alive) e o maior atraso do loop com
+muitas chamadas em paralelo, com e sem streaming.
+
+Uso: python benchmarks/bench_cliente_ia.py [quantidade] [concorrencia] [latencia_ms]
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ia_cliente import ClienteIA
+
+PAYLOAD = {'model': 'deepseek-chat', 'messages': [{'role': 'user', 'content': 'oi'}]}
+
+
+def _servidor_falso(latencia):
+    async def completar(request):
+        payload = await request.json()
+        await asyncio.sleep(latencia)
+        if not payload.get('stream'):
+            return web.json_response({'choices': [{'message': {'content': 'resposta'}}]})
+        resposta = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await resposta.prepare(request)
+        for pedaco in ('res', 'pos', 'ta'):
+            evento = {'choices': [{'delta': {'content': pedaco}}]}
+            await resposta.write(f"data: {json.dumps(evento)}\n\n".encode())
+            await asyncio.sleep(latencia / 3)
+        await resposta.write(b"data: [DONE]\n\n")
+        return resposta
+
+    app = web.Application()
+    app.router.add_post('/v1/chat/completions', completar)
+    return app
+
+
+async def _batimento(atrasos, intervalo=0.01):
+    """Maior atraso do loop em relação ao `intervalo` pedido"""
+    while True:
+        inicio = time.perf_counter()
+        await asyncio.sleep(intervalo)
+        atrasos.append(time.perf_counter() - inicio - intervalo)
+
+
+async def medir(url, quantidade, concorrencia, streaming):
+    cliente = ClienteIA()
+    semaforo = asyncio.Semaphore(concorrencia)
+    atrasos = []
+
+    async def chamar():
+        async with semaforo:
+            if streaming:
+                return ''.join([pedaco async for pedaco in cliente.transmitir(url, 'chave', PAYLOAD)])
+            return await cliente.completar(url, 'chave', PAYLOAD)
+
+    batimento = asyncio.ensure_future(_batimento(atrasos))
+    inicio = time.perf_counter()
+    respostas = await asyncio.gather(*(chamar() for _ in range(quantidade)))
+    duracao = time.perf_counter() - inicio
+    batimento.cancel()
+    await cliente.fechar()
+
+    estatisticas = cliente.estatisticas()
+    erradas = sum(1 for resposta in respostas if resposta != 'resposta')
+    print(f"{'streaming' if streaming else 'completar'}: {quantidade} em {duracao:.2f}s "
+          f"({quantidade / duracao:,.0f}/s), erradas {erradas}, "
+          f"conexões novas {estatisticas['conexoes_novas']} / reusadas {estatisticas['conexoes_reusadas']}, "
+          f"handshake médio {estatisticas['handshake_medio_ms']:.1f} ms, "
+          f"maior atraso do loop {max(atrasos, default=0) * 1000:.0f} ms")
+
+
+async def principal(quantidade, concorrencia, latencia):
+    runner = web.AppRunner(_servidor_falso(latencia))
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    porta = runner.addresses[0][1]
+    url = f'http://127.0.0.1:{porta}/v1/chat/completions'
+    try:
+        for streaming in (False, True):
+            await medir(url, quantidade, concorrencia, streaming)
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == '__main__':
+    argumentos = [int(a) for a in sys.argv[1:]]
+    quantidade, concorrencia, latencia_ms = argumentos + [2000, 100, 50][len(argumentos):]
+    asyncio.run(principal(quantidade, concorrencia, latencia_ms / 1000))
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""Inventário com milhões de linhas: tabela sem chave x Inventario (chave composta + UPSERT)
+
+"antes" reproduz o /buy antigo do cong.py: SELECT por (user_id, item_id)
+numa tabela sem chave nem índice, UPDATE ou INSERT e commit. "depois" usa
+o SistemaEconomia do cong.py: /buy, /inventario (com e sem cache), um
+carrinho com todos os itens da loja, /daritem para um cargo inteiro e
+/novatemporada. Durante as duas operações em massa uma tarefa no loop faz
+um add_coins síncrono a cada 10 ms, como os comandos do bot, e mede o maior
+tempo que ele ficou preso esperando o lock de escrita do SQLite.
+
+cong.py cria o bot (e o imperio.db) ao ser importado: o script roda num
+diretório temporário com chaves falsas no ambiente e precisa do discord.py
+instalado.
+
+Uso: python benchmarks/bench_inventario.py [linhas] [compras]
+"""
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+GUILDS = 2
+ITENS = 4
+
+
+def _importar_cong(diretorio):
+    for chave in ('DISCORD_TOKEN', 'GROK_API_KEY', 'DEEPSEEK_API_KEY'):
+        os.environ.setdefault(chave, 'benchmark')
+    os.chdir(diretorio)
+    import cong
+    return cong
+
+
+def _linhas(usuarios):
+    """(guild_id, user_id, item_id, quantidade): todo usuário tem os 4 itens da loja em cada servidor"""
+    for guild_id in range(1, GUILDS + 1):
+        for user_id in range(usuarios):
+            for item_id in range(1, ITENS + 1):
+                yield guild_id, user_id, item_id, 1 + (user_id + item_id) % 5
+
+
+def medir_antes(diretorio, usuarios, compras):
+    conn = sqlite3.connect(os.path.join(diretorio, 'antes.db'))
+    conn.execute('CREATE TABLE inventario (user_id INTEGER, item_id INTEGER, quantidade INTEGER DEFAULT 1)')
+    # Sem servidor na chave: os usuários de cada servidor viram ids globais
+    conn.executemany('INSERT INTO inventario VALUES (?, ?, ?)',
+                     ((guild_id * usuarios + user_id, item_id, quantidade)
+                      for guild_id, user_id, item_id, quantidade in _linhas(usuarios)))
+    conn.commit()
+
+    sorteio = random.Random(25)
+    inicio = time.perf_counter()
+    for _ in range(compras):
+        user_id, item_id = sorteio.randrange(GUILDS * usuarios), sorteio.randint(1, ITENS)
+        cursor = conn.cursor()
+        cursor.execute('SELECT quantidade FROM inventario WHERE user_id = ? AND item_id = ?', (user_id, item_id))
+        if cursor.fetchone():
+            cursor.execute('UPDATE inventario SET quantidade = quantidade + 1 WHERE user_id = ? AND item_id = ?',
+                           (user_id, item_id))
+        else:
+            cursor.execute('INSERT INTO inventario (user_id, item_id) VALUES (?, ?)', (user_id, item_id))
+        conn.commit()
+    duracao = time.perf_counter() - inicio
+    conn.close()
+    print(f"antes: /buy {duracao / compras * 1000:.2f} ms por compra (tabela sem chave)")
+
+
+def _por_operacao(nome, quantidade, funcao):
+    inicio = time.perf_counter()
+    for i in range(quantidade):
+        funcao(i)
+    print(f"depois: {nome} {(time.perf_counter() - inicio) / quantidade * 1e6:,.0f} µs por operação")
+
+
+async def _com_escritor(economia, operacao):
+    """Roda a operação em massa com um add_coins síncrono no loop a cada 10 ms"""
+    pior = [0.0]
+    parar = asyncio.Event()
+
+    async def escritor():
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            economia.add_coins(1, 0, 1, 'benchmark')
+            pior[0] = max(pior[0], time.perf_counter() - inicio)
+            await asyncio.sleep(0.01)
+
+    tarefa = asyncio.ensure_future(escritor())
+    inicio = time.perf_counter()
+    resultado = await operacao
+    duracao = time.perf_counter() - inicio
+    parar.set()
+    await tarefa
+    return resultado, duracao, pior[0]
+
+
+def medir_depois(cong, usuarios, compras):
+    economia = cong.bot.economia
+    conn = cong.bot.conn
+    conn.executemany('INSERT INTO inventario (guild_id, user_id, item_id, quantidade) VALUES (?, ?, ?, ?)',
+                     _linhas(usuarios))
+    conn.commit()
+
+    sorteio = random.Random(25)
+    compradores = [(sorteio.randint(1, GUILDS), sorteio.randrange(usuarios)) for _ in range(compras)]
+    for guild_id, user_id in compradores:
+        economia.add_coins(guild_id, user_id, 10 ** 9)
+
+    _por_operacao("/buy", compras, lambda i: economia.comprar(*compradores[i], {sorteio.randint(1, ITENS): 1}, 10))
+    economia.inventario.esquecer()
+    _por_operacao("/inventario sem cache", compras, lambda i: economia.itens(*compradores[i]))
+    _por_operacao("/inventario em cache", compras, lambda i: economia.itens(*compradores[i]))
+    carrinho = {item_id: 2 for item_id in range(1, ITENS + 1)}
+    _por_operacao(f"carrinho de {ITENS} itens", compras, lambda i: economia.comprar(*compradores[i], carrinho, 80))
+
+    recebidos, duracao, pior = asyncio.run(_com_escritor(economia, economia.dar_item(1, range(usuarios), 1, 1)))
+    print(f"depois: /daritem para {recebidos} membros em {duracao * 1000:.0f} ms, "
+          f"add_coins no loop mais lento {pior * 1000:.0f} ms")
+
+    apagadas, duracao, pior = asyncio.run(_com_escritor(economia, economia.nova_temporada(2)))
+    print(f"depois: /novatemporada apagou {apagadas} linhas em {duracao * 1000:.0f} ms, "
+          f"add_coins no loop mais lento {pior * 1000:.0f} ms")
+
+
+def principal(linhas, compras):
+    usuarios = linhas // (GUILDS * ITENS)
+    with tempfile.TemporaryDirectory() as diretorio:
+        cong = _importar_cong(diretorio)
+        print(f"{usuarios * GUILDS * ITENS} linhas ({GUILDS} servidores, {usuarios} usuários, {ITENS} itens)")
+        medir_antes(diretorio, usuarios, max(compras // 50, 1))
+        medir_depois(cong, usuarios, compras)
+        cong.bot.conn.close()
+        os.chdir(RAIZ)
+
+
+if __name__ == '__main__':
+    argumentos = [int(a) for a in sys.argv[1:]]
+    linhas, compras = argumentos + [1800000, 2000][len(argumentos):]
+    principal(linhas, compras)
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""Replay de anti-link e anti-raid: custo por evento a 10k mensagens/s e 1k entradas/s
+
+Reproduz o caminho quente de on_message/on_member_join do cong.py sem o
+Discord: config do SistemaModeracao (cache em memória), contem_link e
+DetectorRaid. "antes" é o que cada evento custaria lendo a config da tabela
+a cada vez. O replay roda no ritmo pedido, em fatias de 10 ms, e mede a
+fração do loop gasta com os eventos e o maior atraso do loop.
+
+cong.py cria o bot (e o imperio.db) ao ser importado: o script roda num
+diretório temporário com chaves falsas no ambiente e precisa do discord.py
+instalado.
+
+Uso: python benchmarks/bench_moderacao.py [segundos] [mensagens_por_s] [entradas_por_s]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from automod import contem_link
+
+TEXTOS = [
+    "alguém joga hoje?", "kkkkkkk", "bom dia galera", "vou almoçar e já volto...",
+    "o preço é 2.50 na loja", "olha isso https://example.com/video", "entra aí discord.gg/abcdef",
+    "fim de papo. boa noite", "passa no www.site.com.br depois", "gg wp",
+]
+
+
+def _importar_cong(diretorio):
+    for chave in ('DISCORD_TOKEN', 'GROK_API_KEY', 'DEEPSEEK_API_KEY'):
+        os.environ.setdefault(chave, 'benchmark')
+    os.chdir(diretorio)
+    import cong
+    return cong
+
+
+def _eventos(segundos, mensagens_por_s, entradas_por_s, guilds=50):
+    """Fluxo de mensagens e entradas; o servidor 1 sofre um raid (uma entrada a cada 20)"""
+    sorteio = random.Random(9)
+    mensagens = [(sorteio.randrange(guilds) + 1, sorteio.choice(TEXTOS)) for _ in range(segundos * mensagens_por_s)]
+    entradas = [1 if i % 20 == 0 else sorteio.randrange(2, guilds + 1) for i in range(segundos * entradas_por_s)]
+    return mensagens, entradas
+
+
+def _ao_receber(moderacao):
+    def mensagem(guild_id, texto):
+        return moderacao.get_config(guild_id)["antilink"] and contem_link(texto)
+
+    def entrada(guild_id, agora):
+        return moderacao.get_config(guild_id)["antiraid"] and moderacao.raid.registrar(guild_id, agora)
+
+    return mensagem, entrada
+
+
+def _ao_receber_tabela(conn, raid):
+    """Mesmo caminho com um SELECT na config por evento"""
+    def config(guild_id):
+        return conn.execute('SELECT antiraid, antilink FROM config WHERE guild_id = ?', (guild_id,)).fetchone() or (0, 0)
+
+    def mensagem(guild_id, texto):
+        return config(guild_id)[1] and contem_link(texto)
+
+    def entrada(guild_id, agora):
+        return config(guild_id)[0] and raid.registrar(guild_id, agora)
+
+    return mensagem, entrada
+
+
+def medir_por_evento(nome, mensagens, entradas, mensagem, entrada):
+    inicio = time.perf_counter()
+    apagadas = sum(1 for guild_id, texto in mensagens if mensagem(guild_id, texto))
+    por_mensagem = (time.perf_counter() - inicio) / len(mensagens)
+
+    inicio = time.perf_counter()
+    agora = time.monotonic()
+    expulsos = sum(1 for i, guild_id in enumerate(entradas) if entrada(guild_id, agora + i * 0.001))
+    por_entrada = (time.perf_counter() - inicio) / len(entradas)
+    print(f"{nome}: {por_mensagem * 1e6:.2f} µs/mensagem ({apagadas} apagadas), "
+          f"{por_entrada * 1e6:.2f} µs/entrada ({expulsos} em raid)")
+
+
+async def replay(mensagens, entradas, segundos, mensagem, entrada, fatia=0.01):
+    """Entrega os eventos no ritmo real; mede o tempo gasto com eles e o atraso do loop"""
+    fatias = int(segundos / fatia)
+    por_fatia_m = len(mensagens) // fatias
+    por_fatia_e = len(entradas) // fatias
+    ocupado = 0.0
+    pior_atraso = 0.0
+    inicio = time.perf_counter()
+    for n in range(fatias):
+        alvo = inicio + n * fatia
+        atraso = time.perf_counter() - alvo
+        if atraso < 0:
+            await asyncio.sleep(-atraso)
+        else:
+            pior_atraso = max(pior_atraso, atraso)
+        comeco = time.perf_counter()
+        agora = time.monotonic()
+        for guild_id, texto in mensagens[n * por_fatia_m:(n + 1) * por_fatia_m]:
+            mensagem(guild_id, texto)
+        for guild_id in entradas[n * por_fatia_e:(n + 1) * por_fatia_e]:
+            entrada(guild_id, agora)
+        ocupado += time.perf_counter() - comeco
+        await asyncio.sleep(0)
+    duracao = time.perf_counter() - inicio
+    print(f"replay: {len(mensagens)} mensagens e {len(entradas)} entradas em {duracao:.2f}s, "
+          f"loop ocupado {ocupado / duracao:.1%}, maior atraso de fatia {pior_atraso * 1000:.1f} ms")
+
+
+def principal(segundos, mensagens_por_s, entradas_por_s):
+    with tempfile.TemporaryDirectory() as diretorio:
+        cong = _importar_cong(diretorio)
+        moderacao = cong.bot.moderacao
+        # Metade dos servidores com anti-link, todos com anti-raid
+        for guild_id in range(1, 51):
+            moderacao.set_config(guild_id, "antiraid", 1)
+            if guild_id % 2:
+                moderacao.set_config(guild_id, "antilink", 1)
+
+        mensagens, entradas = _eventos(segundos, mensagens_por_s, entradas_por_s)
+        medir_por_evento("antes (config da tabela)", mensagens, entradas,
+                         *_ao_receber_tabela(cong.bot.conn, cong.DetectorRaid()))
+        medir_por_evento("depois (config em cache)", mensagens, entradas, *_ao_receber(moderacao))
+
+        moderacao.raid = cong.DetectorRaid()
+        asyncio.run(replay(mensagens, entradas, segundos, *_ao_receber(moderacao)))
+        cong.bot.conn.close()
+        os.chdir(RAIZ)
+
+
+if __name__ == '__main__':
+    argumentos = [int(a) for a in sys.argv[1:]]
+    segundos, mensagens_por_s, entradas_por_s = argumentos + [5, 10000, 1000][len(argumentos):]
+    principal(segundos, mensagens_por_s, entradas_por_s)
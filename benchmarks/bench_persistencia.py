@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""Custo de gravar o estado: save_systems() antigo x lote do ArmazemSistemas
+
+O antigo regravava systems.json inteiro a cada resposta da IA; o lote do
+diário deve custar proporcional às chaves sujas, não ao tamanho do estado.
+
+Uso: python benchmarks/bench_persistencia.py [rodadas]
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from persistencia import ArmazemSistemas
+
+
+def _estado(usuarios):
+    """Formato de conversation_history/memory dos bots: algumas mensagens por usuário"""
+    conversas = {
+        str(user_id): [{"role": "user", "content": f"mensagem {i} do usuário {user_id}"} for i in range(6)]
+        for user_id in range(usuarios)
+    }
+    memoria = {str(user_id): {"nome": f"usuario{user_id}", "nivel": user_id % 50} for user_id in range(usuarios)}
+    return {'conversation_history': conversas, 'memory': memoria}
+
+
+def save_systems_antigo(caminho, secoes):
+    """O save_systems() de antes: json.dump de tudo a cada chamada"""
+    with open(caminho, 'w') as f:
+        json.dump(secoes, f)
+
+
+async def medir(diretorio, usuarios, sujos, rodadas):
+    secoes = _estado(usuarios)
+    caminho = os.path.join(diretorio, f'systems_{usuarios}_{sujos}.json')
+
+    inicio = time.perf_counter()
+    for _ in range(rodadas):
+        save_systems_antigo(caminho, secoes)
+    antigo = (time.perf_counter() - inicio) / rodadas
+
+    # Diário sem limite: mede só os lotes, sem compactação no meio. carregar() relê
+    # o systems.json que o save_systems acabou de gravar, com o mesmo estado
+    armazem = ArmazemSistemas(caminho, secoes, limite_diario=float('inf'))
+    armazem.carregar()
+    conversas = secoes['conversation_history']
+    inicio = time.perf_counter()
+    for rodada in range(rodadas):
+        for i in range(sujos):
+            chave = str((rodada * sujos + i) % usuarios)
+            conversas[chave].append({"role": "assistant", "content": "resposta"})
+            del conversas[chave][0]
+            armazem.marcar('conversation_history', chave)
+        await armazem.descarregar_async()
+    lote = (time.perf_counter() - inicio) / rodadas
+    armazem.descarregar()
+
+    print(f"{usuarios:>7} usuários, {sujos:>5} sujos: save_systems {antigo * 1000:8.1f} ms, "
+          f"lote do diário {lote * 1000:7.2f} ms")
+
+
+async def medir_compactacao(diretorio, usuarios=200000):
+    """Maior atraso do loop enquanto o diário é compactado em systems.json (no executor)"""
+    secoes = {'conversation_history': {}, 'memory': {}}
+    armazem = ArmazemSistemas(os.path.join(diretorio, 'compactar.json'), secoes, limite_diario=0)
+    # carregar() substitui o conteúdo das seções pelo arquivo: o estado entra depois
+    armazem.carregar()
+    for nome, dicionario in _estado(usuarios).items():
+        secoes[nome].update(dicionario)
+    armazem.marcar('memory', '0')
+    atrasos = []
+
+    async def batimento():
+        while True:
+            inicio = time.perf_counter()
+            await asyncio.sleep(0.005)
+            atrasos.append(time.perf_counter() - inicio - 0.005)
+
+    tarefa = asyncio.ensure_future(batimento())
+    inicio = time.perf_counter()
+    await armazem.descarregar_async()
+    duracao = time.perf_counter() - inicio
+    tarefa.cancel()
+    armazem.descarregar()
+    print(f"compactação de {usuarios} usuários: {duracao * 1000:.0f} ms, "
+          f"maior atraso do loop {max(atrasos, default=0) * 1000:.0f} ms")
+
+
+async def principal(rodadas):
+    with tempfile.TemporaryDirectory() as diretorio:
+        for usuarios in (1000, 10000, 100000):
+            for sujos in (10, 100, 1000):
+                await medir(diretorio, usuarios, sujos, rodadas)
+        await medir_compactacao(diretorio)
+
+
+if __name__ == '__main__':
+    asyncio.run(principal(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
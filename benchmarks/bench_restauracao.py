@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""Restauração de um servidor de 300 canais: loop sequencial antigo x RestauradorServidor
+
+O servidor falso responde cada chamada depois de `latencia` e devolve 429
+(com retry_after) acima de 50 requisições por segundo, como o limite global
+do Discord. "antes" reproduz o restaurar_backup antigo do cong.py (um await
+por vez e o sleep fixo de 5 s); "depois" usa o RestauradorServidor com o
+LimitadorTaxa padrão e também sem limitador, só com os retries de 429.
+
+Uso: python benchmarks/bench_restauracao.py [canais] [latencia_ms]
+"""
+import asyncio
+import collections
+import os
+import sys
+import time
+
+import discord
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from limitador import LimitadorTaxa
+from restauracao import RestauradorServidor, normalizar_backup, resumir
+
+
+class _Erro429(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"429 Too Many Requests (retry_after={retry_after:.2f})")
+        self.retry_after = retry_after
+
+
+class _Api:
+    """Latência fixa por chamada e um balde global de 50 req/s"""
+
+    def __init__(self, latencia, limite=50):
+        self.latencia = latencia
+        self.limite = limite
+        self.recentes = collections.deque()
+        self.chamadas = 0
+        self.recusadas = 0
+
+    async def chamar(self):
+        agora = time.monotonic()
+        while self.recentes and agora - self.recentes[0] >= 1.0:
+            self.recentes.popleft()
+        if len(self.recentes) >= self.limite:
+            self.recusadas += 1
+            raise _Erro429(1.0 - (agora - self.recentes[0]))
+        self.recentes.append(agora)
+        self.chamadas += 1
+        await asyncio.sleep(self.latencia)
+
+
+class _Cargo:
+    def __init__(self, api, guild, nome, posicao, padrao=False):
+        self.api = api
+        self.guild = guild
+        self.id = id(self)
+        self.name = nome
+        self.position = posicao
+        self.managed = False
+        self._padrao = padrao
+
+    def is_default(self):
+        return self._padrao
+
+    def __ge__(self, outro):
+        return self.position >= outro.position
+
+    def __lt__(self, outro):
+        return self.position < outro.position
+
+    def __hash__(self):
+        return self.id
+
+    async def delete(self):
+        await self.api.chamar()
+        self.guild.roles.remove(self)
+
+
+class _Canal:
+    def __init__(self, api, guild, nome, tipo, categoria=None):
+        self.api = api
+        self.guild = guild
+        self.id = id(self)
+        self.name = nome
+        self.type = tipo
+        self.category = categoria
+        self.mensagens = 0
+
+    async def delete(self):
+        await self.api.chamar()
+        self.guild.channels.remove(self)
+
+    async def send(self, embed=None):
+        await self.api.chamar()
+        self.mensagens += 1
+
+
+class _Servidor:
+    def __init__(self, api):
+        self.api = api
+        self.default_role = _Cargo(api, self, "@everyone", 0, padrao=True)
+        self.me = type('Membro', (), {'top_role': _Cargo(api, self, "bot", 1000)})()
+        self.roles = [self.default_role, self.me.top_role]
+        self.channels = []
+
+    @property
+    def categories(self):
+        return [canal for canal in self.channels if canal.type == "category"]
+
+    async def create_role(self, name, **opcoes):
+        await self.api.chamar()
+        cargo = _Cargo(self.api, self, name, len(self.roles))
+        self.roles.append(cargo)
+        return cargo
+
+    async def edit_role_positions(self, positions):
+        await self.api.chamar()
+
+    async def _criar(self, nome, tipo, category=None, **opcoes):
+        await self.api.chamar()
+        canal = _Canal(self.api, self, nome, tipo, category)
+        self.channels.append(canal)
+        return canal
+
+    async def create_category(self, nome, **opcoes):
+        return await self._criar(nome, "category", **opcoes)
+
+    async def create_text_channel(self, nome, **opcoes):
+        return await self._criar(nome, "text", **opcoes)
+
+    async def create_voice_channel(self, nome, **opcoes):
+        return await self._criar(nome, "voice", **opcoes)
+
+
+def _backup(canais, cargos=20, categorias=10, mensagens=5):
+    """Formato do cong.py: cargos com posição, canais com categoria e overwrites"""
+    return {
+        "cargos": [{"nome": f"cargo-{i}", "cor": 0x00ff00, "permissoes": 1024, "posicao": i + 1} for i in range(cargos)],
+        "canais": [
+            {"nome": f"categoria-{i}", "tipo": "category", "posicao": i, "categoria": None}
+            for i in range(categorias)
+        ] + [
+            {"nome": f"canal-{i}", "tipo": "text", "posicao": i, "categoria": f"categoria-{i % categorias}",
+             "topico": f"tópico {i}", "overwrites": {f"cargo-{i % cargos}": [1024, 0]},
+             "mensagens": [{"autor": "membro#0001", "conteudo": f"mensagem {j}", "timestamp": "2024-01-01"}
+                           for j in range(mensagens)]}
+            for i in range(canais)
+        ]
+    }
+
+
+async def _servidor_povoado(api, backup):
+    """Servidor com o conteúdo do backup já criado (a restauração apaga tudo antes)"""
+    guild = _Servidor(api)
+    latencia, api.latencia, api.limite = api.latencia, 0, float('inf')
+    for cargo in backup["cargos"]:
+        await guild.create_role(cargo["nome"])
+    for canal in backup["canais"]:
+        await guild._criar(canal["nome"], canal["tipo"])
+    api.latencia, api.limite, api.chamadas = latencia, 50, 0
+    api.recentes.clear()
+    return guild
+
+
+async def restaurar_antigo(guild, backup_data):
+    """O restaurar_backup de antes, sem a leitura do arquivo"""
+    for channel in list(guild.channels):
+        try:
+            await channel.delete()
+        except Exception:
+            continue
+    for role in list(guild.roles):
+        if role.name != "@everyone" and not role.managed and role is not guild.me.top_role:
+            try:
+                await role.delete()
+            except Exception:
+                continue
+    await asyncio.sleep(5)
+    for role_data in backup_data["cargos"]:
+        try:
+            await guild.create_role(name=role_data["nome"], color=discord.Color(role_data["cor"]),
+                                    permissions=discord.Permissions(role_data["permissoes"]))
+        except Exception:
+            continue
+    for channel_data in backup_data["canais"]:
+        try:
+            if channel_data["tipo"] == "text":
+                new_channel = await guild.create_text_channel(channel_data["nome"], position=channel_data["posicao"])
+                for msg_data in channel_data.get("mensagens", [])[:5]:
+                    try:
+                        embed = discord.Embed(description=msg_data["conteudo"], color=0x00ff00)
+                        embed.set_author(name=msg_data["autor"])
+                        embed.set_footer(text=f"Backup: {msg_data['timestamp']}")
+                        await new_channel.send(embed=embed)
+                    except Exception:
+                        continue
+            elif channel_data["tipo"] == "voice":
+                await guild.create_voice_channel(channel_data["nome"], position=channel_data["posicao"])
+        except Exception:
+            continue
+
+
+def _resultado(nome, api, guild, duracao):
+    mensagens = sum(canal.mensagens for canal in guild.channels)
+    print(f"{nome}: {duracao:.1f}s, {api.chamadas} chamadas ({api.chamadas / duracao:.0f}/s), "
+          f"{api.recusadas} respostas 429, {len(guild.channels)} canais, {len(guild.roles) - 2} cargos, "
+          f"{mensagens} mensagens")
+
+
+async def principal(canais, latencia):
+    backup = _backup(canais)
+
+    api = _Api(latencia)
+    guild = await _servidor_povoado(api, backup)
+    inicio = time.perf_counter()
+    await restaurar_antigo(guild, backup)
+    _resultado("antes (sequencial)", api, guild, time.perf_counter() - inicio)
+
+    for nome, limitador in (("depois (limitador 40 req/s)", LimitadorTaxa()),
+                            ("depois (sem limitador, só retry de 429)", LimitadorTaxa(taxa=1_000_000))):
+        api = _Api(latencia)
+        guild = await _servidor_povoado(api, backup)
+        inicio = time.perf_counter()
+        relatorio = await RestauradorServidor(limitador).restaurar(guild, normalizar_backup(backup))
+        _resultado(nome, api, guild, time.perf_counter() - inicio)
+        print(resumir(relatorio).replace("**", ""))
+
+
+if __name__ == '__main__':
+    argumentos = [int(a) for a in sys.argv[1:]]
+    canais, latencia_ms = argumentos + [300, 50][len(argumentos):]
+    asyncio.run(principal(canais, latencia_ms / 1000))
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""Firehose de mensagens no XP: add_xp antigo (commit por mensagem) x AcumuladorXP
+
+"antes" reproduz o SistemaEconomia.add_xp de cong.py antes do acumulador
+(UPDATE + SELECT + commit por mensagem). "depois" usa o AcumuladorXP de
+cong.py com o descarregar() periódico no meio. Os dois contam os level ups,
+que precisam ser iguais: o anúncio continua saindo na hora.
+
+cong.py cria o bot (e o imperio.db) ao ser importado: o script roda num
+diretório temporário com chaves falsas no ambiente e precisa do discord.py
+instalado.
+
+Uso: python benchmarks/bench_xp.py [mensagens] [usuarios]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+def _importar_cong(diretorio):
+    for chave in ('DISCORD_TOKEN', 'GROK_API_KEY', 'DEEPSEEK_API_KEY'):
+        os.environ.setdefault(chave, 'benchmark')
+    os.chdir(diretorio)
+    import cong
+    return cong
+
+
+def _mensagens(quantidade, usuarios, guilds=5):
+    sorteio = random.Random(5)
+    return [(sorteio.randrange(guilds) + 1, sorteio.randrange(usuarios), sorteio.randint(5, 15))
+            for _ in range(quantidade)]
+
+
+def medir_antes(diretorio, mensagens):
+    conn = sqlite3.connect(os.path.join(diretorio, 'antes.db'))
+    conn.execute('CREATE TABLE economia (user_id INTEGER PRIMARY KEY, coins INTEGER DEFAULT 100, '
+                 'daily_streak INTEGER DEFAULT 0, last_daily TEXT, xp INTEGER DEFAULT 0, level INTEGER DEFAULT 1)')
+    # Linhas já criadas: o add_xp antigo perdia a primeira mensagem de quem não tinha linha
+    conn.executemany('INSERT OR IGNORE INTO economia (user_id) VALUES (?)', [(user_id,) for _, user_id, _ in mensagens])
+    conn.commit()
+
+    def get_user_data(user_id):
+        resultado = conn.execute('SELECT * FROM economia WHERE user_id = ?', (user_id,)).fetchone()
+        if not resultado:
+            conn.execute('INSERT INTO economia (user_id) VALUES (?)', (user_id,))
+            conn.commit()
+            return (user_id, 100, 0, None, 0, 1)
+        return resultado
+
+    def add_xp(user_id, xp_amount):
+        conn.execute('UPDATE economia SET xp = xp + ? WHERE user_id = ?', (xp_amount, user_id))
+        dados = get_user_data(user_id)
+        xp_needed = dados[5] * 100
+        if dados[4] >= xp_needed:
+            conn.execute('UPDATE economia SET level = ?, xp = ? WHERE user_id = ?',
+                         (dados[5] + 1, dados[4] - xp_needed, user_id))
+            conn.commit()
+            return dados[5] + 1
+        conn.commit()
+        return None
+
+    inicio = time.perf_counter()
+    # A economia antiga era global: o servidor não entra na chave
+    level_ups = sum(1 for _, user_id, xp in mensagens if add_xp(user_id, xp))
+    duracao = time.perf_counter() - inicio
+    conn.close()
+    return duracao, level_ups
+
+
+def medir_depois(cong, mensagens, descarregar_a_cada=1000):
+    acumulador = cong.AcumuladorXP(cong.bot.conn)
+    pior_descarga = 0.0
+    level_ups = 0
+    inicio = time.perf_counter()
+    for i, (guild_id, user_id, xp) in enumerate(mensagens, 1):
+        if acumulador.adicionar(guild_id, user_id, xp):
+            level_ups += 1
+        if i % descarregar_a_cada == 0:
+            # No bot isso é a tarefa de `intervalo` segundos; aqui, a cada N mensagens
+            antes = time.perf_counter()
+            acumulador.descarregar()
+            pior_descarga = max(pior_descarga, time.perf_counter() - antes)
+    acumulador.descarregar()
+    return time.perf_counter() - inicio, level_ups, pior_descarga
+
+
+def principal(quantidade, usuarios):
+    with tempfile.TemporaryDirectory() as diretorio:
+        cong = _importar_cong(diretorio)
+        # Usuários diferentes por servidor no "depois" equivalem a usuários globais no "antes"
+        mensagens = _mensagens(quantidade, usuarios)
+        antigas = [(0, guild_id * usuarios + user_id, xp) for guild_id, user_id, xp in mensagens]
+
+        duracao, level_ups = medir_antes(diretorio, antigas)
+        print(f"antes: {quantidade} mensagens em {duracao:.2f}s ({quantidade / duracao:,.0f}/s), {level_ups} level ups")
+
+        duracao, level_ups, pior = medir_depois(cong, mensagens)
+        print(f"depois: {quantidade} mensagens em {duracao:.2f}s ({quantidade / duracao:,.0f}/s), {level_ups} level ups, "
+              f"descarga mais lenta {pior * 1000:.1f} ms")
+        cong.bot.conn.close()
+        os.chdir(RAIZ)
+
+
+if __name__ == '__main__':
+    argumentos = [int(a) for a in sys.argv[1:]]
+    quantidade, usuarios = argumentos + [50000, 2000][len(argumentos):]
+    principal(quantidade, usuarios)
@@ -1,16 +1,26 @@
 # -*- coding: utf-8 -*-
 import discord
 import asyncio
-import json
 import os
 import datetime
-import requests
 import random
-import sqlite3
 import time
 import re
 from discord import Game, Embed
 from discord.ext import commands
+from ia_cliente import cliente_ia
+from persistencia import ArmazemSistemas
+from banco import BancoAssincrono
+from agendador import Agendador, interpretar_duracao, formatar_duracao, tratadores_discord
+from automod import CacheFiltros, adicionar_palavras
+from historico import HistoricoConversas
+from prompt import MontadorPrompt
+from cache import CacheRespostas
+from roteador import RoteadorIA, provedores_padrao
+from restauracao import RestauradorServidor, normalizar_backup, resumir, resumir_plano, canal_resumo
+from snapshots import ArmazemSnapshots
+from extrato import Extrato
+from armazenamento import abrir, RepositorioEconomia
 
 # CONFIGURAÇÃO DO VILÃO - PYTHON 2.7 COMPATIBLE
 env_vars = {}
@@ -27,7 +37,15 @@ DISCORD_TOKEN = env_vars.get('DISCORD_TOKEN', '')
 DEEPSEEK_API_KEY = env_vars.get('DEEPSEEK_API_KEY', '')
 
 intents = discord.Intents.all()
-bot = commands.Bot(command_prefix='!', intents=intents)
+
+class BotPrefixo(commands.Bot):
+    async def close(self):
+        """Fecha o agendador e a sessão HTTP da IA antes de desconectar"""
+        await agendador.fechar()
+        await cliente_ia.fechar()
+        await super().close()
+
+bot = BotPrefixo(command_prefix='!', intents=intents)
 
 # SISTEMAS AVANÇADOS
 memory_storage = {}
@@ -43,52 +61,25 @@ custom_commands = {}
 poll_systems = {}
 
 # BANCO DE DADOS VILÃO
-def init_database():
-    conn = sqlite3.connect('villain_bot.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            user_id TEXT PRIMARY KEY,
-            level INTEGER DEFAULT 1,
-            xp INTEGER DEFAULT 0,
-            coins INTEGER DEFAULT 1000,
-            warnings INTEGER DEFAULT 0,
-            profile_data TEXT
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS economy (
-            user_id TEXT PRIMARY KEY,
-            wallet INTEGER DEFAULT 0,
-            bank INTEGER DEFAULT 0,
-            last_daily TEXT
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS moderation (
-            case_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT,
-            mod_id TEXT,
-            action TEXT,
-            reason TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
-
-init_database()
-
-def deepseek_chat(messages, user_id):
-    headers = {
-        'Authorization': 'Bearer ' + DEEPSEEK_API_KEY,
-        'Content-Type': 'application/json'
-    }
-    
+# Tabelas do esquema 'villain' (armazenamento.py); BANCO_URL no .env troca o SQLite por um Postgres
+motor = abrir(env_vars.get('BANCO_URL') or 'villain_bot.db', 'villain')
+db = motor.banco if motor.dialeto == 'sqlite' else BancoAssincrono('villain_bot.db')
+# Histórico de economy.wallet (lançamentos + checkpoints), só no SQLite
+economia = RepositorioEconomia(motor, Extrato('economy', 'wallet', ('user_id',)) if motor.dialeto == 'sqlite' else None)
+tarefa_extrato = None
+historico = HistoricoConversas(banco=db, bot='bot')
+agendador = Agendador(db, bot='bot')
+for tipo, tratador in tratadores_discord(bot).items():
+    agendador.registrar(tipo, tratador)
+montador_prompt = MontadorPrompt()
+respostas_ia = CacheRespostas()
+# DeepSeek e, com GROK_API_KEY no .env, o Grok como reserva (failover/hedge)
+roteador_ia = RoteadorIA(provedores_padrao(cliente_ia, DEEPSEEK_API_KEY, env_vars.get('GROK_API_KEY')))
+restaurador = RestauradorServidor()
+snapshots = ArmazemSnapshots('backups')
+
+async def deepseek_chat(messages, user_id, canal=None):
+    """Com `canal`, a resposta é transmitida aos poucos e enviada nele"""
     payload = {
         'model': 'deepseek-chat',
         'messages': messages,
@@ -98,56 +89,53 @@ def deepseek_chat(messages, user_id):
     }
     
     try:
-        response = requests.post('https://api.deepseek.com/v1/chat/completions', 
-                               json=payload, headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json()['choices'][0]['message']['content']
-        return "👍"
-    except:
-        return "Entendi!"
-
-def save_systems():
-    data = {
-        'memory': memory_storage,
-        'conversation_history': conversation_history,
-        'welcome_systems': welcome_systems,
-        'auto_moderations': auto_moderations,
-        'reaction_roles': reaction_roles,
-        'ticket_systems': ticket_systems,
-        'level_systems': level_systems,
-        'economy_systems': economy_systems,
-        'mod_logs': mod_logs,
-        'custom_commands': custom_commands,
-        'poll_systems': poll_systems
-    }
-    with open('systems.json', 'w') as f:
-        json.dump(data, f)
+        if canal is None:
+            content = await respostas_ia.obter(
+                respostas_ia.chave(messages),
+                lambda: roteador_ia.completar(payload)
+            )
+        else:
+            content = await roteador_ia.responder(canal, payload, respostas_ia)
+        if content is not None:
+            return content
+        resposta = "👍"
+    except Exception:
+        resposta = "Entendi!"
+    
+    if canal is not None:
+        await canal.send(resposta)
+    return resposta
+
+armazem = ArmazemSistemas('systems.json', {
+    'memory': memory_storage,
+    'conversation_history': conversation_history,
+    'welcome_systems': welcome_systems,
+    'auto_moderations': auto_moderations,
+    'reaction_roles': reaction_roles,
+    'ticket_systems': ticket_systems,
+    'level_systems': level_systems,
+    'economy_systems': economy_systems,
+    'mod_logs': mod_logs,
+    'custom_commands': custom_commands,
+    'poll_systems': poll_systems
+})
+
+filtros_automod = CacheFiltros()
 
 def load_systems():
-    global memory_storage, conversation_history, welcome_systems, auto_moderations
-    global reaction_roles, ticket_systems, level_systems, economy_systems
-    global mod_logs, custom_commands, poll_systems
-    
-    try:
-        with open('systems.json', 'r') as f:
-            data = json.load(f)
-            memory_storage = data.get('memory', {})
-            conversation_history = data.get('conversation_history', {})
-            welcome_systems = data.get('welcome_systems', {})
-            auto_moderations = data.get('auto_moderations', {})
-            reaction_roles = data.get('reaction_roles', {})
-            ticket_systems = data.get('ticket_systems', {})
-            level_systems = data.get('level_systems', {})
-            economy_systems = data.get('economy_systems', {})
-            mod_logs = data.get('mod_logs', {})
-            custom_commands = data.get('custom_commands', {})
-            poll_systems = data.get('poll_systems', {})
-    except:
-        pass
+    armazem.carregar()
+    # Históricos antigos do systems.json passam para o HistoricoConversas (SQLite)
+    for user_id in historico.importar(conversation_history):
+        armazem.marcar('conversation_history', user_id)
 
 @bot.event
 async def on_ready():
+    global tarefa_extrato
     load_systems()
+    armazem.iniciar()
+    agendador.iniciar()
+    if tarefa_extrato is None:
+        tarefa_extrato = asyncio.ensure_future(economia.manter())
     await bot.change_presence(activity=Game(name="!help | Modo Vilao"))
     print('BOT VILAO PROFISSIONAL ATIVADO! ' + bot.user.name)
 
@@ -161,42 +149,27 @@ async def on_message(message):
     
     # AUTO MODERAÇÃO
     if guild_id in auto_moderations and auto_moderations[guild_id].get('enabled'):
-        content = message.content.lower()
-        banned_words = auto_moderations[guild_id].get('banned_words', [])
-        if any(word in content for word in banned_words):
+        if filtros_automod.filtro(guild_id, auto_moderations[guild_id]).encontrar(message.content):
             await message.delete()
             await message.channel.send(message.author.mention + ' Mensagem removida por conter palavras proibidas!', delete_after=5)
     
     # RESPOSTA IA
     if bot.user.mentioned_in(message) or isinstance(message.channel, discord.DMChannel):
         user_id = str(message.author.id)
-        if user_id not in conversation_history:
-            conversation_history[user_id] = []
-        
-        user_history = conversation_history[user_id][-6:]
-        
-        messages = [
-            {"role": "system", "content": "Voce e um usuario normal do Discord. Responda de forma curta, natural e humana. Use ate 2 linhas. Sem emojis excessivos. Nao se identifique como IA."}
-        ]
-        
-        for msg in user_history:
-            role = "user" if msg['author'] == 'user' else "assistant"
-            messages.append({"role": role, "content": msg['content']})
+        user_history = await historico.recentes(user_id, 6)
         
         cleaned_content = message.content.replace('<@' + bot.user.id + '>', '').strip()
-        messages.append({"role": "user", "content": cleaned_content})
-        
-        response = deepseek_chat(messages, user_id)
         
-        conversation_history[user_id].append({"author": "user", "content": message.content})
-        conversation_history[user_id].append({"author": "bot", "content": response})
-        
-        if len(conversation_history[user_id]) > 30:
-            conversation_history[user_id] = conversation_history[user_id][-30:]
+        messages = montador_prompt.montar(
+            "Voce e um usuario normal do Discord. Responda de forma curta, natural e humana. Use ate 2 linhas. Sem emojis excessivos. Nao se identifique como IA.",
+            user_history,
+            cleaned_content
+        )
         
-        save_systems()
+        # A resposta é enviada aos poucos no canal enquanto a IA escreve
+        response = await deepseek_chat(messages, user_id, message.channel)
         
-        await message.channel.send(response)
+        await historico.adicionar(user_id, message.content, response)
     
     await bot.process_commands(message)
 
@@ -245,6 +218,11 @@ async def clear(ctx, amount: int = 10):
 @commands.has_permissions(manage_roles=True)
 async def mute(ctx, member: discord.Member, duration: str = "30m", reason="Sem motivo"):
     """SILENCIAR USUARIO"""
+    segundos = interpretar_duracao(duration)
+    if segundos is None:
+        await ctx.send("❌ Duracao invalida! Use por exemplo 30m, 2h ou 1d")
+        return
+    
     muted_role = discord.utils.get(ctx.guild.roles, name="Silenciado")
     if not muted_role:
         muted_role = await ctx.guild.create_role(name="Silenciado")
@@ -252,6 +230,7 @@ async def mute(ctx, member: discord.Member, duration: str = "30m", reason="Sem m
             await channel.set_permissions(muted_role, send_messages=False)
     
     await member.add_roles(muted_role, reason=reason)
+    await agendador.agendar(segundos, "desmutar", {"guild_id": ctx.guild.id, "user_id": member.id})
     embed = Embed(title="🔇 Usuario Silenciado", color=0x666666)
     embed.add_field(name="Usuario", value=member.mention, inline=True)
     embed.add_field(name="Duracao", value=duration, inline=True)
@@ -305,40 +284,12 @@ async def close(ctx):
 @bot.command()
 async def daily(ctx):
     """RESGATAR RECOMPENSA DIARIA"""
-    user_id = str(ctx.author.id)
-    conn = sqlite3.connect('villain_bot.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT wallet, last_daily FROM economy WHERE user_id = ?', (user_id,))
-    result = cursor.fetchone()
-    
-    now = datetime.datetime.now().isoformat()
+    amount = await economia.resgatar_daily(str(ctx.author.id), random.randint(80, 150), primeira=100)
     
-    if not result:
-        cursor.execute('INSERT INTO economy (user_id, wallet, last_daily) VALUES (?, ?, ?)', 
-                      (user_id, 100, now))
-        conn.commit()
-        await ctx.send("🎁 Recompensa diaria: **100 moedas**!")
+    if amount is None:
+        await ctx.send("⏰ Voce ja resgatou sua recompensa hoje!")
     else:
-        wallet, last_daily = result
-        if last_daily:
-            last_date = datetime.datetime.strptime(last_daily, '%Y-%m-%dT%H:%M:%S.%f')
-            if (datetime.datetime.now() - last_date).days >= 1:
-                amount = random.randint(80, 150)
-                cursor.execute('UPDATE economy SET wallet = wallet + ?, last_daily = ? WHERE user_id = ?',
-                              (amount, now, user_id))
-                conn.commit()
-                await ctx.send("🎁 Recompensa diaria: **" + str(amount) + " moedas**!")
-            else:
-                await ctx.send("⏰ Voce ja resgatou sua recompensa hoje!")
-        else:
-            amount = random.randint(80, 150)
-            cursor.execute('UPDATE economy SET wallet = wallet + ?, last_daily = ? WHERE user_id = ?',
-                          (amount, now, user_id))
-            conn.commit()
-            await ctx.send("🎁 Recompensa diaria: **" + str(amount) + " moedas**!")
-    
-    conn.close()
+        await ctx.send("🎁 Recompensa diaria: **" + str(amount) + " moedas**!")
 
 @bot.command()
 async def balance(ctx, member: discord.Member = None):
@@ -346,14 +297,7 @@ async def balance(ctx, member: discord.Member = None):
     target = member or ctx.author
     user_id = str(target.id)
     
-    conn = sqlite3.connect('villain_bot.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT wallet, bank FROM economy WHERE user_id = ?', (user_id,))
-    result = cursor.fetchone()
-    conn.close()
-    
-    wallet = result[0] if result else 0
-    bank = result[1] if result else 0
+    wallet, bank = await economia.saldo(user_id)
     
     embed = Embed(title="💰 Carteira de " + target.name, color=0xffd700)
     embed.add_field(name="Carteira", value="🪙 " + str(wallet), inline=True)
@@ -368,14 +312,7 @@ async def rank(ctx, member: discord.Member = None):
     target = member or ctx.author
     user_id = str(target.id)
     
-    conn = sqlite3.connect('villain_bot.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT level, xp FROM users WHERE user_id = ?', (user_id,))
-    result = cursor.fetchone()
-    conn.close()
-    
-    level = result[0] if result else 1
-    xp = result[1] if result else 0
+    level, xp = await economia.nivel(user_id)
     xp_needed = level * 100
     
     progress = (float(xp) / xp_needed) * 100 if xp_needed > 0 else 0
@@ -400,7 +337,7 @@ async def setwelcome(ctx, channel: discord.TextChannel, message):
         'channel_id': channel.id,
         'message': message
     }
-    save_systems()
+    armazem.marcar('welcome_systems', guild_id)
     await ctx.send("✅ Sistema de boas-vindas configurado!")
 
 # AUTO MODERAÇÃO
@@ -420,10 +357,19 @@ async def automod(ctx, action: str, words=None):
         await ctx.send("❌ Auto moderacao desativada!")
     elif action == "add" and words:
         banned_words = [word.strip().lower() for word in words.split(',')]
-        auto_moderations[guild_id]['banned_words'].extend(banned_words)
-        await ctx.send("✅ " + str(len(banned_words)) + " palavras adicionadas a lista negra!")
-    
-    save_systems()
+        adicionadas = adicionar_palavras(auto_moderations[guild_id]['banned_words'], banned_words)
+        await ctx.send("✅ " + str(adicionadas) + " palavras adicionadas a lista negra!")
+    elif action == "remove" and words:
+        removidas = set(word.strip().lower() for word in words.split(','))
+        auto_moderations[guild_id]['banned_words'] = [w for w in auto_moderations[guild_id]['banned_words'] if w not in removidas]
+        await ctx.send("✅ Palavras removidas da lista negra!")
+    elif action in ("boundary", "leet") and words in ("on", "off"):
+        chave = 'word_boundary' if action == "boundary" else 'leet'
+        auto_moderations[guild_id][chave] = words == "on"
+        await ctx.send("✅ Opcao `" + action + "` " + ("ativada" if words == "on" else "desativada") + "!")
+    
+    filtros_automod.invalidar(guild_id)
+    armazem.marcar('auto_moderations', guild_id)
 
 # SISTEMA DE PESQUISA
 @bot.command()
@@ -461,14 +407,25 @@ async def timer(ctx, seconds: int):
         await ctx.send("⏰ Timer maximo: 1 hora")
         return
     
+    await agendador.agendar(seconds, "lembrete", {
+        "canal_id": ctx.channel.id,
+        "mensagem": "🔔 " + ctx.author.mention + " Timer finalizado!"
+    })
     await ctx.send("⏰ Timer definido para " + str(seconds) + " segundos")
-    await asyncio.sleep(seconds)
-    await ctx.send("🔔 " + ctx.author.mention + " Timer finalizado!")
 
 @bot.command()
 async def remind(ctx, time: str, reminder):
     """DEFINIR LEMBRETE"""
-    await ctx.send("✅ Lembrete definido: '" + reminder + "' para " + time)
+    segundos = interpretar_duracao(time)
+    if segundos is None:
+        await ctx.send("❌ Tempo invalido! Use por exemplo 30m, 2h ou 1d")
+        return
+    
+    await agendador.agendar(segundos, "lembrete", {
+        "canal_id": ctx.channel.id,
+        "mensagem": "🔔 " + ctx.author.mention + " Lembrete: " + reminder
+    })
+    await ctx.send("✅ Lembrete definido: '" + reminder + "' para daqui a " + formatar_duracao(segundos))
 
 # SISTEMA DE DIVERSÃO
 @bot.command()
@@ -621,87 +578,42 @@ async def backup(ctx):
             }
             backup_data['channels'][str(channel.id)] = channel_data
     
-    # SALVAR BACKUP
-    filename = "backup_" + str(guild.id) + "_" + datetime.datetime.now().strftime('%Y%m%d_%H%M%S') + ".json"
-    with open(filename, 'w') as f:
-        json.dump(backup_data, f, indent=2)
-    
-    await ctx.send("✅ Backup completo salvo como `" + filename + "`!")
+    # SALVAR BACKUP (só o que mudou ocupa disco novo)
+    manifesto, inalterado = await asyncio.to_thread(snapshots.salvar, guild.id, guild.name, normalizar_backup(backup_data))
+    await asyncio.to_thread(snapshots.podar, guild.id)
+    if inalterado:
+        await ctx.send(f"✅ Nada mudou desde o backup `{manifesto['id']}`")
+    else:
+        await ctx.send(f"✅ Backup completo salvo como `{manifesto['id']}`!")
 
 @bot.command()
 @commands.has_permissions(administrator=True)
-async def restore(ctx, filename: str):
-    """RESTAURA BACKUP - DESTRÓI TUDO E RECRIA"""
+async def restore(ctx, filename: str, modo: str = "completo"):
+    """RESTAURA BACKUP - DESTRÓI TUDO E RECRIA (modo diff/simular: só as diferenças)"""
+    if modo not in ("completo", "diff", "simular"):
+        await ctx.send("❌ Modo invalido! Use `completo`, `diff` ou `simular`.")
+        return
+    
     try:
-        with open(filename, 'r') as f:
-            backup_data = json.load(f)
+        backup = await asyncio.to_thread(snapshots.carregar, ctx.guild.id, filename)
     except:
         await ctx.send("❌ Arquivo de backup nao encontrado!")
         return
     
     guild = ctx.guild
     
-    # DESTRUIR CANAIS EXISTENTES
-    for channel in list(guild.channels):
-        try:
-            await channel.delete()
-        except:
-            pass
-    
-    # DESTRUIR CARGOS EXISTENTES
-    for role in list(guild.roles):
-        if role.name != "@everyone" and not role.managed:
-            try:
-                await role.delete()
-            except:
-                pass
-    
-    await asyncio.sleep(2)
-    
-    # RECRIAR CARGOS
-    role_mapping = {}
-    for role_data in sorted(backup_data['roles'], key=lambda x: x['position']):
-        try:
-            new_role = await guild.create_role(
-                name=role_data['name'],
-                color=discord.Color(role_data['color']),
-                permissions=discord.Permissions(role_data['permissions'])
-            )
-            role_mapping[role_data['name']] = new_role
-        except:
-            pass
-    
-    # RECRIAR CANAIS
-    categories = {}
-    for channel_id, channel_data in backup_data['channels'].items():
-        try:
-            if channel_data.get('topic') is not None:  # Text channel
-                category_name = channel_data.get('category')
-                if category_name and category_name not in categories:
-                    categories[category_name] = await guild.create_category(category_name)
-                
-                category = categories.get(category_name)
-                await guild.create_text_channel(
-                    channel_data['name'],
-                    topic=channel_data.get('topic', ''),
-                    category=category,
-                    position=channel_data.get('position', 0)
-                )
-            else:  # Voice channel
-                category_name = channel_data.get('category')
-                if category_name and category_name not in categories:
-                    categories[category_name] = await guild.create_category(category_name)
-                
-                category = categories.get(category_name)
-                await guild.create_voice_channel(
-                    channel_data['name'],
-                    category=category,
-                    position=channel_data.get('position', 0)
-                )
-        except:
-            pass
-    
-    await ctx.send("✅ Servidor restaurado do backup com sucesso!")
+    if modo in ("diff", "simular"):
+        plano, relatorio = await restaurador.reconciliar(guild, backup, simular=modo == "simular")
+        if relatorio is None:
+            await ctx.send("🔍 Plano (nada foi alterado):\n" + resumir_plano(plano))
+            return
+    else:
+        # APAGAR E RECRIAR EM PARALELO (cargos -> categorias -> canais)
+        relatorio = await restaurador.restaurar(guild, backup)
+    
+    destino = canal_resumo(guild, ctx.channel)
+    if destino:
+        await destino.send("✅ Servidor restaurado do backup!\n" + resumir(relatorio))
 
 @bot.command()
 @commands.has_permissions(administrator=True)
@@ -771,4 +683,11 @@ async def guess(ctx):
 
 # INICIALIZAÇÃO DO BOT VILÃO
 if __name__ == "__main__":
-    bot.run(DISCORD_TOKEN)
+    try:
+        bot.run(DISCORD_TOKEN)
+    finally:
+        armazem.descarregar()
+        historico.descarregar()
+        db.fechar()
+        if motor.dialeto != 'sqlite':
+            motor.fechar()
@@ -1,16 +1,24 @@
 # -*- coding: utf-8 -*-
 import discord
 import asyncio
-import json
 import os
 import datetime
-import requests
 import random
-import sqlite3
 import time
 import aiohttp
 from discord import Game, Embed
 from discord.ext import commands
+from ia_cliente import cliente_ia
+from banco import BancoAssincrono
+from extrato import Extrato
+from armazenamento import abrir, RepositorioEconomia
+from agendador import Agendador, interpretar_duracao, formatar_duracao, tratadores_discord
+from historico import HistoricoConversas
+from prompt import MontadorPrompt
+from cache import CacheRespostas
+from roteador import RoteadorIA, provedores_padrao
+from restauracao import RestauradorServidor, normalizar_backup, resumir, resumir_plano, canal_resumo
+from snapshots import ArmazemSnapshots
 
 # CONFIGURAÇÃO
 env_vars = {}
@@ -27,10 +35,17 @@ DISCORD_TOKEN = env_vars.get('DISCORD_TOKEN', '')
 DEEPSEEK_API_KEY = env_vars.get('DEEPSEEK_API_KEY', '')
 
 intents = discord.Intents.all()
-bot = commands.Bot(command_prefix='!', intents=intents, help_command=None)
+
+class BotPrefixo(commands.Bot):
+    async def close(self):
+        """Fecha o agendador e a sessão HTTP da IA antes de desconectar"""
+        await agendador.fechar()
+        await cliente_ia.fechar()
+        await super().close()
+
+bot = BotPrefixo(command_prefix='!', intents=intents, help_command=None)
 
 # SISTEMAS
-conversation_history = {}
 user_profiles = {}
 server_configs = {}
 welcome_systems = {}
@@ -41,40 +56,30 @@ economy_system = {}
 mod_logs = {}
 
 # BANCO DE DADOS
-def init_db():
-    conn = sqlite3.connect('bot_data.db')
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            user_id TEXT PRIMARY KEY,
-            level INTEGER DEFAULT 1,
-            xp INTEGER DEFAULT 0,
-            coins INTEGER DEFAULT 1000,
-            warnings INTEGER DEFAULT 0
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS economy (
-            user_id TEXT PRIMARY KEY,
-            wallet INTEGER DEFAULT 0,
-            bank INTEGER DEFAULT 0,
-            last_daily TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-init_db()
-
-def deepseek_chat(messages, user_id):
-    if not DEEPSEEK_API_KEY:
+# Mesmo bot_data.db (e mesmo esquema) do bt.py; BANCO_URL no .env troca por um Postgres
+motor = abrir(env_vars.get('BANCO_URL') or 'bot_data.db', 'bot_data')
+db = motor.banco if motor.dialeto == 'sqlite' else BancoAssincrono('bot_data.db')
+# O extrato de economy.wallet é o mesmo do bt.py: daily e loteria daqui também lançam nele
+economia = RepositorioEconomia(motor, Extrato('economy', 'wallet', ('user_id',)) if motor.dialeto == 'sqlite' else None)
+tarefa_extrato = None
+historico = HistoricoConversas(banco=db, bot='bot7')
+agendador = Agendador(db, bot='bot7')
+for tipo, tratador in tratadores_discord(bot).items():
+    agendador.registrar(tipo, tratador)
+montador_prompt = MontadorPrompt()
+respostas_ia = CacheRespostas()
+# DeepSeek e, com GROK_API_KEY no .env, o Grok como reserva (failover/hedge)
+roteador_ia = RoteadorIA(provedores_padrao(cliente_ia, DEEPSEEK_API_KEY, env_vars.get('GROK_API_KEY')))
+restaurador = RestauradorServidor()
+snapshots = ArmazemSnapshots('backups')
+
+async def deepseek_chat(messages, user_id, canal=None):
+    """Com `canal`, a resposta é transmitida aos poucos e enviada nele"""
+    if not roteador_ia.provedores:
+        if canal is not None:
+            await canal.send("Sim!")
         return "Sim!"
     
-    headers = {
-        'Authorization': 'Bearer ' + DEEPSEEK_API_KEY,
-        'Content-Type': 'application/json'
-    }
-    
     payload = {
         'model': 'deepseek-chat',
         'messages': messages,
@@ -84,16 +89,29 @@ def deepseek_chat(messages, user_id):
     }
     
     try:
-        response = requests.post('https://api.deepseek.com/v1/chat/completions', 
-                               json=payload, headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json()['choices'][0]['message']['content']
-        return "👍"
-    except:
-        return "Entendi!"
+        if canal is None:
+            content = await respostas_ia.obter(
+                respostas_ia.chave(messages),
+                lambda: roteador_ia.completar(payload)
+            )
+        else:
+            content = await roteador_ia.responder(canal, payload, respostas_ia)
+        if content is not None:
+            return content
+        resposta = "👍"
+    except Exception:
+        resposta = "Entendi!"
+    
+    if canal is not None:
+        await canal.send(resposta)
+    return resposta
 
 @bot.event
 async def on_ready():
+    global tarefa_extrato
+    agendador.iniciar()
+    if tarefa_extrato is None:
+        tarefa_extrato = asyncio.ensure_future(economia.manter())
     print(f'🤖 BOT VILÃO ATIVADO: {bot.user.name}')
     await bot.change_presence(activity=Game(name="!comandos | 30+ Recursos"))
 
@@ -105,32 +123,21 @@ async def on_message(message):
     # RESPOSTA IA CORRIGIDA
     if bot.user.mentioned_in(message):
         user_id = str(message.author.id)
-        if user_id not in conversation_history:
-            conversation_history[user_id] = []
-        
-        user_history = conversation_history[user_id][-6:]
-        
-        messages = [
-            {"role": "system", "content": "Você é um usuário normal do Discord. Responda de forma curta e natural como uma pessoa. Use gírias brasileiras."}
-        ]
-        
-        for msg in user_history:
-            role = "user" if msg['author'] == 'user' else "assistant"
-            messages.append({"role": role, "content": msg['content']})
+        user_history = await historico.recentes(user_id, 6)
         
         # CORREÇÃO AQUI - converter ID para string
         cleaned_content = message.content.replace(f'<@{bot.user.id}>', '').strip()
-        messages.append({"role": "user", "content": cleaned_content})
-        
-        response = deepseek_chat(messages, user_id)
         
-        conversation_history[user_id].append({"author": "user", "content": message.content})
-        conversation_history[user_id].append({"author": "bot", "content": response})
+        messages = montador_prompt.montar(
+            "Você é um usuário normal do Discord. Responda de forma curta e natural como uma pessoa. Use gírias brasileiras.",
+            user_history,
+            cleaned_content
+        )
         
-        if len(conversation_history[user_id]) > 30:
-            conversation_history[user_id] = conversation_history[user_id][-30:]
+        # A resposta é enviada aos poucos no canal enquanto a IA escreve
+        response = await deepseek_chat(messages, user_id, message.channel)
         
-        await message.channel.send(response)
+        await historico.adicionar(user_id, message.content, response)
     
     await bot.process_commands(message)
 
@@ -169,6 +176,11 @@ async def clear(ctx, amount: int = 10):
 @commands.has_permissions(manage_roles=True)
 async def mute(ctx, member: discord.Member, tempo: str = "30m"):
     """Silenciar usuário temporariamente"""
+    segundos = interpretar_duracao(tempo)
+    if segundos is None:
+        await ctx.send("❌ Tempo inválido! Use por exemplo `30m`, `2h` ou `1d`")
+        return
+    
     muted_role = discord.utils.get(ctx.guild.roles, name="Silenciado")
     if not muted_role:
         muted_role = await ctx.guild.create_role(name="Silenciado")
@@ -176,7 +188,8 @@ async def mute(ctx, member: discord.Member, tempo: str = "30m"):
             await channel.set_permissions(muted_role, send_messages=False)
     
     await member.add_roles(muted_role)
-    await ctx.send(f"🔇 {member.mention} foi silenciado por {tempo}")
+    await agendador.agendar(segundos, "desmutar", {"guild_id": ctx.guild.id, "user_id": member.id})
+    await ctx.send(f"🔇 {member.mention} foi silenciado por {formatar_duracao(segundos)}")
 
 @bot.command()
 @commands.has_permissions(manage_roles=True)
@@ -213,7 +226,8 @@ async def backup(ctx):
         channel_data = {
             'name': channel.name,
             'type': str(channel.type),
-            'position': channel.position
+            'position': channel.position,
+            'category': channel.category.name if channel.category else None
         }
         if isinstance(channel, discord.TextChannel):
             channel_data['topic'] = channel.topic
@@ -229,60 +243,38 @@ async def backup(ctx):
             'url': str(emoji.url)
         })
     
-    filename = f"backup_{guild.id}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(backup_data, f, indent=2, ensure_ascii=False)
-    
-    await ctx.send(f"✅ Backup completo salvo como `{filename}`")
+    manifesto, inalterado = await asyncio.to_thread(snapshots.salvar, guild.id, guild.name, normalizar_backup(backup_data))
+    await asyncio.to_thread(snapshots.podar, guild.id)
+    if inalterado:
+        await ctx.send(f"✅ Nada mudou desde o backup `{manifesto['id']}`")
+    else:
+        await ctx.send(f"✅ Backup completo salvo como `{manifesto['id']}`!")
 
 @bot.command()
 @commands.has_permissions(administrator=True)
-async def restore(ctx, filename: str):
-    """Restaurar servidor do backup"""
+async def restore(ctx, filename: str, modo: str = "completo"):
+    """Restaurar servidor do backup (modo diff/simular: só as diferenças)"""
+    if modo not in ("completo", "diff", "simular"):
+        await ctx.send("❌ Modo inválido! Use `completo`, `diff` ou `simular`.")
+        return
+    
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            backup_data = json.load(f)
+        backup = await asyncio.to_thread(snapshots.carregar, ctx.guild.id, filename)
         
         guild = ctx.guild
         
-        # Deletar canais existentes
-        for channel in guild.channels:
-            try:
-                await channel.delete()
-            except:
-                pass
-        
-        await asyncio.sleep(2)
-        
-        # Recriar cargos
-        for role_data in backup_data['roles']:
-            try:
-                await guild.create_role(
-                    name=role_data['name'],
-                    color=discord.Color(role_data['color']),
-                    permissions=discord.Permissions(role_data['permissions'])
-                )
-            except:
-                pass
-        
-        # Recriar canais
-        for channel_data in backup_data['channels']:
-            try:
-                if channel_data['type'] == 'text':
-                    await guild.create_text_channel(
-                        name=channel_data['name'],
-                        topic=channel_data.get('topic', '')
-                    )
-                elif channel_data['type'] == 'voice':
-                    await guild.create_voice_channel(
-                        name=channel_data['name'],
-                        bitrate=channel_data.get('bitrate', 64000),
-                        user_limit=channel_data.get('user_limit', 0)
-                    )
-            except:
-                pass
+        if modo in ("diff", "simular"):
+            plano, relatorio = await restaurador.reconciliar(guild, backup, simular=modo == "simular")
+            if relatorio is None:
+                await ctx.send("🔍 Plano (nada foi alterado):\n" + resumir_plano(plano))
+                return
+        else:
+            # Cargos existentes são mantidos; canais são apagados e recriados
+            relatorio = await restaurador.restaurar(guild, backup, apagar_cargos=False)
         
-        await ctx.send("✅ Servidor restaurado com sucesso!")
+        destino = canal_resumo(guild, ctx.channel)
+        if destino:
+            await destino.send("✅ Servidor restaurado!\n" + resumir(relatorio))
     except Exception as e:
         await ctx.send(f"❌ Erro ao restaurar: {str(e)}")
 
@@ -312,39 +304,12 @@ async def unlock(ctx):
 @bot.command()
 async def daily(ctx):
     """Resgatar recompensa diária"""
-    user_id = str(ctx.author.id)
-    conn = sqlite3.connect('bot_data.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT wallet, last_daily FROM economy WHERE user_id = ?', (user_id,))
-    result = cursor.fetchone()
+    coins = await economia.resgatar_daily(str(ctx.author.id), random.randint(100, 200))
     
-    now = datetime.datetime.now().isoformat()
-    
-    if not result:
-        coins = random.randint(100, 200)
-        cursor.execute('INSERT INTO economy (user_id, wallet, last_daily) VALUES (?, ?, ?)', 
-                      (user_id, coins, now))
-        await ctx.send(f"🎁 Recompensa diária: **{coins} moedas**!")
+    if coins is None:
+        await ctx.send("⏰ Você já resgatou hoje! Volte amanhã.")
     else:
-        wallet, last_daily = result
-        if last_daily:
-            last_date = datetime.datetime.fromisoformat(last_daily)
-            if (datetime.datetime.now() - last_date).days >= 1:
-                coins = random.randint(100, 200)
-                cursor.execute('UPDATE economy SET wallet = wallet + ?, last_daily = ? WHERE user_id = ?',
-                              (coins, now, user_id))
-                await ctx.send(f"🎁 Recompensa diária: **{coins} moedas**!")
-            else:
-                await ctx.send("⏰ Você já resgatou hoje! Volte amanhã.")
-        else:
-            coins = random.randint(100, 200)
-            cursor.execute('UPDATE economy SET wallet = wallet + ?, last_daily = ? WHERE user_id = ?',
-                          (coins, now, user_id))
-            await ctx.send(f"🎁 Recompensa diária: **{coins} moedas**!")
-    
-    conn.commit()
-    conn.close()
+        await ctx.send(f"🎁 Recompensa diária: **{coins} moedas**!")
 
 @bot.command()
 async def balance(ctx, member: discord.Member = None):
@@ -352,14 +317,7 @@ async def balance(ctx, member: discord.Member = None):
     target = member or ctx.author
     user_id = str(target.id)
     
-    conn = sqlite3.connect('bot_data.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT wallet, bank FROM economy WHERE user_id = ?', (user_id,))
-    result = cursor.fetchone()
-    conn.close()
-    
-    wallet = result[0] if result else 0
-    bank = result[1] if result else 0
+    wallet, bank = await economia.saldo(user_id)
     
     embed = Embed(title=f"💰 Carteira de {target.name}", color=0xffd700)
     embed.add_field(name="💳 Carteira", value=f"**{wallet}** moedas", inline=True)
@@ -373,14 +331,7 @@ async def rank(ctx, member: discord.Member = None):
     target = member or ctx.author
     user_id = str(target.id)
     
-    conn = sqlite3.connect('bot_data.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT level, xp FROM users WHERE user_id = ?', (user_id,))
-    result = cursor.fetchone()
-    conn.close()
-    
-    level = result[0] if result else 1
-    xp = result[1] if result else 0
+    level, xp = await economia.nivel(user_id)
     xp_needed = level * 100
     
     embed = Embed(title=f"🏅 Rank de {target.name}", color=0x00ff00)
@@ -390,25 +341,7 @@ async def rank(ctx, member: discord.Member = None):
     await ctx.send(embed=embed)
 
 # 🎮 JOGOS E DIVERSÃO
-@bot.command()
-async def loteria(ctx, aposta: int = 100):
-    """Jogar na loteria"""
-    if aposta < 10:
-        await ctx.send("❌ Aposta mínima: 10 moedas")
-        return
-    
-    user_id = str(ctx.author.id)
-    conn = sqlite3.connect('bot_data.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT wallet FROM economy WHERE user_id = ?', (user_id,))
-    result = cursor.fetchone()
-    
-    if not result or result[0] < aposta:
-        await ctx.send("❌ Moedas insuficientes!")
-        conn.close()
-        return
-    
-    # Sorteio
+def sortear_loteria(aposta):
     numeros = [random.randint(1, 50) for _ in range(5)]
     meus_numeros = [random.randint(1, 50) for _ in range(5)]
     
@@ -430,13 +363,20 @@ async def loteria(ctx, aposta: int = 100):
         premio = 0
         mensagem = "😢 Nenhum número correto..."
     
-    if premio > 0:
-        cursor.execute('UPDATE economy SET wallet = wallet + ? WHERE user_id = ?', (premio - aposta, user_id))
-    else:
-        cursor.execute('UPDATE economy SET wallet = wallet - ? WHERE user_id = ?', (aposta, user_id))
+    return numeros, meus_numeros, premio, mensagem
+
+@bot.command()
+async def loteria(ctx, aposta: int = 100):
+    """Jogar na loteria"""
+    if aposta < 10:
+        await ctx.send("❌ Aposta mínima: 10 moedas")
+        return
+    
+    numeros, meus_numeros, premio, mensagem = sortear_loteria(aposta)
     
-    conn.commit()
-    conn.close()
+    if await economia.apostar(str(ctx.author.id), aposta, premio) is None:
+        await ctx.send("❌ Moedas insuficientes!")
+        return
     
     embed = Embed(title="🎰 LOTERIA", color=0x9b59b6)
     embed.add_field(name="Seus números", value=", ".join(map(str, meus_numeros)), inline=False)
@@ -574,15 +514,25 @@ async def timer(ctx, segundos: int):
         await ctx.send("⏰ Máximo: 3600 segundos (1 hora)")
         return
     
+    await agendador.agendar(segundos, "lembrete", {
+        "canal_id": ctx.channel.id,
+        "mensagem": f"🔔 {ctx.author.mention} Timer finalizado!"
+    })
     await ctx.send(f"⏰ Timer de {segundos} segundos iniciado!")
-    await asyncio.sleep(segundos)
-    await ctx.send(f"🔔 {ctx.author.mention} Timer finalizado!")
 
 @bot.command()
 async def lembrete(ctx, tempo: str, *, mensagem: str):
     """Definir lembrete"""
-    await ctx.send(f"✅ Lembrete definido: '{mensagem}' para {tempo}")
-    # Implementar parser de tempo mais avançado
+    segundos = interpretar_duracao(tempo)
+    if segundos is None:
+        await ctx.send("❌ Tempo inválido! Use por exemplo `30m`, `2h` ou `1d`")
+        return
+    
+    await agendador.agendar(segundos, "lembrete", {
+        "canal_id": ctx.channel.id,
+        "mensagem": f"🔔 {ctx.author.mention} Lembrete: {mensagem}"
+    })
+    await ctx.send(f"✅ Lembrete definido: '{mensagem}' para daqui a {formatar_duracao(segundos)}")
 
 @bot.command()
 async def clima(ctx, *, cidade: str):
@@ -724,6 +674,12 @@ async def ping(ctx):
 # INICIAR BOT
 if __name__ == "__main__":
     if DISCORD_TOKEN:
-        bot.run(DISCORD_TOKEN)
+        try:
+            bot.run(DISCORD_TOKEN)
+        finally:
+            historico.descarregar()
+            db.fechar()
+            if motor.dialeto != 'sqlite':
+                motor.fechar()
     else:
         print("❌ Token do Discord não encontrado no arquivo .env")
@@ -4,14 +4,21 @@ import asyncio
 import json
 import os
 import datetime
-import requests
 import random
-import sqlite3
 import time
 import aiohttp
 import urllib.parse
 from discord import Game, Embed
 from discord.ext import commands
+from ia_cliente import cliente_ia
+from banco import BancoAssincrono
+from extrato import Extrato
+from armazenamento import abrir, RepositorioEconomia
+from agendador import Agendador, tratadores_discord
+from historico import HistoricoConversas
+from prompt import MontadorPrompt
+from cache import CacheRespostas
+from roteador import RoteadorIA, provedores_padrao
 
 # CONFIGURAÇÃO
 env_vars = {}
@@ -28,59 +35,42 @@ DISCORD_TOKEN = env_vars.get('DISCORD_TOKEN', '')
 DEEPSEEK_API_KEY = env_vars.get('DEEPSEEK_API_KEY', '')
 
 intents = discord.Intents.all()
-bot = commands.Bot(command_prefix='!', intents=intents, help_command=None)
+
+class BotPrefixo(commands.Bot):
+    async def close(self):
+        """Fecha o agendador e a sessão HTTP da IA antes de desconectar"""
+        await agendador.fechar()
+        await cliente_ia.fechar()
+        await super().close()
+
+bot = BotPrefixo(command_prefix='!', intents=intents, help_command=None)
 
 # SISTEMAS
-conversation_history = {}
 user_profiles = {}
 
 # BANCO DE DADOS
-def init_db():
-    conn = sqlite3.connect('bot_data.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            user_id TEXT PRIMARY KEY,
-            level INTEGER DEFAULT 1,
-            xp INTEGER DEFAULT 0,
-            coins INTEGER DEFAULT 1000,
-            warnings INTEGER DEFAULT 0
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS economy (
-            user_id TEXT PRIMARY KEY,
-            wallet INTEGER DEFAULT 0,
-            bank INTEGER DEFAULT 0,
-            last_daily TEXT
-        )
-    ''')
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS server_config (
-            guild_id TEXT PRIMARY KEY,
-            welcome_channel TEXT,
-            mod_log_channel TEXT,
-            auto_mod BOOLEAN DEFAULT 0
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
-
-init_db()
-
-def deepseek_chat(messages, user_id):
-    """Sistema de IA melhorado com fallback"""
-    if not DEEPSEEK_API_KEY:
-        return get_fallback_response(messages[-1]["content"])
-    
-    headers = {
-        'Authorization': f'Bearer {DEEPSEEK_API_KEY}',
-        'Content-Type': 'application/json'
-    }
+# BANCO_URL no .env (postgres://...) leva a economia para o Postgres; sem ele, bot_data.db
+motor = abrir(env_vars.get('BANCO_URL') or 'bot_data.db', 'bot_data')
+db = motor.banco if motor.dialeto == 'sqlite' else BancoAssincrono('bot_data.db')
+# Histórico de economy.wallet (lançamentos + checkpoints), só no SQLite
+economia = RepositorioEconomia(motor, Extrato('economy', 'wallet', ('user_id',)) if motor.dialeto == 'sqlite' else None)
+historico = HistoricoConversas(max_turnos=20, banco=db, bot='bt')
+agendador = Agendador(db, bot='bt')
+tarefa_extrato = None
+for tipo, tratador in tratadores_discord(bot).items():
+    agendador.registrar(tipo, tratador)
+montador_prompt = MontadorPrompt()
+respostas_ia = CacheRespostas()
+# DeepSeek e, com GROK_API_KEY no .env, o Grok como reserva (failover/hedge)
+roteador_ia = RoteadorIA(provedores_padrao(cliente_ia, DEEPSEEK_API_KEY, env_vars.get('GROK_API_KEY')))
+
+async def deepseek_chat(messages, user_id, canal=None):
+    """Sistema de IA melhorado com fallback; com `canal`, a resposta é transmitida e enviada nele"""
+    resposta = get_fallback_response(messages[-1]["content"])
+    if not roteador_ia.provedores:
+        if canal is not None:
+            await canal.send(resposta)
+        return resposta
     
     payload = {
         'model': 'deepseek-chat',
@@ -91,23 +81,22 @@ def deepseek_chat(messages, user_id):
     }
     
     try:
-        response = requests.post(
-            'https://api.deepseek.com/v1/chat/completions', 
-            json=payload, 
-            headers=headers, 
-            timeout=15
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            if 'choices' in result and len(result['choices']) > 0:
-                return result['choices'][0]['message']['content'].strip()
-        
-        return get_fallback_response(messages[-1]["content"])
+        if canal is None:
+            content = await respostas_ia.obter(
+                respostas_ia.chave(messages),
+                lambda: roteador_ia.completar(payload)
+            )
+        else:
+            content = await roteador_ia.responder(canal, payload, respostas_ia)
+        if content is not None:
+            return content.strip()
         
     except Exception as e:
         print(f"Erro DeepSeek: {e}")
-        return get_fallback_response(messages[-1]["content"])
+    
+    if canal is not None:
+        await canal.send(resposta)
+    return resposta
 
 def get_fallback_response(user_message):
     """Respostas inteligentes quando a API falha"""
@@ -135,6 +124,10 @@ def get_fallback_response(user_message):
 
 @bot.event
 async def on_ready():
+    global tarefa_extrato
+    agendador.iniciar()
+    if tarefa_extrato is None:
+        tarefa_extrato = asyncio.ensure_future(economia.manter())
     print(f'🤖 AMIGÃO ATIVADO: {bot.user.name}')
     await bot.change_presence(activity=Game(name="!comandos | 30+ Recursos"))
 
@@ -147,37 +140,23 @@ async def on_message(message):
     if bot.user.mentioned_in(message) and not message.content.startswith('!'):
         user_id = str(message.author.id)
         
-        if user_id not in conversation_history:
-            conversation_history[user_id] = []
-        
         # Limitar histórico
-        user_history = conversation_history[user_id][-4:]
-        
-        messages = [
-            {
-                "role": "system", 
-                "content": "Você é o Amigão, um usuário normal do Discord. Responda de forma CURTA, NATURAL e HUMANA. Use gírias brasileiras como 'mano', 'valeu', 'tmj'. Não use emojis demais. Seja direto."
-            }
-        ]
-        
-        for msg in user_history:
-            role = "user" if msg['author'] == 'user' else "assistant"
-            messages.append({"role": role, "content": msg['content']})
+        user_history = await historico.recentes(user_id, 4)
         
         # Corrigir a menção
         cleaned_content = message.content.replace(f'<@{bot.user.id}>', '').strip()
-        messages.append({"role": "user", "content": cleaned_content})
         
-        response = deepseek_chat(messages, user_id)
-        
-        # Salvar no histórico
-        conversation_history[user_id].append({"author": "user", "content": cleaned_content})
-        conversation_history[user_id].append({"author": "bot", "content": response})
+        messages = montador_prompt.montar(
+            "Você é o Amigão, um usuário normal do Discord. Responda de forma CURTA, NATURAL e HUMANA. Use gírias brasileiras como 'mano', 'valeu', 'tmj'. Não use emojis demais. Seja direto.",
+            user_history,
+            cleaned_content
+        )
         
-        if len(conversation_history[user_id]) > 20:
-            conversation_history[user_id] = conversation_history[user_id][-20:]
+        # A resposta é enviada aos poucos no canal enquanto a IA escreve
+        response = await deepseek_chat(messages, user_id, message.channel)
         
-        await message.channel.send(response)
+        # Salvar no histórico
+        await historico.adicionar(user_id, cleaned_content, response)
     
     await bot.process_commands(message)
 
@@ -341,40 +320,12 @@ async def unlock(ctx):
 @bot.command()
 async def daily(ctx):
     """🎁 Resgatar recompensa diária"""
-    user_id = str(ctx.author.id)
-    conn = sqlite3.connect('bot_data.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT wallet, last_daily FROM economy WHERE user_id = ?', (user_id,))
-    result = cursor.fetchone()
+    coins = await economia.resgatar_daily(str(ctx.author.id), random.randint(150, 300))
     
-    now = datetime.datetime.now().isoformat()
-    
-    if not result:
-        # Primeira vez
-        coins = random.randint(150, 300)
-        cursor.execute('INSERT INTO economy (user_id, wallet, last_daily) VALUES (?, ?, ?)', 
-                      (user_id, coins, now))
-        message = f"🎁 **Recompensa diária coletada!**\nVocê ganhou **{coins}** moedas!"
+    if coins is None:
+        message = "⏰ **Você já coletou sua recompensa hoje!**\nVolte amanhã para mais moedas."
     else:
-        wallet, last_daily = result
-        if last_daily:
-            last_date = datetime.datetime.fromisoformat(last_daily)
-            if (datetime.datetime.now() - last_date).days >= 1:
-                coins = random.randint(150, 300)
-                cursor.execute('UPDATE economy SET wallet = wallet + ?, last_daily = ? WHERE user_id = ?',
-                              (coins, now, user_id))
-                message = f"🎁 **Recompensa diária coletada!**\nVocê ganhou **{coins}** moedas!"
-            else:
-                message = "⏰ **Você já coletou sua recompensa hoje!**\nVolte amanhã para mais moedas."
-        else:
-            coins = random.randint(150, 300)
-            cursor.execute('UPDATE economy SET wallet = wallet + ?, last_daily = ? WHERE user_id = ?',
-                          (coins, now, user_id))
-            message = f"🎁 **Recompensa diária coletada!**\nVocê ganhou **{coins}** moedas!"
-    
-    conn.commit()
-    conn.close()
+        message = f"🎁 **Recompensa diária coletada!**\nVocê ganhou **{coins}** moedas!"
     
     embed = Embed(title="💰 RECOMPENSA DIÁRIA", description=message, color=0xffd700)
     await ctx.send(embed=embed)
@@ -385,14 +336,7 @@ async def saldo(ctx, member: discord.Member = None):
     target = member or ctx.author
     user_id = str(target.id)
     
-    conn = sqlite3.connect('bot_data.db')
-    cursor = conn.cursor()
-    cursor.execute('SELECT wallet, bank FROM economy WHERE user_id = ?', (user_id,))
-    result = cursor.fetchone()
-    conn.close()
-    
-    wallet = result[0] if result else 0
-    bank = result[1] if result else 0
+    wallet, bank = await economia.saldo(user_id)
     total = wallet + bank
     
     embed = Embed(title=f"💰 CARTEIRA DE {target.name.upper()}", color=0xffd700)
@@ -413,61 +357,16 @@ async def transferir(ctx, member: discord.Member, quantia: int):
         await ctx.send("❌ Você não pode transferir para si mesmo")
         return
     
-    user_id = str(ctx.author.id)
-    target_id = str(member.id)
-    
-    conn = sqlite3.connect('bot_data.db')
-    cursor = conn.cursor()
-    
-    # Verificar saldo
-    cursor.execute('SELECT wallet FROM economy WHERE user_id = ?', (user_id,))
-    result = cursor.fetchone()
-    
-    if not result or result[0] < quantia:
+    if not await economia.transferir(str(ctx.author.id), str(member.id), quantia):
         await ctx.send("❌ Saldo insuficiente!")
-        conn.close()
         return
     
-    # Transferir
-    cursor.execute('UPDATE economy SET wallet = wallet - ? WHERE user_id = ?', (quantia, user_id))
-    
-    # Adicionar ao destinatário
-    cursor.execute('SELECT wallet FROM economy WHERE user_id = ?', (target_id,))
-    target_result = cursor.fetchone()
-    
-    if target_result:
-        cursor.execute('UPDATE economy SET wallet = wallet + ? WHERE user_id = ?', (quantia, target_id))
-    else:
-        cursor.execute('INSERT INTO economy (user_id, wallet) VALUES (?, ?)', (target_id, quantia))
-    
-    conn.commit()
-    conn.close()
-    
     embed = Embed(title="💸 TRANSFERÊNCIA REALIZADA", color=0x00ff00)
     embed.description = f"**{quantia}** moedas transferidas para {member.mention}"
     await ctx.send(embed=embed)
 
 # 🎮 SISTEMA DE JOGOS
-@bot.command()
-async def loteria(ctx, aposta: int = 100):
-    """🎰 Jogar na loteria"""
-    if aposta < 50:
-        await ctx.send("❌ Aposta mínima: 50 moedas")
-        return
-    
-    user_id = str(ctx.author.id)
-    conn = sqlite3.connect('bot_data.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT wallet FROM economy WHERE user_id = ?', (user_id,))
-    result = cursor.fetchone()
-    
-    if not result or result[0] < aposta:
-        await ctx.send("❌ Moedas insuficientes!")
-        conn.close()
-        return
-    
-    # Sorteio
+def sortear_loteria(aposta):
     numeros_sorteados = [random.randint(1, 60) for _ in range(6)]
     meus_numeros = [random.randint(1, 60) for _ in range(6)]
     
@@ -489,14 +388,21 @@ async def loteria(ctx, aposta: int = 100):
         premio = 0
         mensagem = "😢 **Que pena!** Tente novamente."
     
-    # Atualizar saldo
-    if premio > 0:
-        cursor.execute('UPDATE economy SET wallet = wallet + ? WHERE user_id = ?', (premio - aposta, user_id))
-    else:
-        cursor.execute('UPDATE economy SET wallet = wallet - ? WHERE user_id = ?', (aposta, user_id))
+    return numeros_sorteados, meus_numeros, premio, mensagem
+
+@bot.command()
+async def loteria(ctx, aposta: int = 100):
+    """🎰 Jogar na loteria"""
+    if aposta < 50:
+        await ctx.send("❌ Aposta mínima: 50 moedas")
+        return
     
-    conn.commit()
-    conn.close()
+    numeros_sorteados, meus_numeros, premio, mensagem = sortear_loteria(aposta)
+    
+    # Aposta e prêmio num UPDATE condicional: só vale se a aposta couber na carteira
+    if await economia.apostar(str(ctx.author.id), aposta, premio) is None:
+        await ctx.send("❌ Moedas insuficientes!")
+        return
     
     embed = Embed(title="🎰 LOTERIA", color=0x9b59b6)
     embed.add_field(name="Seus números", value=", ".join(map(str, sorted(meus_numeros))), inline=False)
@@ -504,6 +410,36 @@ async def loteria(ctx, aposta: int = 100):
     embed.add_field(name="Resultado", value=f"{mensagem}\n**Prêmio: {premio} moedas**", inline=False)
     await ctx.send(embed=embed)
 
+@bot.command(name='extrato')
+@commands.has_permissions(administrator=True)
+async def extrato_cmd(ctx, member: discord.Member, *, data: str = None):
+    """📒 Histórico de moedas (opcional: saldo em AAAA-MM-DD HH:MM)"""
+    if economia.extrato is None:
+        await ctx.send("❌ O extrato só existe com o banco SQLite")
+        return
+    
+    quando = None
+    if data:
+        try:
+            quando = datetime.datetime.strptime(data, '%Y-%m-%d %H:%M').timestamp()
+        except ValueError:
+            await ctx.send("❌ Use o formato AAAA-MM-DD HH:MM")
+            return
+    
+    atual, recalculado, saldo_em, movimentos = await economia.consultar_extrato(str(member.id), quando)
+    
+    embed = Embed(title=f"📒 EXTRATO DE {member.name.upper()}", color=0xf1c40f)
+    embed.add_field(name="💳 Carteira", value=f"**{atual}** moedas", inline=True)
+    embed.add_field(name="📒 Pelo extrato", value=f"**{recalculado}** moedas" + (" ⚠️" if recalculado != atual else ""), inline=True)
+    if saldo_em is not None:
+        embed.add_field(name=f"🕓 Em {data}", value=f"**{saldo_em}** moedas", inline=True)
+    linhas = [
+        f"`#{lancamento_id}` {datetime.datetime.fromtimestamp(momento):%d/%m %H:%M} **{delta:+}** {motivo or '-'}"
+        for lancamento_id, momento, delta, motivo, ref in movimentos
+    ]
+    embed.add_field(name="Últimos lançamentos", value="\n".join(linhas) or "Nenhum", inline=False)
+    await ctx.send(embed=embed)
+
 @bot.command()
 async def ppt(ctx, escolha: str):
     """✂️ Pedra, Papel, Tesoura"""
@@ -672,9 +608,11 @@ async def timer(ctx, segundos: int):
         await ctx.send("❌ Mínimo: 5 segundos")
         return
     
+    await agendador.agendar(segundos, "lembrete", {
+        "canal_id": ctx.channel.id,
+        "mensagem": f"🔔 {ctx.author.mention} Timer de {segundos} segundos finalizado!"
+    })
     await ctx.send(f"⏰ Timer de {segundos} segundos iniciado para {ctx.author.mention}!")
-    await asyncio.sleep(segundos)
-    await ctx.send(f"🔔 {ctx.author.mention} Timer de {segundos} segundos finalizado!")
 
 @bot.command()
 async def clima(ctx, *, cidade: str):
@@ -799,8 +737,8 @@ async def comandos(ctx):
     )
     
     embed.add_field(
-        name="💰 ECONOMIA (4 comandos)", 
-        value="`!daily` `!saldo` `!transferir` `!loteria`",
+        name="💰 ECONOMIA (5 comandos)", 
+        value="`!daily` `!saldo` `!transferir` `!loteria` `!extrato`",
         inline=False
     )
     
@@ -855,6 +793,12 @@ async def ping(ctx):
 if __name__ == "__main__":
     if DISCORD_TOKEN:
         print("🚀 Iniciando Amigão Bot...")
-        bot.run(DISCORD_TOKEN)
+        try:
+            bot.run(DISCORD_TOKEN)
+        finally:
+            historico.descarregar()
+            db.fechar()
+            if motor.dialeto != 'sqlite':
+                motor.fechar()
     else:
         print("❌ Token do Discord não encontrado no arquivo .env")
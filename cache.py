@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import hashlib
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+
+_AUSENTE = object()
+
+
+class CacheTTL:
+    """Cache LRU com limite de itens e tempo de vida por entrada"""
+
+    def __init__(self, max_itens=1000, ttl=300.0):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._dados = OrderedDict()
+
+    def get(self, chave, padrao=None):
+        item = self._dados.get(chave, _AUSENTE)
+        if item is _AUSENTE or item[1] < time.monotonic():
+            if item is not _AUSENTE:
+                del self._dados[chave]
+            self.misses += 1
+            return padrao
+        self._dados.move_to_end(chave)
+        self.hits += 1
+        return item[0]
+
+    def set(self, chave, valor, ttl=None):
+        self._dados[chave] = (valor, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._dados.move_to_end(chave)
+        while len(self._dados) > self.max_itens:
+            self._dados.popitem(last=False)
+
+    def remover(self, chave):
+        self._dados.pop(chave, None)
+
+    def limpar(self):
+        self._dados.clear()
+
+    def __contains__(self, chave):
+        item = self._dados.get(chave, _AUSENTE)
+        return item is not _AUSENTE and item[1] >= time.monotonic()
+
+    def __len__(self):
+        return len(self._dados)
+
+    def estatisticas(self):
+        total = self.hits + self.misses
+        return {
+            'itens': len(self._dados),
+            'hits': self.hits,
+            'misses': self.misses,
+            'taxa_acerto': self.hits / total if total else 0.0
+        }
+
+
+# Só letras repetidas: "1000" e "10" não são a mesma pergunta
+REPETIDAS = re.compile(r'([^\W\d_])\1{2,}')
+# Pontuação some, mas operadores e a vírgula/ponto entre dígitos mudam o sentido ("2+2", "2*2", "1.5")
+SIMBOLOS = re.compile(r'<@!?\d+>|(?<!\d)[.,]|[.,](?!\d)|[^\w\s.,+\-*/×÷=^%<>()]')
+OPERADORES = re.compile(r'[+\-*/×÷=^%<>()]')
+
+
+def normalizar_pergunta(texto):
+    """Forma canônica para comparar mensagens: "Oiiii!!" e "oi" viram a mesma chave
+
+    Operadores ganham espaços em volta, então "2+2" e "2 + 2" também.
+    """
+    texto = OPERADORES.sub(r' \g<0> ', SIMBOLOS.sub(' ', texto.casefold()))
+    if not texto.isascii():
+        texto = ''.join(c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c))
+    return ' '.join(REPETIDAS.sub(r'\1', texto).split())
+
+
+class CacheRespostas:
+    """Reaproveita respostas da IA para mensagens equivalentes
+
+    A chave é a última mensagem normalizada mais um hash das `contexto`
+    mensagens anteriores (e do prompt de sistema), então só conversas no
+    mesmo ponto compartilham resposta. Pedidos idênticos simultâneos
+    esperam a mesma chamada em andamento em vez de abrir outra.
+    Respostas None (falha na API) não entram no cache.
+    """
+
+    def __init__(self, max_itens=2000, ttl=120.0, contexto=2):
+        self.respostas = CacheTTL(max_itens, ttl)
+        self.contexto = contexto
+        self.coalescidas = 0
+        self._em_andamento = {}
+
+    def chave(self, mensagens):
+        anteriores = mensagens[:1] + mensagens[max(1, len(mensagens) - 1 - self.contexto):-1]
+        resumo = hashlib.blake2b(digest_size=8)
+        for mensagem in anteriores:
+            resumo.update(mensagem["role"].encode())
+            resumo.update(normalizar_pergunta(mensagem["content"]).encode('utf-8'))
+            resumo.update(b'\0')
+        return normalizar_pergunta(mensagens[-1]["content"]), resumo.hexdigest()
+
+    async def obter(self, chave, produzir):
+        """Resposta em cache, a de uma chamada igual em andamento, ou `await produzir()`"""
+        resposta = self.respostas.get(chave)
+        if resposta is not None:
+            return resposta
+
+        tarefa = self._em_andamento.get(chave)
+        if tarefa is None:
+            tarefa = asyncio.ensure_future(produzir())
+            self._em_andamento[chave] = tarefa
+            tarefa.add_done_callback(lambda t: self._concluir(chave, t))
+        else:
+            self.coalescidas += 1
+        return await asyncio.shield(tarefa)
+
+    def _concluir(self, chave, tarefa):
+        self._em_andamento.pop(chave, None)
+        if not tarefa.cancelled() and tarefa.exception() is None and tarefa.result() is not None:
+            self.respostas.set(chave, tarefa.result())
+
+    def estatisticas(self):
+        return {**self.respostas.estatisticas(), 'coalescidas': self.coalescidas, 'em_andamento': len(self._em_andamento)}
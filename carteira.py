@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+
+class Carteira:
+    """Débitos, créditos e transferências atômicos sobre uma tabela de saldos
+
+    `tabela` guarda o saldo na coluna `saldo` e é identificada pelas colunas
+    `chaves` (que precisam ser a chave primária, por causa do UPSERT). O
+    débito é um único UPDATE condicional (saldo >= quantia), então não existe
+    janela entre conferir o saldo e descontar; a transferência debita e
+    credita na mesma transação. As funções recebem a conexão e não fazem
+    commit: quem chama decide (BancoAssincrono.executar, executar_agrupado
+    ou conn.commit()). Com um `extrato`, cada movimento também é lançado
+    nele com o `motivo` informado, na mesma conexão e transação.
+    """
+
+    def __init__(self, tabela, saldo, chaves, extrato=None):
+        self.tabela = tabela
+        self.saldo_coluna = saldo
+        self.chaves = chaves
+        self.extrato = extrato
+        filtro = ' AND '.join(f'{chave} = ?' for chave in chaves)
+        self._sql_saldo = f'SELECT {saldo} FROM {tabela} WHERE {filtro}'
+        self._sql_debito = (f'UPDATE {tabela} SET {saldo} = {saldo} - ? '
+                            f'WHERE {filtro} AND {saldo} >= ? RETURNING {saldo}')
+        self._sql_credito = (f'INSERT INTO {tabela} ({", ".join(chaves)}, {saldo}) '
+                             f'VALUES ({", ".join("?" for _ in chaves)}, ?) '
+                             f'ON CONFLICT({", ".join(chaves)}) DO UPDATE SET {saldo} = {saldo} + excluded.{saldo} '
+                             f'RETURNING {saldo}')
+
+    def saldo(self, conn, chave):
+        linha = conn.execute(self._sql_saldo, chave).fetchone()
+        return linha[0] if linha else 0
+
+    def _debitar(self, conn, chave, quantia):
+        linha = conn.execute(self._sql_debito, (quantia, *chave, quantia)).fetchone()
+        return linha[0] if linha else None
+
+    def _creditar(self, conn, chave, quantia):
+        return conn.execute(self._sql_credito, (*chave, quantia)).fetchone()[0]
+
+    def _lancar(self, conn, chave, delta, motivo, ref):
+        if self.extrato is not None:
+            self.extrato.lancar(conn, chave, delta, motivo, ref)
+
+    def debitar(self, conn, chave, quantia, motivo=None, ref=None):
+        """Novo saldo, ou None se não havia saldo suficiente (nada muda)"""
+        saldo = self._debitar(conn, chave, quantia)
+        if saldo is not None:
+            self._lancar(conn, chave, -quantia, motivo, ref)
+        return saldo
+
+    def creditar(self, conn, chave, quantia, motivo=None, ref=None):
+        """Novo saldo; cria a linha se a conta ainda não existir (quantia negativa desconta sem conferir)"""
+        saldo = self._creditar(conn, chave, quantia)
+        self._lancar(conn, chave, quantia, motivo, ref)
+        return saldo
+
+    def transferir(self, conn, de, para, quantia, motivo='transferencia'):
+        """(saldo de quem pagou, saldo de quem recebeu), ou None se faltou saldo
+
+        No extrato, cada lado leva a outra conta em `ref`; os dois lançamentos
+        só são feitos depois que débito e crédito deram certo.
+        """
+        if de == para:
+            saldo = self.saldo(conn, de)
+            return (saldo, saldo) if saldo >= quantia else None
+        saldo_de = self._debitar(conn, de, quantia)
+        if saldo_de is None:
+            return None
+        saldo_para = self._creditar(conn, para, quantia)
+        self._lancar(conn, de, -quantia, motivo, ':'.join(map(str, para)))
+        self._lancar(conn, para, quantia, motivo, ':'.join(map(str, de)))
+        return saldo_de, saldo_para
@@ -1,14 +1,26 @@
 import discord
 import os
-import json
 import asyncio
-import aiohttp
-import sqlite3
 import datetime
+import itertools
 import random
+import time
 import requests
 from discord.ext import commands
 from discord import app_commands
+from ia_cliente import ClienteIA, DEEPSEEK_URL, exibir_em_partes
+from roteador import Provedor, RoteadorIA, GROK_URL
+from prompt import MontadorPrompt
+from cache import CacheTTL, CacheRespostas
+from automod import contem_link, DetectorRaid
+from limitador import LimitadorTaxa
+from restauracao import RestauradorServidor, estimar_restauracao_completa, resumir, resumir_plano
+from snapshots import ArmazemSnapshots
+from tarefas import FilaTarefas
+from carteira import Carteira
+from extrato import Extrato
+from inventario import Inventario
+from armazenamento import conectar, migrar
 
 # CONFIGURAÇÃO DO IMPERIO
 class ConfigVilao:
@@ -25,213 +37,326 @@ class IAAssassina:
     def __init__(self, grok_key, deepseek_key):
         self.grok_key = grok_key
         self.deepseek_key = deepseek_key
+        # Uma sessão por provedor: o limite de conexões de um não trava o outro
+        self.grok = ClienteIA(limite_por_host=10, timeout=30)
+        self.deepseek = ClienteIA(limite_por_host=5, timeout=120)
+        # Conversa prefere o Grok e código o DeepSeek; o outro entra se o primeiro falhar ou demorar
+        self.chat = RoteadorIA([
+            Provedor("grok", self.grok, GROK_URL, grok_key, "grok-beta"),
+            Provedor("deepseek", self.deepseek, DEEPSEEK_URL, deepseek_key, "deepseek-chat")
+        ])
+        # Sem hedge: duplicar um pedido de 2000 tokens sai caro
+        self.codigo = RoteadorIA([
+            Provedor("deepseek", self.deepseek, DEEPSEEK_URL, deepseek_key, "deepseek-coder"),
+            Provedor("grok", self.grok, GROK_URL, grok_key, "grok-beta")
+        ], hedge=False)
+        self.prompt = MontadorPrompt()
+        self.respostas = CacheRespostas()
+    
+    async def iniciar(self):
+        await self.grok.sessao()
+        await self.deepseek.sessao()
+    
+    async def fechar(self):
+        await self.grok.fechar()
+        await self.deepseek.fechar()
+    
+    def estatisticas(self):
+        return {"grok": self.grok.estatisticas(), "deepseek": self.deepseek.estatisticas()}
+    
+    def roteamento(self):
+        return {"chat": self.chat.estatisticas(), "codigo": self.codigo.estatisticas()}
+    
+    def _payload_grok(self, mensagem, historico):
+        return {
+            "messages": historico + [{"role": "user", "content": self.prompt.limitar(mensagem)}],
+            "model": "grok-beta",
+            "temperature": 0.7,
+            "max_tokens": 150
+        }
+    
+    def _payload_codigo(self, prompt):
+        return {
+            "messages": [{"role": "user", "content": f"Crie código para: {self.prompt.limitar(prompt)}"}],
+            "model": "deepseek-coder",
+            "temperature": 0.3,
+            "max_tokens": 2000
+        }
     
     async def grok_resposta(self, mensagem, historico):
         """IA GROK - Respostas humanas naturais"""
         try:
-            url = "https://api.x.ai/v1/chat/completions"
-            headers = {
-                "Authorization": f"Bearer {self.grok_key}",
-                "Content-Type": "application/json"
-            }
+            payload = self._payload_grok(mensagem, historico)
             
-            payload = {
-                "messages": historico + [{"role": "user", "content": mensagem}],
-                "model": "grok-beta",
-                "temperature": 0.7,
-                "max_tokens": 150
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data['choices'][0]['message']['content']
-                    return "Hmm... interessante."
-        except:
+            resposta = await self.respostas.obter(
+                self.respostas.chave(payload["messages"]),
+                lambda: self.chat.completar(payload)
+            )
+            if resposta is not None:
+                return resposta
+            return "Hmm... interessante."
+        except Exception:
             return "Pensando... 🤔"
     
+    async def grok_responder(self, message, historico):
+        """GROK respondendo a mensagem com o texto aparecendo enquanto é gerado"""
+        def responder(texto):
+            return message.reply(texto, mention_author=True)
+        
+        try:
+            resposta = await self.chat.responder(
+                message.channel, self._payload_grok(message.content, historico), self.respostas, enviar=responder
+            )
+            if resposta is not None:
+                return resposta
+            resposta = "Hmm... interessante."
+        except Exception:
+            resposta = "Pensando... 🤔"
+        await responder(resposta)
+        return resposta
+    
+    def deepseek_codigo_partes(self, prompt):
+        """DEEPSEEK - Geração de código em pedaços, conforme a API devolve"""
+        return self.codigo.transmitir(self._payload_codigo(prompt))
+    
     async def deepseek_codigo(self, prompt):
         """DEEPSEEK - Geração de código"""
         try:
-            url = "https://api.deepseek.com/v1/chat/completions"
-            headers = {
-                "Authorization": f"Bearer {self.deepseek_key}",
-                "Content-Type": "application/json"
-            }
+            payload = self._payload_codigo(prompt)
             
-            payload = {
-                "messages": [{"role": "user", "content": f"Crie código para: {prompt}"}],
-                "model": "deepseek-coder",
-                "temperature": 0.3,
-                "max_tokens": 2000
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return data['choices'][0]['message']['content']
-                    return "Erro na geração de código."
-        except:
+            codigo = await self.codigo.completar(payload)
+            if codigo is not None:
+                return codigo
+            return "Erro na geração de código."
+        except Exception:
             return "Erro ao acessar a API."
 
 class SistemaBackup:
     def __init__(self):
         self.backup_dir = "backups_imperio"
+        self.limitador = LimitadorTaxa()
+        self.restaurador = RestauradorServidor(self.limitador)
+        self.snapshots = ArmazemSnapshots(self.backup_dir)
+        self.manter = 20
         os.makedirs(self.backup_dir, exist_ok=True)
     
-    async def criar_backup(self, guild):
-        """Cria backup COMPLETO do servidor"""
-        backup_data = {
-            "nome": guild.name,
-            "id": guild.id,
-            "canais": [],
-            "cargos": [],
-            "data_backup": str(datetime.datetime.now())
-        }
+    async def criar_backup(self, guild, progresso=None, concorrencia=8):
+        """Cria backup COMPLETO do servidor
+        
+        Os históricos dos canais são buscados em paralelo (semáforo + limite
+        global de requisições) e cada canal vira blobs no armazém de
+        snapshots assim que termina; só o que mudou ocupa disco novo. O
+        armazém (gzip e arquivos) roda em asyncio.to_thread, fora do loop.
+        `progresso(feitos, total)` é aguardado a cada canal.
+        Retorna (id do snapshot, relatório).
+        """
+        inicio = time.monotonic()
+        canais = list(guild.channels)
+        semaforo = asyncio.Semaphore(concorrencia)
+        relatorio = {"canais": len(canais), "mensagens": 0, "falhas": 0}
         
         # Backup de cargos
-        for role in guild.roles:
-            if role.name != "@everyone":
-                backup_data["cargos"].append({
-                    "nome": role.name,
-                    "cor": role.color.value,
-                    "permissoes": role.permissions.value
-                })
+        cargos = await asyncio.to_thread(lambda dados: [self.snapshots.guardar_cargo(cargo) for cargo in dados], [
+            {"nome": role.name, "cor": role.color.value, "permissoes": role.permissions.value, "posicao": role.position}
+            for role in guild.roles if role.name != "@everyone"
+        ])
         
-        # Backup de canais
-        for channel in guild.channels:
+        async def capturar(channel):
             channel_data = {
                 "nome": channel.name,
                 "tipo": str(channel.type),
-                "posicao": channel.position
+                "posicao": channel.position,
+                "categoria": channel.category.name if channel.category else None,
+                "overwrites": {
+                    alvo.name: [permissao.value for permissao in overwrite.pair()]
+                    for alvo, overwrite in channel.overwrites.items() if isinstance(alvo, discord.Role)
+                }
             }
             
             if isinstance(channel, discord.TextChannel):
+                channel_data["topico"] = channel.topic
                 messages_data = []
                 try:
-                    async for message in channel.history(limit=50):
-                        messages_data.append({
-                            "autor": str(message.author),
-                            "conteudo": message.content,
-                            "timestamp": str(message.created_at)
-                        })
-                    channel_data["mensagens"] = messages_data
-                except:
-                    channel_data["mensagens"] = []
+                    async with semaforo:
+                        await self.limitador.aguardar()
+                        async for message in channel.history(limit=50):
+                            messages_data.append({
+                                "autor": str(message.author),
+                                "conteudo": message.content,
+                                "timestamp": str(message.created_at)
+                            })
+                except Exception:
+                    relatorio["falhas"] += 1
+                    messages_data = []
+                channel_data["mensagens"] = messages_data
+                relatorio["mensagens"] += len(messages_data)
             
-            backup_data["canais"].append(channel_data)
+            return channel_data
         
-        # Salvar backup
-        filename = f"{guild.id}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        filepath = os.path.join(self.backup_dir, filename)
+        entradas = []
+        for feitos, tarefa in enumerate(asyncio.as_completed([capturar(c) for c in canais]), 1):
+            entradas.append(await asyncio.to_thread(self.snapshots.guardar_canal, await tarefa))
+            if progresso:
+                await progresso(feitos, len(canais))
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(backup_data, f, indent=2, ensure_ascii=False)
+        anteriores = await asyncio.to_thread(self.snapshots.listar, guild.id)
+        manifesto, relatorio["inalterado"] = await asyncio.to_thread(
+            self.snapshots.salvar_manifesto, guild.id, guild.name, cargos, entradas
+        )
+        if anteriores and not relatorio["inalterado"]:
+            relatorio["mudancas"] = self.snapshots.diff(anteriores[-1], manifesto)
+        await asyncio.to_thread(self.snapshots.podar, guild.id, self.manter)
         
-        return filepath
+        relatorio["segundos"] = time.monotonic() - inicio
+        return manifesto["id"], relatorio
     
-    async def restaurar_backup(self, guild, backup_file):
-        """Restaura backup DESTRUINDO tudo atual"""
-        with open(backup_file, 'r', encoding='utf-8') as f:
-            backup_data = json.load(f)
-        
-        # FASE 1: DESTRUIR servidor atual
-        for channel in guild.channels:
-            try:
-                await channel.delete()
-            except:
-                continue
-        
-        for role in guild.roles:
-            if role.name != "@everyone" and not role.managed:
-                try:
-                    await role.delete()
-                except:
-                    continue
+    def existe(self, guild_id, referencia):
+        """Snapshot deste servidor ou arquivo JSON antigo na pasta de backups"""
+        if os.path.isfile(os.path.join(self.backup_dir, os.path.basename(referencia))):
+            return True
+        try:
+            self.snapshots.ler_manifesto(guild_id, referencia)
+            return True
+        except OSError:
+            return False
+    
+    def carregar(self, guild_id, referencia):
+        """`referencia` é o id de um snapshot ou o nome de um backup JSON antigo"""
+        caminho = os.path.join(self.backup_dir, os.path.basename(referencia))
+        return self.snapshots.carregar(guild_id, caminho if os.path.isfile(caminho) else referencia)
+    
+    async def restaurar_backup(self, guild, referencia):
+        """Restaura backup DESTRUINDO tudo atual; devolve o relatório por etapa"""
+        return await self.restaurador.restaurar(guild, await asyncio.to_thread(self.carregar, guild.id, referencia))
+    
+    async def reconciliar_backup(self, guild, referencia, simular=True):
+        """Aplica só as diferenças entre o servidor e o backup
         
-        await asyncio.sleep(5)
+        Devolve (plano, relatório, chamadas de uma restauração completa);
+        simulando, o relatório é None.
+        """
+        backup = await asyncio.to_thread(self.carregar, guild.id, referencia)
+        plano, relatorio = await self.restaurador.reconciliar(guild, backup, simular)
+        return plano, relatorio, estimar_restauracao_completa(guild, backup)
+
+# Histórico de economia.coins (lançamentos + checkpoints)
+extrato_economia = Extrato('economia', 'coins', ('guild_id', 'user_id'))
+
+def garantir_usuario(conn, guild_id, user_id):
+    """Cria a linha (guild_id, user_id) se não existir
+
+    Saldos (e inventários) da época em que a economia era global ficaram em
+    guild_id = 0; o primeiro servidor em que o usuário aparecer herda esses
+    dados. O saldo inicial entra no extrato como abertura.
+    """
+    cursor = conn.cursor()
+    cursor.execute('SELECT 1 FROM economia WHERE guild_id = ? AND user_id = ?', (guild_id, user_id))
+    if cursor.fetchone():
+        return
+    
+    cursor.execute('''
+        INSERT INTO economia (guild_id, user_id, coins, daily_streak, last_daily, xp, level)
+        SELECT ?, user_id, coins, daily_streak, last_daily, xp, level FROM economia
+        WHERE guild_id = 0 AND user_id = ?
+        RETURNING coins
+    ''', (guild_id, user_id))
+    linha = cursor.fetchone()
+    # Fora do `if`: a migração 3 põe no servidor 0 todo inventário antigo, mesmo de
+    # quem não tem saldo lá. Soma em vez de mudar o guild_id porque o /daritem pode
+    # já ter criado linhas do usuário neste servidor
+    cursor.execute('''
+        INSERT INTO inventario (guild_id, user_id, item_id, quantidade)
+        SELECT ?, user_id, item_id, quantidade FROM inventario
+        WHERE guild_id = 0 AND user_id = ?
+        ON CONFLICT (guild_id, user_id, item_id) DO UPDATE SET quantidade = quantidade + excluded.quantidade
+    ''', (guild_id, user_id))
+    cursor.execute('DELETE FROM inventario WHERE guild_id = 0 AND user_id = ?', (user_id,))
+    if linha:
+        cursor.execute('DELETE FROM economia WHERE guild_id = 0 AND user_id = ?', (user_id,))
+        extrato_economia.lancar(conn, (0, user_id), -linha[0], 'migracao', str(guild_id))
+    else:
+        cursor.execute('INSERT INTO economia (guild_id, user_id) VALUES (?, ?) RETURNING coins', (guild_id, user_id))
+        linha = cursor.fetchone()
+    extrato_economia.lancar(conn, (guild_id, user_id), linha[0], 'abertura')
+    conn.commit()
+
+class AcumuladorXP:
+    """XP por mensagem acumulado em memória e gravado em lote
+
+    O ganho e o level up são calculados na hora (o anúncio não atrasa), mas
+    o banco só recebe os valores agregados a cada `intervalo` segundos, numa
+    única transação.
+    """
+    def __init__(self, conn, intervalo=10.0, max_cache=50000):
+        self.conn = conn
+        self.intervalo = intervalo
+        self.max_cache = max_cache
+        self.cache = {}
+        self.sujos = set()
+    
+    def _estado(self, guild_id, user_id):
+        chave = (guild_id, user_id)
+        estado = self.cache.get(chave)
+        if estado is None:
+            garantir_usuario(self.conn, guild_id, user_id)
+            cursor = self.conn.cursor()
+            cursor.execute('SELECT xp, level FROM economia WHERE guild_id = ? AND user_id = ?', chave)
+            estado = list(cursor.fetchone())
+            self.cache[chave] = estado
+        return estado
+    
+    def adicionar(self, guild_id, user_id, xp_amount):
+        estado = self._estado(guild_id, user_id)
+        estado[0] += xp_amount
+        self.sujos.add((guild_id, user_id))
         
-        # FASE 2: RECRIAR do backup
-        role_map = {}
-        for role_data in backup_data["cargos"]:
-            try:
-                new_role = await guild.create_role(
-                    name=role_data["nome"],
-                    color=discord.Color(role_data["cor"]),
-                    permissions=discord.Permissions(role_data["permissoes"])
-                )
-                role_map[role_data["nome"]] = new_role
-            except:
-                continue
+        xp_needed = estado[1] * 100
+        if estado[0] >= xp_needed:
+            estado[0] -= xp_needed
+            estado[1] += 1
+            return estado[1]
+        return None
+    
+    def pendente(self, guild_id, user_id):
+        """Valores (xp, level) ainda não gravados, ou None"""
+        estado = self.cache.get((guild_id, user_id))
+        return tuple(estado) if estado is not None else None
+    
+    def descarregar(self):
+        if not self.sujos:
+            return
+        linhas = [(self.cache[chave][0], self.cache[chave][1]) + chave for chave in self.sujos]
+        cursor = self.conn.cursor()
+        cursor.executemany('UPDATE economia SET xp = ?, level = ? WHERE guild_id = ? AND user_id = ?', linhas)
+        self.conn.commit()
+        self.sujos.clear()
         
-        for channel_data in backup_data["canais"]:
+        if len(self.cache) > self.max_cache:
+            self.cache.clear()
+    
+    async def executar(self):
+        while True:
+            await asyncio.sleep(self.intervalo)
             try:
-                if channel_data["tipo"] == "text":
-                    new_channel = await guild.create_text_channel(
-                        channel_data["nome"],
-                        position=channel_data["posicao"]
-                    )
-                    
-                    if "mensagens" in channel_data:
-                        for msg_data in channel_data["mensagens"][:5]:
-                            try:
-                                embed = discord.Embed(
-                                    description=msg_data["conteudo"],
-                                    color=0x00ff00
-                                )
-                                embed.set_author(name=msg_data["autor"])
-                                embed.set_footer(text=f"Backup: {msg_data['timestamp']}")
-                                await new_channel.send(embed=embed)
-                            except:
-                                continue
-                
-                elif channel_data["tipo"] == "voice":
-                    await guild.create_voice_channel(
-                        channel_data["nome"],
-                        position=channel_data["posicao"]
-                    )
-            except:
-                continue
+                self.descarregar()
+            except Exception as e:
+                print(f"Erro ao gravar XP: {e}")
 
 class SistemaEconomia:
-    def __init__(self, db_conn):
+    def __init__(self, db_conn, caminho):
         self.conn = db_conn
+        self.caminho = caminho
+        self.extrato = extrato_economia
+        self.carteira = Carteira('economia', 'coins', ('guild_id', 'user_id'), extrato=self.extrato)
+        self.inventario = Inventario()
+        self.lote_em_massa = 2000
         self.setup_tables()
+        self.xp = AcumuladorXP(db_conn)
     
     def setup_tables(self):
+        """As tabelas vêm do esquema 'imperio' (armazenamento.py); aqui só o extrato e a loja inicial"""
         cursor = self.conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS economia (
-                user_id INTEGER PRIMARY KEY,
-                coins INTEGER DEFAULT 100,
-                daily_streak INTEGER DEFAULT 0,
-                last_daily TEXT,
-                xp INTEGER DEFAULT 0,
-                level INTEGER DEFAULT 1
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS loja (
-                item_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT,
-                preco INTEGER,
-                descricao TEXT
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS inventario (
-                user_id INTEGER,
-                item_id INTEGER,
-                quantidade INTEGER DEFAULT 1,
-                FOREIGN KEY(user_id) REFERENCES economia(user_id),
-                FOREIGN KEY(item_id) REFERENCES loja(item_id)
-            )
-        ''')
+        self.extrato.criar_tabelas(cursor)
         
         # Itens padrão da loja
         cursor.execute('SELECT COUNT(*) FROM loja')
@@ -246,73 +371,251 @@ class SistemaEconomia:
         
         self.conn.commit()
     
-    def get_user_data(self, user_id):
+    def get_user_data(self, guild_id, user_id):
+        """(user_id, coins, daily_streak, last_daily, xp, level) no servidor"""
+        garantir_usuario(self.conn, guild_id, user_id)
         cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM economia WHERE user_id = ?', (user_id,))
+        cursor.execute('''
+            SELECT user_id, coins, daily_streak, last_daily, xp, level FROM economia
+            WHERE guild_id = ? AND user_id = ?
+        ''', (guild_id, user_id))
         result = cursor.fetchone()
         
-        if not result:
-            cursor.execute('INSERT INTO economia (user_id) VALUES (?)', (user_id,))
-            self.conn.commit()
-            return (user_id, 100, 0, None, 0, 1)
+        # XP ainda no acumulador vale mais que o gravado
+        pendente = self.xp.pendente(guild_id, user_id)
+        if pendente:
+            result = result[:4] + pendente
         
         return result
     
-    def add_coins(self, user_id, amount):
-        cursor = self.conn.cursor()
-        cursor.execute('UPDATE economia SET coins = coins + ? WHERE user_id = ?', (amount, user_id))
+    def add_coins(self, guild_id, user_id, amount, motivo=None):
+        garantir_usuario(self.conn, guild_id, user_id)
+        self.carteira.creditar(self.conn, (guild_id, user_id), amount, motivo)
         self.conn.commit()
     
-    def add_xp(self, user_id, xp_amount):
-        cursor = self.conn.cursor()
-        cursor.execute('UPDATE economia SET xp = xp + ? WHERE user_id = ?', (xp_amount, user_id))
+    def transferir(self, guild_id, de, para, quantia, motivo='transferencia'):
+        """Debita `de` e credita `para` num único commit
         
-        # Verificar level up
-        user_data = self.get_user_data(user_id)
-        current_xp = user_data[4]
-        current_level = user_data[5]
-        
-        xp_needed = current_level * 100
+        Retorna (saldo de quem pagou, saldo de quem recebeu) ou None se faltou saldo.
+        """
+        garantir_usuario(self.conn, guild_id, de)
+        garantir_usuario(self.conn, guild_id, para)
+        try:
+            resultado = self.carteira.transferir(self.conn, (guild_id, de), (guild_id, para), quantia, motivo)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return resultado
+    
+    def comprar(self, guild_id, user_id, itens, total):
+        """Debita `total` e põe os itens ({item_id: quantidade}) no inventário num único commit
         
-        if current_xp >= xp_needed:
-            new_level = current_level + 1
-            cursor.execute('UPDATE economia SET level = ?, xp = ? WHERE user_id = ?', 
-                          (new_level, current_xp - xp_needed, user_id))
+        Retorna o saldo ou None se faltou saldo (nada muda).
+        """
+        garantir_usuario(self.conn, guild_id, user_id)
+        ref = ','.join(f'{item_id}x{quantidade}' for item_id, quantidade in itens.items())
+        try:
+            saldo = self.carteira.debitar(self.conn, (guild_id, user_id), total, 'compra', ref)
+            if saldo is not None:
+                self.inventario.adicionar_varios(self.conn, guild_id, user_id, itens)
             self.conn.commit()
-            return new_level
+        except Exception:
+            self.conn.rollback()
+            self.inventario.esquecer()
+            raise
+        return saldo
+    
+    def itens(self, guild_id, user_id):
+        """{item_id: quantidade} do usuário no servidor"""
+        garantir_usuario(self.conn, guild_id, user_id)
+        return self.inventario.itens(self.conn, guild_id, user_id)
+    
+    def _em_massa(self, passos):
+        """Roda cada `passo(conn)` com commit próprio numa conexão própria (chamado via asyncio.to_thread)
         
+        A conexão compartilhada não serve: a transação dela é a mesma dos
+        comandos que rodam no loop, que poderiam fazer commit ou rollback no
+        meio da operação. Um commit por lote solta o lock de escrita do
+        SQLite entre os lotes: as escritas síncronas do loop (add_coins,
+        /daily, XP) esperam um lote, não a operação inteira. Para no
+        primeiro passo que devolver 0; devolve a soma. Se um lote falhar,
+        os anteriores continuam gravados.
+        """
+        conn = conectar(self.caminho)
+        total = 0
+        try:
+            for passo in passos:
+                inicio = time.monotonic()
+                with conn:
+                    feitos = passo(conn)
+                if not feitos:
+                    break
+                total += feitos
+                # O busy handler do SQLite tenta de novo em intervalos que crescem até
+                # 100 ms: com o lock livre metade do tempo, quem espera logo acha uma brecha
+                time.sleep(time.monotonic() - inicio)
+            return total
+        finally:
+            conn.close()
+    
+    async def dar_item(self, guild_id, user_ids, item_id, quantidade):
+        """Dá o item a todos os `user_ids` em lotes, fora do loop; devolve quantos receberam"""
+        user_ids = list(user_ids)
+        passos = [
+            lambda conn, lote=user_ids[i:i + self.lote_em_massa]:
+                self.inventario.dar_para_todos(conn, guild_id, lote, item_id, quantidade)
+            for i in range(0, len(user_ids), self.lote_em_massa)
+        ]
+        try:
+            return await asyncio.to_thread(self._em_massa, passos)
+        finally:
+            self.inventario.esquecer()
+    
+    async def nova_temporada(self, guild_id, item_id=None):
+        """Zera o inventário do servidor (ou só de um item) em lotes, fora do loop; devolve quantas linhas saíram"""
+        passo = lambda conn: self.inventario.resetar(conn, guild_id, item_id, self.lote_em_massa)
+        try:
+            return await asyncio.to_thread(self._em_massa, itertools.repeat(passo))
+        finally:
+            self.inventario.esquecer()
+    
+    def resgatar_daily(self, guild_id, user_id, coins, streak, hoje):
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            UPDATE economia SET coins = coins + ?, daily_streak = ?, last_daily = ?
+            WHERE guild_id = ? AND user_id = ?
+        ''', (coins, streak, hoje, guild_id, user_id))
+        self.extrato.lancar(self.conn, (guild_id, user_id), coins, 'daily')
         self.conn.commit()
-        return None
+    
+    def saldo_em(self, guild_id, user_id, quando=None):
+        """Saldo recalculado pelo extrato no instante `quando` (None = agora)"""
+        return self.extrato.saldo_em(self.conn, (guild_id, user_id), quando)
+    
+    def checkpoint_extrato(self):
+        """Grava o saldo das contas movimentadas desde o último checkpoint"""
+        try:
+            self.extrato.checkpoint(self.conn)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+    
+    async def manter_extrato(self, intervalo=300.0):
+        while True:
+            await asyncio.sleep(intervalo)
+            try:
+                self.checkpoint_extrato()
+            except Exception as e:
+                print(f"Erro ao gravar o checkpoint do extrato: {e}")
+    
+    def add_xp(self, guild_id, user_id, xp_amount):
+        """Retorna o novo level quando há level up"""
+        return self.xp.adicionar(guild_id, user_id, xp_amount)
+
+class SistemaRanking:
+    """Ranking de cada servidor servido de um snapshot em memória
+
+    O snapshot (top `tamanho_snapshot` do servidor pelo índice
+    guild/level/xp) é refeito no máximo a cada `ttl` segundos; todas as
+    páginas do /top saem dele. Nomes vêm do cache de membros do Discord e,
+    fora dele, de um cache com TTL alimentado por fetch_user em paralelo.
+    """
+    def __init__(self, economia, ttl=30.0, tamanho_snapshot=100):
+        self.economia = economia
+        self.ttl = ttl
+        self.tamanho_snapshot = tamanho_snapshot
+        self.snapshots = {}
+        self.nomes = CacheTTL(max_itens=5000, ttl=3600)
+    
+    def invalidar(self, guild_id):
+        self.snapshots.pop(guild_id, None)
+    
+    def top(self, guild_id):
+        snapshot = self.snapshots.get(guild_id)
+        if snapshot is None or time.monotonic() - snapshot[1] > self.ttl:
+            self.economia.xp.descarregar()
+            cursor = self.economia.conn.cursor()
+            cursor.execute('''
+                SELECT user_id, level, xp FROM economia WHERE guild_id = ?
+                ORDER BY level DESC, xp DESC LIMIT ?
+            ''', (guild_id, self.tamanho_snapshot))
+            snapshot = (cursor.fetchall(), time.monotonic())
+            self.snapshots[guild_id] = snapshot
+        return snapshot[0]
+    
+    def pagina(self, guild_id, numero, por_pagina=10):
+        """Retorna (linhas, total_de_paginas) da página pedida (começando em 1)"""
+        snapshot = self.top(guild_id)
+        total = max(1, -(-len(snapshot) // por_pagina))
+        inicio = (numero - 1) * por_pagina
+        return snapshot[inicio:inicio + por_pagina], total
+    
+    async def nomes_para(self, bot, guild, user_ids):
+        """Mapeia user_id -> texto para exibir, sem chamadas REST em série"""
+        nomes = {}
+        faltando = []
+        for user_id in user_ids:
+            member = guild.get_member(user_id) if guild else None
+            if member:
+                nomes[user_id] = member.mention
+                continue
+            nome = self.nomes.get(user_id)
+            if nome is None:
+                user = bot.get_user(user_id)
+                nome = user.name if user else None
+            if nome is None:
+                faltando.append(user_id)
+            else:
+                nomes[user_id] = f"**{nome}**"
+        
+        if faltando:
+            resultados = await asyncio.gather(*(bot.fetch_user(user_id) for user_id in faltando), return_exceptions=True)
+            for user_id, user in zip(faltando, resultados):
+                if isinstance(user, Exception):
+                    nomes[user_id] = f"Usuário {user_id}"
+                else:
+                    self.nomes.set(user_id, user.name)
+                    nomes[user_id] = f"**{user.name}**"
+        
+        return nomes
+
+CONFIG_PADRAO = {"antiraid": False, "antilink": False, "welcome_channel": None, "welcome_message": None}
 
 class SistemaModeracao:
     def __init__(self, db_conn):
         self.conn = db_conn
-        self.setup_tables()
+        self.carregar_configs()
+        self.raid = DetectorRaid()
     
-    def setup_tables(self):
+    def carregar_configs(self):
+        """Carrega a tabela config inteira para o cache (uma vez, na inicialização)"""
         cursor = self.conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS warns (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                moderator_id INTEGER,
-                reason TEXT,
-                timestamp TEXT
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS config (
-                guild_id INTEGER PRIMARY KEY,
-                antiraid INTEGER DEFAULT 0,
-                antilink INTEGER DEFAULT 0,
-                welcome_channel INTEGER,
-                welcome_message TEXT
-            )
-        ''')
-        
+        cursor.execute('SELECT guild_id, antiraid, antilink, welcome_channel, welcome_message FROM config')
+        self.configs = {
+            linha[0]: {"antiraid": bool(linha[1]), "antilink": bool(linha[2]),
+                       "welcome_channel": linha[3], "welcome_message": linha[4]}
+            for linha in cursor.fetchall()
+        }
+    
+    def get_config(self, guild_id):
+        return self.configs.get(guild_id, CONFIG_PADRAO)
+    
+    def set_config(self, guild_id, campo, valor):
+        """Grava um campo sem apagar os outros e atualiza o cache"""
+        if campo not in CONFIG_PADRAO:
+            raise ValueError(f"Campo de config inválido: {campo}")
+        cursor = self.conn.cursor()
+        cursor.execute(f'''
+            INSERT INTO config (guild_id, {campo}) VALUES (?, ?)
+            ON CONFLICT(guild_id) DO UPDATE SET {campo} = excluded.{campo}
+        ''', (guild_id, valor))
         self.conn.commit()
+        
+        config = dict(self.get_config(guild_id))
+        config[campo] = bool(valor) if campo in ("antiraid", "antilink") else valor
+        self.configs[guild_id] = config
     
     def add_warn(self, user_id, moderator_id, reason):
         cursor = self.conn.cursor()
@@ -337,21 +640,65 @@ class BotImperioCompleto(commands.Bot):
         self.config = ConfigVilao()
         self.ia = IAAssassina(self.config.grok_key, self.config.deepseek_key)
         self.backup_system = SistemaBackup()
-        self.conn = sqlite3.connect('imperio.db', check_same_thread=False)
-        self.economia = SistemaEconomia(self.conn)
+        self.conn = conectar('imperio.db', check_same_thread=False)
+        migrar(self.conn, 'imperio')
+        self.economia = SistemaEconomia(self.conn, 'imperio.db')
+        self.ranking = SistemaRanking(self.economia)
         self.moderacao = SistemaModeracao(self.conn)
+        self.tarefas = FilaTarefas()
+    
+    async def setup_hook(self):
+        await self.ia.iniciar()
+        self.loop.create_task(self.economia.xp.executar())
+        self.loop.create_task(self.economia.manter_extrato())
+        self.tarefas.iniciar()
+    
+    async def close(self):
+        await self.tarefas.fechar()
+        self.economia.xp.descarregar()
+        await self.ia.fechar()
+        await super().close()
     
     async def on_ready(self):
         print(f'🤖 {self.user} ESTÁ ONLINE E PRONTO PARA O CAOS!')
         await self.tree.sync()
     
+    async def on_member_join(self, member):
+        if not self.moderacao.get_config(member.guild.id)["antiraid"]:
+            return
+        
+        agora = time.monotonic()
+        ja_em_raid = self.moderacao.raid.em_raid(member.guild.id, agora)
+        if not self.moderacao.raid.registrar(member.guild.id, agora):
+            return
+        
+        if not ja_em_raid and member.guild.system_channel:
+            embed = discord.Embed(title="🛡️ RAID DETECTADO", color=0xff0000)
+            embed.add_field(name="Ação", value="Novos membros serão expulsos por alguns minutos", inline=False)
+            await member.guild.system_channel.send(embed=embed)
+        try:
+            await member.kick(reason="Anti-raid: entradas em massa")
+        except discord.HTTPException:
+            pass
+    
     async def on_message(self, message):
         if message.author.bot:
             return
         
+        # Anti-link
+        if (message.guild and self.moderacao.get_config(message.guild.id)["antilink"]
+                and contem_link(message.content)
+                and not message.author.guild_permissions.manage_messages):
+            try:
+                await message.delete()
+            except discord.HTTPException:
+                pass
+            await message.channel.send(f"🔗 {message.author.mention} links não são permitidos aqui!", delete_after=5)
+            return
+        
         # Adicionar XP por mensagem
         if isinstance(message.channel, discord.TextChannel):
-            level_up = self.economia.add_xp(message.author.id, random.randint(5, 15))
+            level_up = self.economia.add_xp(message.guild.id, message.author.id, random.randint(5, 15))
             if level_up:
                 embed = discord.Embed(title="🎉 LEVEL UP!", color=0x00ff00)
                 embed.add_field(name="Usuário", value=message.author.mention, inline=True)
@@ -361,14 +708,46 @@ class BotImperioCompleto(commands.Bot):
         # Resposta da GROK quando mencionado
         if self.user in message.mentions or (message.reference and message.reference.resolved.author == self.user):
             historico = [{"role": "system", "content": "Você é um assistente sarcástico e inteligente. Responda de forma natural como um humano."}]
-            resposta = await self.ia.grok_resposta(message.content, historico)
-            await message.reply(resposta, mention_author=True)
+            await self.ia.grok_responder(message, historico)
         
         await self.process_commands(message)
 
 # INICIALIZAÇÃO DO IMPERIO
 bot = BotImperioCompleto()
 
+async def em_segundo_plano(interaction, nome, trabalho, grupo=None, ephemeral=False):
+    """Confirma a interação na hora e roda `trabalho` (async, sem argumentos) na fila de tarefas
+    
+    O resultado sai por followup/edit_original_response dentro do próprio trabalho.
+    """
+    await interaction.response.defer(ephemeral=ephemeral, thinking=True)
+    
+    avisado = asyncio.Event()
+    
+    async def executar():
+        # Não deixa o aviso de fila sobrescrever uma resposta que já saiu
+        await avisado.wait()
+        try:
+            await trabalho()
+        except Exception:
+            await interaction.followup.send(f"❌ Erro ao executar `/{nome}`.", ephemeral=True)
+            raise
+    
+    tarefa = bot.tarefas.enviar(interaction.guild_id, nome, executar, grupo, interaction.user.id)
+    if tarefa is None:
+        await interaction.followup.send("⏳ Muitas tarefas na fila deste servidor, tente de novo em instantes.", ephemeral=True)
+        return None
+    
+    try:
+        posicao = bot.tarefas.posicao(tarefa)
+        if posicao:
+            await interaction.edit_original_response(
+                content=f"⏳ Na fila ({posicao} na frente) - tarefa `#{tarefa.id}`, acompanhe com `/tarefas`"
+            )
+    finally:
+        avisado.set()
+    return tarefa
+
 # 🔥 COMANDOS DE ADMINISTRAÇÃO (10 comandos)
 @bot.tree.command(name="ban", description="Bane um usuário permanentemente")
 @app_commands.describe(usuario="Usuário a ser banido", motivo="Motivo do banimento")
@@ -518,17 +897,22 @@ async def warnings(interaction: discord.Interaction, usuario: discord.Member):
         await interaction.response.send_message(f"✅ {usuario.mention} não tem advertências!", ephemeral=True)
         return
     
-    embed = discord.Embed(title=f"📋 ADVERTÊNCIAS - {usuario.display_name}", color=0xffaa00)
-    
-    for warn in warns[:5]:  # Mostrar apenas as 5 primeiras
-        moderator = await bot.fetch_user(warn[2])
-        embed.add_field(
-            name=f"ID: {warn[0]} | {warn[4]}",
-            value=f"**Motivo:** {warn[3]}\n**Por:** {moderator.mention}",
-            inline=False
-        )
+    async def listar():
+        warns_exibidos = warns[:5]  # Mostrar apenas as 5 primeiras
+        moderadores = await bot.ranking.nomes_para(bot, interaction.guild, list({warn[2] for warn in warns_exibidos}))
+        
+        embed = discord.Embed(title=f"📋 ADVERTÊNCIAS - {usuario.display_name}", color=0xffaa00)
+        
+        for warn in warns_exibidos:
+            embed.add_field(
+                name=f"ID: {warn[0]} | {warn[4]}",
+                value=f"**Motivo:** {warn[3]}\n**Por:** {moderadores[warn[2]]}",
+                inline=False
+            )
+        
+        await interaction.followup.send(embed=embed)
     
-    await interaction.response.send_message(embed=embed)
+    await em_segundo_plano(interaction, "warnings", listar)
 
 @bot.tree.command(name="report", description="Reporta um usuário")
 @app_commands.describe(usuario="Usuário a ser reportado", motivo="Motivo do report")
@@ -556,10 +940,9 @@ async def antiraid(interaction: discord.Interaction, estado: bool):
         await interaction.response.send_message("❌ Apenas administradores!", ephemeral=True)
         return
     
-    cursor = bot.conn.cursor()
-    cursor.execute('INSERT OR REPLACE INTO config (guild_id, antiraid) VALUES (?, ?)', 
-                  (interaction.guild.id, int(estado)))
-    bot.conn.commit()
+    bot.moderacao.set_config(interaction.guild.id, "antiraid", int(estado))
+    if not estado:
+        bot.moderacao.raid.encerrar(interaction.guild.id)
     
     estado_text = "**ATIVADO** 🔒" if estado else "**DESATIVADO** 🔓"
     embed = discord.Embed(title="🛡️ PROTEÇÃO ANTI-RAID", color=0x00ff00 if estado else 0xff0000)
@@ -573,10 +956,7 @@ async def antilink(interaction: discord.Interaction, estado: bool):
         await interaction.response.send_message("❌ Apenas administradores!", ephemeral=True)
         return
     
-    cursor = bot.conn.cursor()
-    cursor.execute('INSERT OR REPLACE INTO config (guild_id, antilink) VALUES (?, ?)', 
-                  (interaction.guild.id, int(estado)))
-    bot.conn.commit()
+    bot.moderacao.set_config(interaction.guild.id, "antilink", int(estado))
     
     estado_text = "**ATIVADO** 🔒" if estado else "**DESATIVADO** 🔓"
     embed = discord.Embed(title="🔗 BLOQUEIO DE LINKS", color=0x00ff00 if estado else 0xff0000)
@@ -602,10 +982,7 @@ async def setwelcome(interaction: discord.Interaction, mensagem: str):
         await interaction.response.send_message("❌ Apenas administradores!", ephemeral=True)
         return
     
-    cursor = bot.conn.cursor()
-    cursor.execute('INSERT OR REPLACE INTO config (guild_id, welcome_message) VALUES (?, ?)', 
-                  (interaction.guild.id, mensagem))
-    bot.conn.commit()
+    bot.moderacao.set_config(interaction.guild.id, "welcome_message", mensagem)
     
     embed = discord.Embed(title="👋 MENSAGEM DE BOAS-VINDAS", color=0x00ff00)
     embed.add_field(name="Mensagem", value=mensagem, inline=False)
@@ -664,6 +1041,29 @@ async def ping(interaction: discord.Interaction):
     embed.add_field(name="Latência", value=f"{latency}ms", inline=True)
     embed.add_field(name="Status", value="✅ Online" if latency < 200 else "⚠️ Lento", inline=True)
     
+    for provedor, stats in bot.ia.estatisticas().items():
+        embed.add_field(
+            name=f"🔌 {provedor.title()}",
+            value=f"Reuso: {stats['taxa_reuso']:.0%} ({stats['conexoes_reusadas']}/{stats['conexoes_novas']} novas)\nHandshake: {stats['handshake_medio_ms']:.0f}ms",
+            inline=True
+        )
+    
+    cache = bot.ia.respostas.estatisticas()
+    embed.add_field(
+        name="🧠 Cache de respostas",
+        value=f"Acertos: {cache['taxa_acerto']:.0%} ({cache['hits']}/{cache['hits'] + cache['misses']})\nAgrupadas: {cache['coalescidas']}",
+        inline=True
+    )
+    
+    for uso, stats in bot.ia.roteamento().items():
+        linhas = []
+        for nome, provedor in stats["provedores"].items():
+            latencia = f"{provedor['latencia_ms']:.0f}ms" if provedor["latencia_ms"] is not None else "-"
+            linhas.append(f"{nome}: {provedor['estado']}, {latencia}, erro {provedor['taxa_erro']:.0%}")
+        decisoes = stats["decisoes"]
+        linhas.append(f"Hedge: {decisoes.get('hedge', 0)} ({decisoes.get('hedge_venceu', 0)} venceram) | Failover: {decisoes.get('failover', 0)}")
+        embed.add_field(name=f"🧭 Roteamento ({uso})", value="\n".join(linhas), inline=False)
+    
     await interaction.response.send_message(embed=embed)
 
 @bot.tree.command(name="avatar", description="Mostra avatar de um usuário")
@@ -721,7 +1121,7 @@ async def suggest(interaction: discord.Interaction, sugestao: str):
 @app_commands.describe(usuario="Usuário para ver rank")
 async def rank(interaction: discord.Interaction, usuario: discord.Member = None):
     user = usuario or interaction.user
-    user_data = bot.economia.get_user_data(user.id)
+    user_data = bot.economia.get_user_data(interaction.guild.id, user.id)
     
     embed = discord.Embed(title=f"🏆 RANK - {user.display_name}", color=0xffd700)
     embed.set_thumbnail(url=user.avatar.url if user.avatar else None)
@@ -733,55 +1133,46 @@ async def rank(interaction: discord.Interaction, usuario: discord.Member = None)
     await interaction.response.send_message(embed=embed)
 
 @bot.tree.command(name="top", description="Ranking do servidor")
-async def top(interaction: discord.Interaction):
-    cursor = bot.conn.cursor()
-    cursor.execute('SELECT user_id, level, xp FROM economia ORDER BY level DESC, xp DESC LIMIT 10')
-    top_users = cursor.fetchall()
-    
-    if not top_users:
-        await interaction.response.send_message("❌ Nenhum dado encontrado!", ephemeral=True)
-        return
+@app_commands.describe(pagina="Página do ranking")
+async def top(interaction: discord.Interaction, pagina: int = 1):
+    pagina = max(1, pagina)
     
-    ranking_text = ""
-    for i, (user_id, level, xp) in enumerate(top_users, 1):
-        try:
-            user = await bot.fetch_user(user_id)
-            ranking_text += f"{i}. {user.mention} - Level {level} ({xp} XP)\n"
-        except:
-            ranking_text += f"{i}. Usuário {user_id} - Level {level}\n"
-    
-    embed = discord.Embed(title="🏆 RANKING DO SERVIDOR", color=0xffd700)
-    embed.add_field(name="Top 10", value=ranking_text, inline=False)
+    async def montar():
+        top_users, total_paginas = bot.ranking.pagina(interaction.guild.id, pagina)
+        
+        if not top_users:
+            await interaction.followup.send("❌ Nenhum dado encontrado!")
+            return
+        
+        nomes = await bot.ranking.nomes_para(bot, interaction.guild, [user_id for user_id, _, _ in top_users])
+        
+        inicio = (pagina - 1) * 10
+        ranking_text = ""
+        for i, (user_id, level, xp) in enumerate(top_users, inicio + 1):
+            ranking_text += f"{i}. {nomes[user_id]} - Level {level} ({xp} XP)\n"
+        
+        embed = discord.Embed(title="🏆 RANKING DO SERVIDOR", color=0xffd700)
+        embed.add_field(name=f"Top {inicio + 1}-{inicio + len(top_users)}", value=ranking_text, inline=False)
+        embed.set_footer(text=f"Página {pagina}/{total_paginas}")
+        
+        await interaction.followup.send(embed=embed)
     
-    await interaction.response.send_message(embed=embed)
+    await em_segundo_plano(interaction, "top", montar)
 
 @bot.tree.command(name="daily", description="Resgate diário de moedas")
 async def daily(interaction: discord.Interaction):
-    cursor = bot.conn.cursor()
     today = datetime.datetime.now().strftime('%Y-%m-%d')
     
-    cursor.execute('SELECT last_daily, daily_streak FROM economia WHERE user_id = ?', (interaction.user.id,))
-    result = cursor.fetchone()
+    user_data = bot.economia.get_user_data(interaction.guild.id, interaction.user.id)
     
-    if result and result[0] == today:
+    if user_data[3] == today:
         await interaction.response.send_message("❌ Você já resgatou hoje!", ephemeral=True)
         return
     
-    streak = (result[1] + 1) if result else 1
+    streak = user_data[2] + 1
     coins_earned = 100 + (streak * 20)
     
-    if result:
-        cursor.execute('''
-            UPDATE economia SET coins = coins + ?, daily_streak = ?, last_daily = ?
-            WHERE user_id = ?
-        ''', (coins_earned, streak, today, interaction.user.id))
-    else:
-        cursor.execute('''
-            INSERT INTO economia (user_id, coins, daily_streak, last_daily)
-            VALUES (?, ?, ?, ?)
-        ''', (interaction.user.id, 100 + coins_earned, streak, today))
-    
-    bot.conn.commit()
+    bot.economia.resgatar_daily(interaction.guild.id, interaction.user.id, coins_earned, streak, today)
     
     embed = discord.Embed(title="🎁 RECOMPENSA DIÁRIA", color=0x00ff00)
     embed.add_field(name="Ganho", value=f"🪙 {coins_earned}", inline=True)
@@ -858,7 +1249,7 @@ async def ship(interaction: discord.Interaction, usuario1: discord.Member, usuar
 @app_commands.describe(usuario="Usuário para ver saldo")
 async def balance(interaction: discord.Interaction, usuario: discord.Member = None):
     user = usuario or interaction.user
-    user_data = bot.economia.get_user_data(user.id)
+    user_data = bot.economia.get_user_data(interaction.guild.id, user.id)
     
     coins = user_data[1]
     
@@ -882,17 +1273,15 @@ async def pay(interaction: discord.Interaction, usuario: discord.Member, quantia
         await interaction.response.send_message("❌ Quantia inválida!", ephemeral=True)
         return
     
-    user_data = bot.economia.get_user_data(interaction.user.id)
+    if usuario.id == interaction.user.id:
+        await interaction.response.send_message("❌ Não pode pagar a si mesmo!", ephemeral=True)
+        return
     
-    if user_data[1] < quantia:
+    # Débito condicional e crédito na mesma transação: sem saldo negativo
+    if bot.economia.transferir(interaction.guild.id, interaction.user.id, usuario.id, quantia) is None:
         await interaction.response.send_message("❌ Saldo insuficiente!", ephemeral=True)
         return
     
-    # Debitar do remetente
-    bot.economia.add_coins(interaction.user.id, -quantia)
-    # Creditar ao destinatário
-    bot.economia.add_coins(usuario.id, quantia)
-    
     embed = discord.Embed(title="💸 TRANSFERÊNCIA", color=0x00ff00)
     embed.add_field(name="De", value=interaction.user.mention, inline=True)
     embed.add_field(name="Para", value=usuario.mention, inline=True)
@@ -912,12 +1301,12 @@ async def work(interaction: discord.Interaction):
     
     job, earnings = random.choice(jobs)
     
-    bot.economia.add_coins(interaction.user.id, earnings)
+    bot.economia.add_coins(interaction.guild.id, interaction.user.id, earnings, 'work')
     
     embed = discord.Embed(title="💼 TRABALHO", color=0x00ff00)
     embed.add_field(name="Emprego", value=job, inline=True)
     embed.add_field(name="Ganho", value=f"🪙 {earnings}", inline=True)
-    embed.add_field(name="Saldo Atual", value=f"🪙 {bot.economia.get_user_data(interaction.user.id)[1]}", inline=False)
+    embed.add_field(name="Saldo Atual", value=f"🪙 {bot.economia.get_user_data(interaction.guild.id, interaction.user.id)[1]}", inline=False)
     
     await interaction.response.send_message(embed=embed)
 
@@ -928,7 +1317,7 @@ async def rob(interaction: discord.Interaction, usuario: discord.Member):
         await interaction.response.send_message("❌ Não pode roubar de si mesmo!", ephemeral=True)
         return
     
-    victim_data = bot.economia.get_user_data(usuario.id)
+    victim_data = bot.economia.get_user_data(interaction.guild.id, usuario.id)
     
     if victim_data[1] < 50:
         await interaction.response.send_message("❌ A vítima é muito pobre para roubar!", ephemeral=True)
@@ -938,8 +1327,9 @@ async def rob(interaction: discord.Interaction, usuario: discord.Member):
     
     if success:
         stolen = random.randint(10, min(100, victim_data[1]))
-        bot.economia.add_coins(usuario.id, -stolen)
-        bot.economia.add_coins(interaction.user.id, stolen)
+        if bot.economia.transferir(interaction.guild.id, usuario.id, interaction.user.id, stolen, 'roubo') is None:
+            await interaction.response.send_message("❌ A vítima é muito pobre para roubar!", ephemeral=True)
+            return
         
         embed = discord.Embed(title="💰 ROUBO BEM SUCEDIDO!", color=0xff0000)
         embed.add_field(name="Ladrão", value=interaction.user.mention, inline=True)
@@ -947,7 +1337,7 @@ async def rob(interaction: discord.Interaction, usuario: discord.Member):
         embed.add_field(name="Roubado", value=f"🪙 {stolen}", inline=True)
     else:
         fine = random.randint(20, 50)
-        bot.economia.add_coins(interaction.user.id, -fine)
+        bot.economia.add_coins(interaction.guild.id, interaction.user.id, -fine, 'multa')
         
         embed = discord.Embed(title="🚨 ROUBO FALHOU!", color=0xffaa00)
         embed.add_field(name="Ladrão", value=interaction.user.mention, inline=True)
@@ -977,8 +1367,12 @@ async def shop(interaction: discord.Interaction):
     await interaction.response.send_message(embed=embed)
 
 @bot.tree.command(name="buy", description="Compra um item da loja")
-@app_commands.describe(item_id="ID do item para comprar")
-async def buy(interaction: discord.Interaction, item_id: int):
+@app_commands.describe(item_id="ID do item para comprar", quantidade="Quantas unidades (padrão 1)")
+async def buy(interaction: discord.Interaction, item_id: int, quantidade: int = 1):
+    if not 1 <= quantidade <= 1000:
+        await interaction.response.send_message("❌ Quantidade inválida (1 a 1000)!", ephemeral=True)
+        return
+    
     cursor = bot.conn.cursor()
     cursor.execute('SELECT * FROM loja WHERE item_id = ?', (item_id,))
     item = cursor.fetchone()
@@ -987,51 +1381,143 @@ async def buy(interaction: discord.Interaction, item_id: int):
         await interaction.response.send_message("❌ Item não encontrado!", ephemeral=True)
         return
     
-    user_data = bot.economia.get_user_data(interaction.user.id)
+    # Débito condicional e inventário na mesma transação
+    saldo = bot.economia.comprar(interaction.guild.id, interaction.user.id, {item_id: quantidade}, item[2] * quantidade)
     
-    if user_data[1] < item[2]:
+    if saldo is None:
         await interaction.response.send_message("❌ Saldo insuficiente!", ephemeral=True)
         return
     
-    # Debitar o valor
-    bot.economia.add_coins(interaction.user.id, -item[2])
+    embed = discord.Embed(title="🛒 COMPRA REALIZADA!", color=0x00ff00)
+    embed.add_field(name="Item", value=item[1] if quantidade == 1 else f"{quantidade}x {item[1]}", inline=True)
+    embed.add_field(name="Preço", value=f"🪙 {item[2] * quantidade}", inline=True)
+    embed.add_field(name="Saldo Restante", value=f"🪙 {saldo}", inline=True)
     
-    # Adicionar ao inventário
-    cursor.execute('SELECT quantidade FROM inventario WHERE user_id = ? AND item_id = ?', 
-                  (interaction.user.id, item_id))
-    inventario = cursor.fetchone()
+    await interaction.response.send_message(embed=embed)
+
+@bot.tree.command(name="inventario", description="Mostra os itens de um usuário")
+@app_commands.describe(usuario="Usuário (padrão: você)")
+async def inventario(interaction: discord.Interaction, usuario: discord.Member = None):
+    usuario = usuario or interaction.user
+    itens = bot.economia.itens(interaction.guild.id, usuario.id)
+    
+    if not itens:
+        await interaction.response.send_message(f"🎒 {usuario.display_name} não tem itens!", ephemeral=True)
+        return
     
-    if inventario:
-        cursor.execute('UPDATE inventario SET quantidade = quantidade + 1 WHERE user_id = ? AND item_id = ?',
-                      (interaction.user.id, item_id))
-    else:
-        cursor.execute('INSERT INTO inventario (user_id, item_id) VALUES (?, ?)',
-                      (interaction.user.id, item_id))
+    cursor = bot.conn.cursor()
+    cursor.execute('SELECT item_id, nome FROM loja')
+    nomes = dict(cursor.fetchall())
+    texto = "\n".join(f"**{quantidade}x** {nomes.get(item_id, f'Item {item_id}')}"
+                      for item_id, quantidade in sorted(itens.items()) if quantidade > 0)
+    
+    embed = discord.Embed(title=f"🎒 INVENTÁRIO DE {usuario.display_name.upper()}", description=texto, color=0x00ff00)
+    await interaction.response.send_message(embed=embed)
+
+@bot.tree.command(name="daritem", description="Dá um item a todos os membros de um cargo (admin)")
+@app_commands.describe(cargo="Cargo que recebe", item_id="ID do item", quantidade="Unidades por membro")
+async def daritem(interaction: discord.Interaction, cargo: discord.Role, item_id: int, quantidade: int = 1):
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Apenas administradores!", ephemeral=True)
+        return
     
-    bot.conn.commit()
+    if not 1 <= quantidade <= 1000:
+        await interaction.response.send_message("❌ Quantidade inválida (1 a 1000)!", ephemeral=True)
+        return
     
-    embed = discord.Embed(title="🛒 COMPRA REALIZADA!", color=0x00ff00)
-    embed.add_field(name="Item", value=item[1], inline=True)
-    embed.add_field(name="Preço", value=f"🪙 {item[2]}", inline=True)
-    embed.add_field(name="Saldo Restante", value=f"🪙 {user_data[1] - item[2]}", inline=True)
+    cursor = bot.conn.cursor()
+    cursor.execute('SELECT nome FROM loja WHERE item_id = ?', (item_id,))
+    item = cursor.fetchone()
+    if not item:
+        await interaction.response.send_message("❌ Item não encontrado!", ephemeral=True)
+        return
     
-    await interaction.response.send_message(embed=embed)
+    membros = [m.id for m in cargo.members if not m.bot]
+    
+    async def dar():
+        # Em lotes com commit próprio, numa thread
+        recebidos = await bot.economia.dar_item(interaction.guild.id, membros, item_id, quantidade)
+        await interaction.followup.send(f"🎁 **{quantidade}x {item[0]}** para {recebidos} membros de {cargo.mention}!")
+    
+    await em_segundo_plano(interaction, "daritem", dar, grupo="inventario")
+
+@bot.tree.command(name="novatemporada", description="Zera o inventário do servidor (admin)")
+@app_commands.describe(item_id="Zerar só este item (opcional)")
+async def novatemporada(interaction: discord.Interaction, item_id: int = None):
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Apenas administradores!", ephemeral=True)
+        return
+    
+    async def zerar():
+        apagadas = await bot.economia.nova_temporada(interaction.guild.id, item_id)
+        alvo = f"do item {item_id}" if item_id is not None else "do servidor"
+        await interaction.followup.send(f"🔄 Nova temporada! Inventário {alvo} zerado ({apagadas} registros).")
+    
+    await em_segundo_plano(interaction, "novatemporada", zerar, grupo="inventario")
+
+@bot.tree.command(name="extrato", description="Histórico de moedas de um usuário (admin)")
+@app_commands.describe(usuario="Usuário", data="Saldo em AAAA-MM-DD HH:MM (opcional)")
+async def extrato(interaction: discord.Interaction, usuario: discord.Member, data: str = None):
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Apenas administradores!", ephemeral=True)
+        return
+    
+    quando = None
+    if data:
+        try:
+            quando = datetime.datetime.strptime(data, '%Y-%m-%d %H:%M').timestamp()
+        except ValueError:
+            await interaction.response.send_message("❌ Use o formato AAAA-MM-DD HH:MM", ephemeral=True)
+            return
+    
+    chave = (interaction.guild.id, usuario.id)
+    atual, recalculado = bot.economia.extrato.conferir(bot.conn, chave)
+    movimentos = bot.economia.extrato.movimentos(bot.conn, chave, 10, quando)
+    
+    embed = discord.Embed(title=f"📒 EXTRATO DE {usuario.display_name.upper()}", color=0xf1c40f)
+    embed.add_field(name="Saldo atual", value=f"🪙 {atual}", inline=True)
+    embed.add_field(name="Pelo extrato", value=f"🪙 {recalculado}" + (" ⚠️" if recalculado != atual else ""), inline=True)
+    if quando is not None:
+        embed.add_field(name=f"Em {data}", value=f"🪙 {bot.economia.saldo_em(*chave, quando)}", inline=True)
+    linhas = [
+        f"`#{lancamento_id}` <t:{int(momento)}:f> **{delta:+}** {motivo or '-'}" + (f" ({ref})" if ref else "")
+        for lancamento_id, momento, delta, motivo, ref in movimentos
+    ]
+    embed.add_field(name="Últimos lançamentos", value="\n".join(linhas) or "Nenhum", inline=False)
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
 # 🤖 COMANDOS DE IA E BACKUP
 @bot.tree.command(name="script", description="Gera código com DeepSeek")
 @app_commands.describe(prompt="O que você quer codificar?")
 async def script(interaction: discord.Interaction, prompt: str):
-    await interaction.response.defer()
-    
-    codigo = await bot.ia.deepseek_codigo(prompt)
-    
-    if len(codigo) > 2000:
-        codigo = codigo[:1997] + "..."
+    async def gerar():
+        # O código aparece no lugar do "pensando..." e é atualizado enquanto chega
+        def formatar(codigo):
+            return f"💻 **CÓDIGO GERADO - DEEPSEEK**\n**Prompt:** {prompt[:100]}\n```python\n{codigo}\n```"
+        
+        try:
+            codigo = await exibir_em_partes(
+                bot.ia.deepseek_codigo_partes(prompt),
+                lambda texto: interaction.edit_original_response(content=texto),
+                intervalo=1.5, limite=1800, formatar=formatar
+            )
+        except Exception:
+            codigo = ""
+        if codigo:
+            return
+        
+        codigo = await bot.ia.deepseek_codigo(prompt)
+        
+        if len(codigo) > 2000:
+            codigo = codigo[:1997] + "..."
+        
+        embed = discord.Embed(title="💻 CÓDIGO GERADO - DEEPSEEK", color=0x0099ff)
+        embed.add_field(name="Prompt", value=prompt, inline=False)
+        embed.add_field(name="Código", value=f"```python\n{codigo}\n```", inline=False)
+        await interaction.followup.send(embed=embed)
     
-    embed = discord.Embed(title="💻 CÓDIGO GERADO - DEEPSEEK", color=0x0099ff)
-    embed.add_field(name="Prompt", value=prompt, inline=False)
-    embed.add_field(name="Código", value=f"```python\n{codigo}\n```", inline=False)
-    await interaction.followup.send(embed=embed)
+    await em_segundo_plano(interaction, "script", gerar)
 
 @bot.tree.command(name="backup", description="Faz backup COMPLETO do servidor")
 async def backup(interaction: discord.Interaction):
@@ -1039,36 +1525,151 @@ async def backup(interaction: discord.Interaction):
         await interaction.response.send_message("❌ Apenas administradores!", ephemeral=True)
         return
     
-    await interaction.response.defer()
+    async def salvar():
+        ultima_edicao = 0.0
+        
+        async def progresso(feitos, total):
+            nonlocal ultima_edicao
+            if time.monotonic() - ultima_edicao < 2 and feitos < total:
+                return
+            ultima_edicao = time.monotonic()
+            await interaction.edit_original_response(content=f"💾 Salvando canais... {feitos}/{total}")
+        
+        snapshot_id, relatorio = await bot.backup_system.criar_backup(interaction.guild, progresso)
+        
+        embed = discord.Embed(title="💾 BACKUP CRIADO", color=0x00ff00)
+        embed.add_field(name="Servidor", value=interaction.guild.name, inline=True)
+        embed.add_field(name="Snapshot", value=snapshot_id, inline=True)
+        embed.add_field(name="Canais", value=f"{relatorio['canais']} ({relatorio['mensagens']} mensagens)", inline=True)
+        embed.add_field(name="Tempo", value=f"{relatorio['segundos']:.1f}s", inline=True)
+        if relatorio["falhas"]:
+            embed.add_field(name="Sem acesso", value=f"{relatorio['falhas']} canais", inline=True)
+        if relatorio["inalterado"]:
+            embed.add_field(name="Mudanças", value="Nada mudou desde o último backup", inline=False)
+        elif "mudancas" in relatorio:
+            embed.add_field(name="Mudanças", value=resumo_mudancas(relatorio["mudancas"]), inline=False)
+        embed.add_field(name="Aviso", value="Use /restore_backup com cuidado!", inline=False)
+        
+        await interaction.followup.send(embed=embed)
     
-    backup_file = await bot.backup_system.criar_backup(interaction.guild)
+    await em_segundo_plano(interaction, "backup", salvar, grupo="backup")
+
+def resumo_mudancas(mudancas):
+    linhas = []
+    for tipo, nomes in (("cargos", mudancas["cargos"]), ("canais", mudancas["canais"])):
+        partes = [f"+{len(nomes['novos'])}", f"-{len(nomes['removidos'])}", f"~{len(nomes['alterados'])}"]
+        linhas.append(f"{tipo}: {' '.join(partes)}")
+    return "\n".join(linhas)
+
+@bot.tree.command(name="backups", description="Lista os backups do servidor")
+async def backups(interaction: discord.Interaction):
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Apenas administradores!", ephemeral=True)
+        return
+    
+    manifestos = await asyncio.to_thread(bot.backup_system.snapshots.listar, interaction.guild.id)
+    if not manifestos:
+        await interaction.response.send_message("📭 Nenhum backup ainda. Use `/backup`", ephemeral=True)
+        return
     
-    embed = discord.Embed(title="💾 BACKUP CRIADO", color=0x00ff00)
-    embed.add_field(name="Servidor", value=interaction.guild.name, inline=True)
-    embed.add_field(name="Arquivo", value=os.path.basename(backup_file), inline=True)
-    embed.add_field(name="Aviso", value="Use /restore_backup com cuidado!", inline=False)
+    embed = discord.Embed(title="💾 BACKUPS DO SERVIDOR", color=0x3498db)
+    for manifesto in reversed(manifestos[-10:]):
+        embed.add_field(
+            name=manifesto["id"],
+            value=f"{len(manifesto['canais'])} canais, {len(manifesto['cargos'])} cargos",
+            inline=False
+        )
+    embed.set_footer(text=f"{len(manifestos)} backups guardados (máximo {bot.backup_system.manter})")
     
-    await interaction.followup.send(embed=embed)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
-@bot.tree.command(name="restore_backup", description="RESTAURA backup (CUIDADO!)")
-@app_commands.describe(arquivo="Nome do arquivo de backup")
-async def restore_backup(interaction: discord.Interaction, arquivo: str):
+@bot.tree.command(name="exportar_backup", description="Baixa um backup num arquivo compactado")
+@app_commands.describe(snapshot="Id do snapshot (veja /backups)")
+async def exportar_backup(interaction: discord.Interaction, snapshot: str):
     if not interaction.user.guild_permissions.administrator:
         await interaction.response.send_message("❌ Apenas administradores!", ephemeral=True)
         return
     
-    backup_file = os.path.join(bot.backup_system.backup_dir, arquivo)
+    async def exportar():
+        caminho = os.path.join(bot.backup_system.backup_dir, f"{os.path.basename(snapshot)}.ndjson.gz")
+        try:
+            await asyncio.to_thread(bot.backup_system.snapshots.exportar, interaction.guild.id, snapshot, caminho)
+        except OSError:
+            await interaction.followup.send("❌ Snapshot não encontrado! Veja `/backups`", ephemeral=True)
+            return
+        
+        if os.path.getsize(caminho) > 8 * 1024 * 1024:
+            await interaction.followup.send(f"📦 Arquivo grande demais para o Discord, salvo em `{caminho}`", ephemeral=True)
+            return
+        
+        await interaction.followup.send(
+            f"📦 Use `/restore_backup arquivo:{os.path.basename(caminho)}` para restaurar a partir dele",
+            file=discord.File(caminho),
+            ephemeral=True
+        )
     
-    if not os.path.exists(backup_file):
-        await interaction.response.send_message("❌ Arquivo de backup não encontrado!", ephemeral=True)
+    await em_segundo_plano(interaction, "exportar_backup", exportar, grupo="backup", ephemeral=True)
+
+@bot.tree.command(name="restore_backup", description="RESTAURA backup (CUIDADO!)")
+@app_commands.describe(
+    arquivo="Id do snapshot (veja /backups) ou arquivo de backup antigo",
+    simular="Só mostra o que mudaria (padrão: sim)"
+)
+async def restore_backup(interaction: discord.Interaction, arquivo: str, simular: bool = True):
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Apenas administradores!", ephemeral=True)
         return
     
-    embed = discord.Embed(title="⚠️ ALERTA CRÍTICO", color=0xff0000)
-    embed.add_field(name="AÇÃO IRREVERSÍVEL", value="Isso vai DESTRUIR o servidor atual e restaurar o backup!", inline=False)
-    embed.add_field(name="Arquivo", value=arquivo, inline=True)
-    embed.add_field(name="Servidor", value=interaction.guild.name, inline=True)
+    if not await asyncio.to_thread(bot.backup_system.existe, interaction.guild.id, arquivo):
+        await interaction.response.send_message("❌ Backup não encontrado! Veja `/backups`", ephemeral=True)
+        return
     
-    await interaction.response.send_message(embed=embed)
+    async def aplicar():
+        plano, relatorio, chamadas_completa = await bot.backup_system.reconciliar_backup(interaction.guild, arquivo, simular)
+        
+        if relatorio is None:
+            embed = discord.Embed(title="⚠️ PLANO DE RESTAURAÇÃO", description=resumir_plano(plano), color=0xff9900)
+            embed.add_field(name="Arquivo", value=arquivo, inline=True)
+            embed.add_field(name="Restauração completa", value=f"~{chamadas_completa} chamadas", inline=True)
+            embed.add_field(name="Aplicar", value="Rode de novo com `simular: False` (só estas operações serão feitas)", inline=False)
+        else:
+            embed = discord.Embed(title="♻️ BACKUP APLICADO", description=resumir(relatorio), color=0x00ff00)
+            embed.add_field(name="Operações", value=str(len(plano["operacoes"])), inline=True)
+            embed.add_field(name="Chamadas", value=f"{plano['chamadas']} (completa: ~{chamadas_completa})", inline=True)
+        
+        try:
+            await interaction.followup.send(embed=embed)
+        except discord.HTTPException:
+            # O canal do comando pode ter sido apagado pela restauração
+            pass
+    
+    await em_segundo_plano(interaction, "restore_backup", aplicar, grupo="backup")
+
+@bot.tree.command(name="tarefas", description="Mostra as tarefas em andamento do servidor")
+@app_commands.describe(tarefa="Número da tarefa (opcional)")
+async def tarefas(interaction: discord.Interaction, tarefa: int = None):
+    if tarefa is not None:
+        encontrada = bot.tarefas.obter(tarefa)
+        lista = [encontrada] if encontrada and encontrada.guild_id == interaction.guild_id else []
+    else:
+        lista = bot.tarefas.listar(interaction.guild_id)
+    
+    if not lista:
+        await interaction.response.send_message("📭 Nenhuma tarefa encontrada.", ephemeral=True)
+        return
+    
+    embed = discord.Embed(title="⏳ TAREFAS DO SERVIDOR", color=0x3498db)
+    for item in lista:
+        valor = f"{item.estado} ({item.segundos():.0f}s) - <@{item.dono}>"
+        if item.estado == "na fila":
+            valor += f"\n{bot.tarefas.posicao(item)} na frente"
+        elif item.erro:
+            valor += f"\n{item.erro[:200]}"
+        embed.add_field(name=f"#{item.id} /{item.nome}", value=valor, inline=False)
+    stats = bot.tarefas.estatisticas()
+    embed.set_footer(text=f"Fila global: {stats['na_fila']} esperando, {stats['executando']} executando")
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
 # 🆘 COMANDO HELP COMPLETO
 @bot.tree.command(name="helptz", description="Painel completo do IMPÉRIO")
@@ -1083,18 +1684,18 @@ async def helptz(interaction: discord.Interaction):
     
     ent_text = "• `/rank` - Seu nível\n• `/top` - Ranking\n• `/daily` - Diária\n• `/meme` - Meme\n• `/kiss` - Beijar\n• `/hug` - Abraçar\n• `/ship` - Compatibilidade"
     
-    eco_text = "• `/balance` - Saldo\n• `/pay` - Transferir\n• `/work` - Trabalhar\n• `/rob` - Roubar\n• `/shop` - Loja\n• `/buy` - Comprar"
+    eco_text = "• `/balance` - Saldo\n• `/pay` - Transferir\n• `/work` - Trabalhar\n• `/rob` - Roubar\n• `/shop` - Loja\n• `/buy` - Comprar\n• `/inventario` - Itens\n• `/daritem` - Dar item a cargo\n• `/novatemporada` - Zerar inventário\n• `/extrato` - Histórico"
     
-    ia_text = "• `Mencione o bot` - Resposta IA\n• `/script` - Gerar código\n• `/backup` - Backup\n• `/restore_backup` - Restaurar"
+    ia_text = "• `Mencione o bot` - Resposta IA\n• `/script` - Gerar código\n• `/backup` - Backup\n• `/backups` - Listar backups\n• `/exportar_backup` - Exportar backup\n• `/restore_backup` - Restaurar\n• `/tarefas` - Tarefas em andamento"
     
     embed.add_field(name="🔧 ADMINISTRAÇÃO (10)", value=admin_text, inline=True)
     embed.add_field(name="🛡️ MODERAÇÃO (7)", value=mod_text, inline=True)
     embed.add_field(name="🔧 UTILIDADE (7)", value=util_text, inline=True)
     embed.add_field(name="🎉 ENTRETENIMENTO (7)", value=ent_text, inline=True)
-    embed.add_field(name="💰 ECONOMIA (6)", value=eco_text, inline=True)
-    embed.add_field(name="🤖 IA & BACKUP (4)", value=ia_text, inline=True)
+    embed.add_field(name="💰 ECONOMIA (10)", value=eco_text, inline=True)
+    embed.add_field(name="🤖 IA & BACKUP (7)", value=ia_text, inline=True)
     
-    embed.set_footer(text="Total: 41 comandos | Bot Império - Dominação Total")
+    embed.set_footer(text="Total: 48 comandos | Bot Império - Dominação Total")
     await interaction.response.send_message(embed=embed)
 
 if __name__ == "__main__":
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import time
+
+
+# Agora (epoch, com fração) calculado pelo SQLite na hora em que a instrução grava, ou seja,
+# já com a trava de escrita: entre processos no mesmo banco, a ordem dos ids é a ordem do tempo
+AGORA = "((julianday('now') - 2440587.5) * 86400.0)"
+
+
+class Extrato:
+    """Livro-razão só de inserções para uma tabela de saldos
+
+    Cada mudança de saldo vira uma linha em `<tabela>_extrato` (conta, delta,
+    motivo), gravada pela mesma conexão e na mesma transação do UPDATE do
+    saldo: se um for desfeito (ou o processo cair antes do commit), o outro
+    também é, então saldo e extrato nunca divergem. De tempos em tempos
+    `checkpoint()` grava em `<tabela>_checkpoints` o saldo de cada conta
+    movimentada desde o último, então `saldo_em()` reconstrói o saldo de
+    qualquer momento somando só os lançamentos depois do checkpoint anterior
+    àquele momento. Saldos que já existiam quando o extrato foi
+    criado entram como checkpoint inicial (ate_id = 0); antes disso o
+    histórico é desconhecido.
+
+    Como Carteira, nada aqui faz commit: quem chama decide.
+    """
+
+    def __init__(self, tabela, saldo, chaves):
+        self.tabela = tabela
+        self.saldo_coluna = saldo
+        self.chaves = chaves
+        self.lancamentos = f'{tabela}_extrato'
+        self.checkpoints = f'{tabela}_checkpoints'
+        colunas = ', '.join(chaves)
+        filtro = ' AND '.join(f'{chave} = ?' for chave in chaves)
+        mesma_conta = ' AND '.join(f'c.{chave} = e.{chave}' for chave in chaves)
+        self._sql_lancar = (f'INSERT INTO {self.lancamentos} (quando, {colunas}, delta, motivo, ref) '
+                            f'VALUES ({AGORA}, {", ".join("?" for _ in chaves)}, ?, ?, ?)')
+        # Uma instrução só: o último checkpoint, o último id e a hora saem do mesmo
+        # instante do banco, com a trava de escrita (nada entra entre eles)
+        self._sql_checkpoint = (
+            f'INSERT INTO {self.checkpoints} ({colunas}, ate_id, quando, saldo) '
+            f'SELECT {", ".join(f"e.{chave}" for chave in chaves)}, m.ate_id, {AGORA}, '
+            f'COALESCE((SELECT c.saldo FROM {self.checkpoints} c WHERE {mesma_conta} '
+            f'ORDER BY c.ate_id DESC LIMIT 1), 0) + SUM(e.delta) '
+            f'FROM {self.lancamentos} e, (SELECT MAX(id) AS ate_id FROM {self.lancamentos}) m '
+            f'WHERE e.id > (SELECT COALESCE(MAX(ate_id), 0) FROM {self.checkpoints}) AND e.id <= m.ate_id '
+            f'GROUP BY {", ".join(f"e.{chave}" for chave in chaves)}'
+        )
+        self._sql_base = (f'SELECT ate_id, saldo FROM {self.checkpoints} '
+                          f'WHERE {filtro} AND quando <= ? ORDER BY quando DESC LIMIT 1')
+        self._sql_teto = (f'SELECT ate_id FROM {self.checkpoints} '
+                          f'WHERE {filtro} AND quando > ? ORDER BY quando LIMIT 1')
+        self._sql_soma = (f'SELECT COALESCE(SUM(delta), 0) FROM {self.lancamentos} '
+                          f'WHERE {filtro} AND id > ? AND id <= ? AND quando <= ?')
+        self._sql_movimentos = (f'SELECT id, quando, delta, motivo, ref FROM {self.lancamentos} '
+                                f'WHERE {filtro} AND quando <= ? ORDER BY id DESC LIMIT ?')
+        self._sql_atual = f'SELECT {saldo} FROM {tabela} WHERE {filtro}'
+
+    def criar_tabelas(self, conn):
+        """Cria extrato e checkpoints; na primeira vez, registra os saldos atuais como ponto de partida"""
+        colunas = ', '.join(f'{chave} NOT NULL' for chave in self.chaves)
+        conn.execute(f'''CREATE TABLE IF NOT EXISTS {self.lancamentos} (
+            id INTEGER PRIMARY KEY,
+            quando REAL NOT NULL,
+            {colunas},
+            delta INTEGER NOT NULL,
+            motivo TEXT,
+            ref TEXT
+        )''')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{self.lancamentos}_conta '
+                     f'ON {self.lancamentos} ({", ".join(self.chaves)}, id)')
+        existia = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                               (self.checkpoints,)).fetchone()
+        conn.execute(f'''CREATE TABLE IF NOT EXISTS {self.checkpoints} (
+            {colunas},
+            ate_id INTEGER NOT NULL,
+            quando REAL NOT NULL,
+            saldo INTEGER NOT NULL,
+            PRIMARY KEY ({", ".join(self.chaves)}, ate_id)
+        )''')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{self.checkpoints}_ate ON {self.checkpoints} (ate_id)')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{self.checkpoints}_quando '
+                     f'ON {self.checkpoints} ({", ".join(self.chaves)}, quando)')
+        if not existia:
+            # OR IGNORE: dois processos subindo juntos no mesmo banco podem chegar aqui ao mesmo tempo
+            conn.execute(f'INSERT OR IGNORE INTO {self.checkpoints} ({", ".join(self.chaves)}, ate_id, quando, saldo) '
+                         f'SELECT {", ".join(self.chaves)}, 0, ?, {self.saldo_coluna} FROM {self.tabela} '
+                         f'WHERE {self.saldo_coluna} != 0', (time.time(),))
+
+    def lancar(self, conn, chave, delta, motivo, ref=None):
+        """Grava uma mudança de saldo; chame na mesma transação, depois que o UPDATE deu certo"""
+        if delta:
+            conn.execute(self._sql_lancar, (*chave, delta, motivo, ref))
+
+    def checkpoint(self, conn):
+        """Grava o saldo das contas movimentadas desde o último checkpoint; devolve quantas"""
+        return conn.execute(self._sql_checkpoint).rowcount
+
+    def saldo_em(self, conn, chave, quando=None):
+        """Saldo da conta no instante `quando` (timestamp; None = agora), recalculado pelo extrato
+
+        Soma ao checkpoint anterior a `quando` só os lançamentos até o
+        checkpoint seguinte da mesma conta, então o custo depende do
+        intervalo entre checkpoints e não do tamanho do histórico.
+        """
+        if quando is None:
+            quando = time.time()
+        base = conn.execute(self._sql_base, (*chave, quando)).fetchone()
+        ate_id, saldo = base if base else (0, 0)
+        teto = conn.execute(self._sql_teto, (*chave, quando)).fetchone()
+        teto = teto[0] if teto else 2 ** 63 - 1
+        return saldo + conn.execute(self._sql_soma, (*chave, ate_id, teto, quando)).fetchone()[0]
+
+    def conferir(self, conn, chave):
+        """(saldo na tabela, saldo pelo extrato); diferentes indicam escrita fora do extrato"""
+        linha = conn.execute(self._sql_atual, chave).fetchone()
+        return (linha[0] if linha else 0), self.saldo_em(conn, chave)
+
+    def movimentos(self, conn, chave, limite=10, ate=None):
+        """Últimos lançamentos da conta até `ate`: (id, quando, delta, motivo, ref)"""
+        return conn.execute(self._sql_movimentos, (*chave, ate if ate is not None else time.time(), limite)).fetchall()
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import time
+from collections import OrderedDict, deque
+
+# Custo aproximado de cada turno além do texto (tupla + deque + str)
+CUSTO_TURNO = 80
+
+
+class _Conversa:
+    __slots__ = ('turnos', 'bytes', 'visto')
+
+    def __init__(self, turnos, max_turnos):
+        self.turnos = deque(turnos, maxlen=max_turnos)
+        self.bytes = sum(len(texto) + CUSTO_TURNO for _, texto in self.turnos)
+        self.visto = time.monotonic()
+
+
+def _criar_tabela(conn):
+    """historico_ia com chave (bot, user_id): bots que dividem o banco não se sobrescrevem"""
+    colunas = [coluna[1] for coluna in conn.execute('PRAGMA table_info(historico_ia)').fetchall()]
+    if 'bot' in colunas:
+        return
+    if colunas:
+        conn.execute('ALTER TABLE historico_ia RENAME TO historico_ia_antigo')
+    conn.execute('''CREATE TABLE historico_ia (
+        bot TEXT NOT NULL DEFAULT '',
+        user_id TEXT NOT NULL,
+        turnos TEXT,
+        PRIMARY KEY (bot, user_id)
+    )''')
+    if colunas:
+        # Linhas da chave antiga não dizem de qual bot são: ficam com bot = '' e
+        # servem a qualquer bot do banco até ele gravar a sua
+        conn.execute("INSERT INTO historico_ia (bot, user_id, turnos) SELECT '', user_id, turnos FROM historico_ia_antigo")
+        conn.execute('DROP TABLE historico_ia_antigo')
+
+
+def _gravar(conn, linhas):
+    _criar_tabela(conn)
+    conn.executemany('INSERT OR REPLACE INTO historico_ia (bot, user_id, turnos) VALUES (?, ?, ?)', linhas)
+
+
+def _ler(conn, bot, user_id):
+    _criar_tabela(conn)
+    row = conn.execute("SELECT turnos FROM historico_ia WHERE bot IN (?, '') AND user_id = ? ORDER BY bot = '' LIMIT 1",
+                       (bot, user_id)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+class HistoricoConversas:
+    """Histórico das conversas com a IA com memória limitada
+
+    Cada usuário tem um deque de tamanho fixo com tuplas (eh_bot, texto).
+    Usuários ociosos (TTL), os menos recentes (LRU) e o excesso acima do
+    orçamento de bytes saem da memória; com `banco` (BancoAssincrono) eles
+    vão para a tabela historico_ia, sob o nome `bot` (bots que dividem o
+    arquivo têm históricos separados), e voltam na próxima mensagem.
+    """
+
+    def __init__(self, max_turnos=30, max_usuarios=5000, ttl=6 * 3600, orcamento_bytes=16 * 1024 * 1024, banco=None,
+                 bot=''):
+        self.bot = bot
+        self.max_turnos = max_turnos
+        self.max_usuarios = max_usuarios
+        self.ttl = ttl
+        self.orcamento_bytes = orcamento_bytes
+        self.banco = banco
+        self.bytes = 0
+        self.despejados = 0
+        self.recuperados = 0
+        self._usuarios = OrderedDict()
+        self._pendentes = {}
+        self._tarefa = None
+
+    async def recentes(self, user_id, quantidade):
+        """Últimos `quantidade` turnos do usuário, do mais antigo ao mais novo"""
+        conversa = self._usuarios.get(user_id)
+        if conversa is None:
+            conversa = await self._recuperar(user_id)
+            if conversa is None:
+                return []
+        self._usuarios.move_to_end(user_id)
+        conversa.visto = time.monotonic()
+        turnos = list(conversa.turnos)
+        return turnos[len(turnos) - quantidade:] if quantidade < len(turnos) else turnos
+
+    async def adicionar(self, user_id, pergunta, resposta):
+        """Registra uma troca
+
+        Se o usuário saiu da memória (por exemplo durante a chamada à IA), o
+        histórico volta dos pendentes ou do banco antes, para a troca nova
+        não substituir o que já estava gravado.
+        """
+        conversa = self._usuarios.get(user_id)
+        if conversa is None:
+            conversa = await self._recuperar(user_id)
+        if conversa is None:
+            conversa = self._usuarios[user_id] = _Conversa((), self.max_turnos)
+        else:
+            self._usuarios.move_to_end(user_id)
+
+        for turno in ((False, pergunta), (True, resposta)):
+            if len(conversa.turnos) == conversa.turnos.maxlen:
+                removido = len(conversa.turnos[0][1]) + CUSTO_TURNO
+                conversa.bytes -= removido
+                self.bytes -= removido
+            conversa.turnos.append(turno)
+            conversa.bytes += len(turno[1]) + CUSTO_TURNO
+            self.bytes += len(turno[1]) + CUSTO_TURNO
+        conversa.visto = time.monotonic()
+        self._podar()
+
+    def _podar(self):
+        agora = time.monotonic()
+        while len(self._usuarios) > 1:
+            user_id, conversa = next(iter(self._usuarios.items()))
+            if (len(self._usuarios) <= self.max_usuarios and self.bytes <= self.orcamento_bytes
+                    and conversa.visto + self.ttl >= agora):
+                break
+            del self._usuarios[user_id]
+            self.bytes -= conversa.bytes
+            self.despejados += 1
+            if self.banco is not None:
+                self._pendentes[user_id] = list(conversa.turnos)
+
+        if self._pendentes and (self._tarefa is None or self._tarefa.done()):
+            self._tarefa = asyncio.ensure_future(self.descarregar_async())
+
+    async def _recuperar(self, user_id):
+        turnos = self._pendentes.pop(user_id, None)
+        if turnos is None and self.banco is not None:
+            turnos = await self.banco.executar(_ler, self.bot, user_id)
+            if user_id in self._usuarios:
+                # Outra mensagem do mesmo usuário chegou enquanto líamos o banco
+                return self._usuarios[user_id]
+        if not turnos:
+            return None
+        conversa = self._usuarios[user_id] = _Conversa((tuple(t) for t in turnos), self.max_turnos)
+        self.bytes += conversa.bytes
+        self.recuperados += 1
+        return conversa
+
+    def _linhas_pendentes(self):
+        linhas = [(self.bot, user_id, json.dumps(turnos, ensure_ascii=False))
+                  for user_id, turnos in self._pendentes.items()]
+        self._pendentes.clear()
+        return linhas
+
+    async def descarregar_async(self):
+        """Grava no banco os usuários que saíram da memória"""
+        if self.banco is not None and self._pendentes:
+            await self.banco.executar(_gravar, self._linhas_pendentes())
+
+    def descarregar(self):
+        """Grava todos os históricos no banco (desligamento); antes de banco.fechar()"""
+        if self.banco is None:
+            return
+        for user_id, conversa in self._usuarios.items():
+            self._pendentes[user_id] = list(conversa.turnos)
+        if self._pendentes:
+            self.banco.executar_sincrono(_gravar, self._linhas_pendentes())
+
+    def importar(self, antigo):
+        """Converte o formato antigo {user_id: [{"author", "content"}]} e esvazia o dicionário
+
+        Devolve os user_ids importados.
+        """
+        importados = list(antigo)
+        for user_id, mensagens in antigo.items():
+            turnos = [(m.get("author") == "bot", m.get("content", "")) for m in mensagens][-self.max_turnos:]
+            if self.banco is not None:
+                self._pendentes[user_id] = turnos
+            else:
+                conversa = self._usuarios[user_id] = _Conversa(turnos, self.max_turnos)
+                self.bytes += conversa.bytes
+        antigo.clear()
+        self._podar()
+        return importados
+
+    def estatisticas(self):
+        return {
+            'usuarios': len(self._usuarios),
+            'bytes': self.bytes,
+            'despejados': self.despejados,
+            'recuperados': self.recuperados
+        }
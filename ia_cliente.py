@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import time
+import aiohttp
+
+DEEPSEEK_URL = 'https://api.deepseek.com/v1/chat/completions'
+
+
+class ClienteIA:
+    """Sessão HTTP compartilhada (keep-alive) para as APIs de chat"""
+
+    def __init__(self, limite_por_host=20, timeout=15):
+        self.limite_por_host = limite_por_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=5)
+        self._sessao = None
+        self._lock = asyncio.Lock()
+        self.conexoes_novas = 0
+        self.conexoes_reusadas = 0
+        self.tempo_handshake = 0.0
+
+    def _trace_config(self):
+        """Conta conexões novas/reaproveitadas e o tempo gasto abrindo conexões"""
+        trace = aiohttp.TraceConfig()
+
+        async def inicio_conexao(session, ctx, params):
+            ctx.inicio = asyncio.get_running_loop().time()
+
+        async def fim_conexao(session, ctx, params):
+            self.conexoes_novas += 1
+            self.tempo_handshake += asyncio.get_running_loop().time() - ctx.inicio
+
+        async def conexao_reusada(session, ctx, params):
+            self.conexoes_reusadas += 1
+
+        trace.on_connection_create_start.append(inicio_conexao)
+        trace.on_connection_create_end.append(fim_conexao)
+        trace.on_connection_reuseconn.append(conexao_reusada)
+        return trace
+
+    async def sessao(self):
+        """Cria a sessão na primeira chamada e reaproveita nas seguintes"""
+        if self._sessao is None or self._sessao.closed:
+            async with self._lock:
+                if self._sessao is None or self._sessao.closed:
+                    connector = aiohttp.TCPConnector(
+                        limit_per_host=self.limite_por_host,
+                        keepalive_timeout=60,
+                        ttl_dns_cache=300
+                    )
+                    self._sessao = aiohttp.ClientSession(
+                        connector=connector,
+                        timeout=self.timeout,
+                        trace_configs=[self._trace_config()]
+                    )
+        return self._sessao
+
+    async def completar(self, url, chave, payload):
+        """Envia o payload e devolve o texto da resposta, ou None se a API recusar"""
+        headers = {
+            'Authorization': f'Bearer {chave}',
+            'Content-Type': 'application/json'
+        }
+        sessao = await self.sessao()
+        async with sessao.post(url, json=payload, headers=headers) as response:
+            if response.status != 200:
+                return None
+            data = await response.json()
+            choices = data.get('choices') or []
+            if not choices:
+                return None
+            return choices[0]['message']['content']
+
+    async def transmitir(self, url, chave, payload):
+        """Como completar(), mas com 'stream': True: gera os pedaços do texto conforme chegam (SSE)
+
+        O limite de tempo vale entre pedaços, não para a resposta inteira.
+        """
+        headers = {
+            'Authorization': f'Bearer {chave}',
+            'Content-Type': 'application/json'
+        }
+        timeout = aiohttp.ClientTimeout(total=None, connect=5, sock_read=self.timeout.total)
+        sessao = await self.sessao()
+        async with sessao.post(url, json={**payload, 'stream': True}, headers=headers, timeout=timeout) as response:
+            if response.status != 200:
+                return
+            async for linha in response.content:
+                linha = linha.strip()
+                if not linha.startswith(b'data:'):
+                    continue
+                dados = linha[5:].strip()
+                if dados == b'[DONE]':
+                    break
+                try:
+                    evento = json.loads(dados)
+                except ValueError:
+                    continue
+                choices = evento.get('choices') or []
+                if choices:
+                    pedaco = (choices[0].get('delta') or {}).get('content')
+                    if pedaco:
+                        yield pedaco
+
+    async def responder(self, canal, url, chave, payload, respostas=None, enviar=None):
+        """Transmite a resposta para o canal e devolve o texto (None se nada chegou)
+
+        Com `respostas` (CacheRespostas) uma resposta em cache é enviada
+        direto e a transmitida entra no cache. `enviar(texto)` troca o
+        canal.send padrão (por exemplo message.reply).
+        """
+        return await responder_em_partes(canal, self.transmitir(url, chave, payload), payload['messages'], respostas, enviar)
+
+    def estatisticas(self):
+        total = self.conexoes_novas + self.conexoes_reusadas
+        return {
+            'conexoes_novas': self.conexoes_novas,
+            'conexoes_reusadas': self.conexoes_reusadas,
+            'taxa_reuso': self.conexoes_reusadas / total if total else 0.0,
+            'handshake_medio_ms': (self.tempo_handshake / self.conexoes_novas * 1000) if self.conexoes_novas else 0.0
+        }
+
+    async def fechar(self):
+        if self._sessao is not None and not self._sessao.closed:
+            await self._sessao.close()
+        self._sessao = None
+
+
+async def exibir_em_partes(pedacos, enviar, intervalo=1.0, limite=2000, formatar=None):
+    """Mostra um texto gerado aos poucos: envia o primeiro pedaço e edita a mensagem
+
+    As edições ficam espaçadas por `intervalo` segundos (o Discord limita
+    edições por canal) e a última sempre traz o texto completo. Se a
+    transmissão cair depois da primeira mensagem, fica o que já chegou.
+    Devolve o texto completo ('' se nada chegou).
+    """
+    formatar = formatar or (lambda texto: texto)
+    partes = []
+    mensagem = None
+    mostrado = 0
+    ultima_edicao = 0.0
+    try:
+        async for pedaco in pedacos:
+            partes.append(pedaco)
+            agora = time.monotonic()
+            if mensagem is None:
+                texto = ''.join(partes)
+                if texto.strip():
+                    mensagem = await enviar(formatar(texto[:limite]))
+                    mostrado, ultima_edicao = len(partes), agora
+            elif agora - ultima_edicao >= intervalo:
+                await mensagem.edit(content=formatar(''.join(partes)[:limite]))
+                mostrado, ultima_edicao = len(partes), agora
+    except Exception:
+        if mensagem is None:
+            raise
+    texto = ''.join(partes)
+    if mensagem is not None and mostrado != len(partes):
+        await mensagem.edit(content=formatar(texto[:limite]))
+    return texto.strip()
+
+
+async def responder_em_partes(canal, pedacos, mensagens, respostas=None, enviar=None):
+    """Envia no canal o texto gerado por `pedacos` (veja ClienteIA.responder)"""
+    enviar = enviar or canal.send
+    if respostas is not None:
+        chave_cache = respostas.chave(mensagens)
+        pronta = respostas.respostas.get(chave_cache)
+        if pronta is not None:
+            await enviar(pronta)
+            return pronta
+
+    async with canal.typing():
+        texto = await exibir_em_partes(pedacos, enviar)
+    if not texto:
+        return None
+    if respostas is not None:
+        respostas.respostas.set(chave_cache, texto)
+    return texto
+
+
+cliente_ia = ClienteIA()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from cache import CacheTTL
+
+
+class Inventario:
+    """Quantidade de cada item por (servidor, usuário), com chave composta e UPSERT
+
+    A tabela tem chave primária (guild_id, user_id, item_id): uma linha por
+    item, achada pelo índice da chave, e somar itens é um único
+    INSERT ... ON CONFLICT DO UPDATE. As operações em massa (vários itens,
+    muitos usuários, reset de temporada) são um executemany ou um DELETE só,
+    que também aceitam uma fatia por vez para caber em transações curtas.
+    Como a Carteira, nada aqui faz commit; quem desfaz a transação chama
+    `esquecer()` para o cache não guardar o que não foi gravado.
+
+    Os itens de cada usuário ficam num CacheTTL. Escritas de um usuário
+    atualizam o cache com a quantidade devolvida pelo RETURNING; as em
+    massa não tocam nele (podem rodar em outra thread, com outra conexão)
+    e quem chama faz `esquecer()` depois do commit.
+    """
+
+    def __init__(self, tabela='inventario', max_cache=5000, ttl=600):
+        self.tabela = tabela
+        self.cache = CacheTTL(max_itens=max_cache, ttl=ttl)
+        self._sql_adicionar = (f'INSERT INTO {tabela} (guild_id, user_id, item_id, quantidade) VALUES (?, ?, ?, ?) '
+                               f'ON CONFLICT (guild_id, user_id, item_id) '
+                               f'DO UPDATE SET quantidade = quantidade + excluded.quantidade')
+        self._sql_itens = f'SELECT item_id, quantidade FROM {tabela} WHERE guild_id = ? AND user_id = ?'
+
+    def itens(self, conn, guild_id, user_id):
+        """{item_id: quantidade} do usuário no servidor"""
+        chave = (guild_id, user_id)
+        itens = self.cache.get(chave)
+        if itens is None:
+            itens = dict(conn.execute(self._sql_itens, chave).fetchall())
+            self.cache.set(chave, itens)
+        return itens
+
+    def quantidade(self, conn, guild_id, user_id, item_id):
+        return self.itens(conn, guild_id, user_id).get(item_id, 0)
+
+    def adicionar(self, conn, guild_id, user_id, item_id, quantidade=1):
+        """Soma `quantidade` do item (criando a linha se preciso); devolve o total"""
+        total = conn.execute(self._sql_adicionar + ' RETURNING quantidade',
+                             (guild_id, user_id, item_id, quantidade)).fetchone()[0]
+        itens = self.cache.get((guild_id, user_id))
+        if itens is not None:
+            itens[item_id] = total
+        return total
+
+    def adicionar_varios(self, conn, guild_id, user_id, itens):
+        """Soma vários itens ({item_id: quantidade}) de um usuário num único executemany"""
+        conn.executemany(self._sql_adicionar, [(guild_id, user_id, item_id, quantidade)
+                                               for item_id, quantidade in itens.items()])
+        cache = self.cache.get((guild_id, user_id))
+        if cache is not None:
+            for item_id, quantidade in itens.items():
+                cache[item_id] = cache.get(item_id, 0) + quantidade
+
+    def dar_para_todos(self, conn, guild_id, user_ids, item_id, quantidade=1):
+        """Soma o item a cada usuário de `user_ids` (ex.: membros de um cargo); devolve quantos"""
+        user_ids = list(user_ids)
+        conn.executemany(self._sql_adicionar, [(guild_id, user_id, item_id, quantidade) for user_id in user_ids])
+        return len(user_ids)
+
+    def resetar(self, conn, guild_id, item_id=None, limite=None):
+        """Apaga o inventário do servidor (ou só um item); devolve quantas linhas saíram
+
+        Com `limite`, apaga no máximo essa quantidade de linhas: quem chama
+        repete em transações curtas até voltar 0.
+        """
+        filtro, parametros = ('guild_id = ?', (guild_id,)) if item_id is None else \
+            ('guild_id = ? AND item_id = ?', (guild_id, item_id))
+        if limite is None:
+            return conn.execute(f'DELETE FROM {self.tabela} WHERE {filtro}', parametros).rowcount
+        return conn.execute(f'DELETE FROM {self.tabela} WHERE rowid IN '
+                            f'(SELECT rowid FROM {self.tabela} WHERE {filtro} LIMIT ?)', parametros + (limite,)).rowcount
+
+    def esquecer(self):
+        """Descarta o cache (a transação foi desfeita ou houve uma escrita em massa)"""
+        self.cache.limpar()
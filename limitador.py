@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+
+class LimitadorTaxa:
+    """Token bucket: no máximo `taxa` requisições por segundo (rajadas de até `rajada`)
+
+    Fica abaixo do limite global do Discord (50 req/s) para que tarefas em
+    massa, como backup e restauração, não disparem 429 no bot inteiro.
+    """
+
+    def __init__(self, taxa=40.0, rajada=None):
+        self.taxa = taxa
+        self.rajada = rajada or taxa
+        self._tokens = self.rajada
+        self._ultimo = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _repor(self):
+        agora = time.monotonic()
+        self._tokens = min(self.rajada, self._tokens + (agora - self._ultimo) * self.taxa)
+        self._ultimo = agora
+
+    async def aguardar(self):
+        async with self._lock:
+            self._repor()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.taxa)
+                self._repor()
+            self._tokens -= 1
+
+    def penalizar(self, segundos):
+        """Esvazia o balde por `segundos` (usado quando a API devolve retry_after)
+
+        Vários 429 simultâneos não se somam: vale a maior espera pedida.
+        """
+        self._repor()
+        self._tokens = min(self._tokens, -segundos * self.taxa)
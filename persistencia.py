@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ArmazemSistemas:
+    """Persistência write-behind dos dicionários salvos em systems.json
+
+    Cada alteração só marca a chave como suja. Uma tarefa em segundo plano
+    grava as chaves sujas em lote num diário (journal) append-only, então o
+    custo de cada gravação depende do número de chaves alteradas e não do
+    tamanho total do estado. Quando o diário cresce demais ele é compactado
+    num novo systems.json (arquivo temporário + rename atômico).
+    """
+
+    def __init__(self, caminho, secoes, intervalo=5.0, limite_sujos=500, limite_diario=8 * 1024 * 1024):
+        self.caminho = caminho
+        self.secoes = secoes
+        self.intervalo = intervalo
+        self.limite_sujos = limite_sujos
+        self.limite_diario = limite_diario
+        self.geracao = 0
+        self.carregado = False
+        self._sujos = set()
+        self._tamanho_diario = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._evento = None
+        self._tarefa = None
+
+    def _caminho_diario(self, geracao):
+        return f"{self.caminho}.{geracao}.journal"
+
+    def carregar(self):
+        """Lê o snapshot e reaplica o diário da mesma geração (só na primeira chamada)"""
+        if self.carregado:
+            return
+        self.carregado = True
+
+        try:
+            with open(self.caminho, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+
+        self.geracao = data.get('_geracao', 0)
+        for nome, dicionario in self.secoes.items():
+            dicionario.clear()
+            dicionario.update(data.get(nome, {}))
+
+        caminho_diario = self._caminho_diario(self.geracao)
+        try:
+            with open(caminho_diario, 'r', encoding='utf-8') as f:
+                for linha in f:
+                    try:
+                        registro = json.loads(linha)
+                    except ValueError:
+                        # Última linha cortada por um desligamento abrupto
+                        break
+                    dicionario = self.secoes.get(registro['s'])
+                    if dicionario is None:
+                        continue
+                    if registro.get('d'):
+                        dicionario.pop(registro['k'], None)
+                    else:
+                        dicionario[registro['k']] = registro['v']
+            self._tamanho_diario = os.path.getsize(caminho_diario)
+        except OSError:
+            pass
+
+    def marcar(self, secao, chave):
+        """Marca secao[chave] para ser gravada no próximo lote"""
+        self._sujos.add((secao, chave))
+        if self._evento is not None and len(self._sujos) >= self.limite_sujos:
+            self._evento.set()
+
+    def iniciar(self):
+        """Inicia a tarefa de gravação periódica no loop atual (idempotente)"""
+        if self._tarefa is None or self._tarefa.done():
+            self._evento = asyncio.Event()
+            self._tarefa = asyncio.get_running_loop().create_task(self._executar())
+
+    async def _executar(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._evento.wait(), timeout=self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+            self._evento.clear()
+            try:
+                await self.descarregar_async()
+            except Exception as e:
+                print(f"Erro ao salvar sistemas: {e}")
+
+    def _coletar(self):
+        """Serializa as chaves sujas (roda no loop, onde os dicionários são alterados)"""
+        linhas = []
+        for secao, chave in self._sujos:
+            dicionario = self.secoes[secao]
+            if chave in dicionario:
+                registro = {'s': secao, 'k': chave, 'v': dicionario[chave]}
+            else:
+                registro = {'s': secao, 'k': chave, 'd': True}
+            linhas.append(json.dumps(registro, ensure_ascii=False))
+        self._sujos.clear()
+        return linhas
+
+    def _snapshot(self, geracao):
+        """Serializa o estado inteiro em pedaços; roda no executor, uma chave por vez
+
+        Serializar chave a chave (e não o estado num json.dumps só) deixa o
+        GIL voltar para o loop durante a compactação. O loop pode alterar os
+        dicionários enquanto isso: toda chave alterada depois que `_sujos`
+        foi limpo volta a ser marcada e vai para o diário da nova geração,
+        que é reaplicado por cima deste snapshot. Os pedaços vão direto para
+        o arquivo: juntar e codificar dezenas de MB de uma vez também
+        prenderia o GIL.
+        """
+        yield '{'
+        for nome, dicionario in list(self.secoes.items()):
+            yield f'{json.dumps(nome)}: {{'
+            primeira = True
+            for chave in list(dicionario):
+                while True:
+                    try:
+                        parte = json.dumps({chave: dicionario[chave]}, ensure_ascii=False)[1:-1] if chave in dicionario else None
+                        break
+                    except (RuntimeError, KeyError):
+                        # Alterado no meio da serialização: tenta de novo
+                        continue
+                if parte is not None:
+                    yield parte if primeira else ', ' + parte
+                    primeira = False
+            yield '}, '
+        yield f'"_geracao": {geracao}}}'
+
+    def _escrever_diario(self, geracao, linhas):
+        conteudo = ''.join(linha + '\n' for linha in linhas).encode('utf-8')
+        with open(self._caminho_diario(geracao), 'ab') as f:
+            f.write(conteudo)
+            f.flush()
+            os.fsync(f.fileno())
+        return len(conteudo)
+
+    def _escrever_snapshot(self, geracao_antiga):
+        temporario = self.caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            for pedaco in self._snapshot(geracao_antiga + 1):
+                f.write(pedaco)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self.caminho)
+        try:
+            os.remove(self._caminho_diario(geracao_antiga))
+        except OSError:
+            pass
+
+    async def descarregar_async(self):
+        loop = asyncio.get_running_loop()
+        if self._tamanho_diario >= self.limite_diario:
+            self._sujos.clear()
+            geracao_antiga = self.geracao
+            self.geracao += 1
+            self._tamanho_diario = 0
+            await loop.run_in_executor(self._executor, self._escrever_snapshot, geracao_antiga)
+        elif self._sujos:
+            linhas = self._coletar()
+            self._tamanho_diario += await loop.run_in_executor(
+                self._executor, self._escrever_diario, self.geracao, linhas
+            )
+
+    def descarregar(self):
+        """Grava tudo e compacta o diário de forma síncrona (usado no desligamento)"""
+        self._executor.shutdown(wait=True)
+        if not self.carregado:
+            return
+        self._sujos.clear()
+        geracao_antiga = self.geracao
+        self.geracao += 1
+        self._tamanho_diario = 0
+        self._escrever_snapshot(geracao_antiga)
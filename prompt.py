@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import re
+
+from cache import CacheTTL
+
+# Palavras e sinais soltos; cada ~4 letras de uma palavra longa contam como mais um token
+PEDACO = re.compile(r'\w+|[^\w\s]')
+CUSTO_MENSAGEM = 4
+
+
+def estimar_tokens(texto):
+    """Aproximação local do tokenizer (erra por pouco para português e inglês)"""
+    return sum(1 + (len(pedaco) - 1) // 4 for pedaco in PEDACO.findall(texto))
+
+
+class MontadorPrompt:
+    """Monta as mensagens para a IA dentro de um orçamento de tokens
+
+    A mensagem atual e cada turno antigo são cortados num limite próprio;
+    os turnos entram do mais novo para o mais antigo até o orçamento acabar
+    e os que sobram viram um resumo curto no prompt de sistema. A contagem
+    de cada texto fica em cache, então turnos repetidos do histórico não
+    são medidos de novo.
+    """
+
+    def __init__(self, orcamento=1000, max_mensagem=300, max_turno=120):
+        self.orcamento = orcamento
+        self.max_mensagem = max_mensagem
+        self.max_turno = max_turno
+        self.medidas = CacheTTL(20000, 3600)
+        self.cortes = 0
+        self.descartados = 0
+
+    def tokens(self, texto):
+        quantidade = self.medidas.get(texto)
+        if quantidade is None:
+            quantidade = estimar_tokens(texto)
+            self.medidas.set(texto, quantidade)
+        return quantidade
+
+    def limitar(self, texto, maximo=None):
+        """Corta o texto em `maximo` tokens (padrão: max_mensagem)"""
+        maximo = self.max_mensagem if maximo is None else maximo
+        if self.tokens(texto) <= maximo:
+            return texto
+        self.cortes += 1
+        usados = 0
+        for pedaco in PEDACO.finditer(texto):
+            usados += 1 + (len(pedaco.group()) - 1) // 4
+            if usados > maximo:
+                return texto[:pedaco.start()].rstrip() + "…"
+        return texto
+
+    def montar(self, sistema, turnos, mensagem):
+        """Lista de mensagens (system, histórico, user) que cabe no orçamento
+
+        `turnos` são tuplas (eh_bot, texto) do mais antigo para o mais novo.
+        """
+        atual = self.limitar(mensagem)
+        usados = self.tokens(sistema) + self.tokens(atual) + 2 * CUSTO_MENSAGEM
+
+        escolhidos = []
+        restantes = len(turnos)
+        for eh_bot, texto in reversed(turnos):
+            texto = self.limitar(texto, self.max_turno)
+            custo = self.tokens(texto) + CUSTO_MENSAGEM
+            if usados + custo > self.orcamento:
+                break
+            escolhidos.append({"role": "assistant" if eh_bot else "user", "content": texto})
+            usados += custo
+            restantes -= 1
+
+        if restantes:
+            self.descartados += restantes
+            sistema = self._resumir(sistema, turnos[:restantes], self.orcamento - usados)
+
+        escolhidos.reverse()
+        return [{"role": "system", "content": sistema}] + escolhidos + [{"role": "user", "content": atual}]
+
+    def _resumir(self, sistema, antigos, sobra):
+        """Começo das últimas falas do usuário que não couberam, se ainda houver espaço"""
+        trechos = [" ".join(texto.split()[:8]) for eh_bot, texto in antigos if not eh_bot][-3:]
+        if not trechos or sobra < 30:
+            return sistema
+        resumo = self.limitar("Antes o usuário falou de: " + "; ".join(trechos), sobra - CUSTO_MENSAGEM)
+        return f"{sistema}\n{resumo}"
+
+    def estatisticas(self):
+        return {
+            'cortes': self.cortes,
+            'turnos_descartados': self.descartados,
+            'cache': self.medidas.estatisticas()
+        }
@@ -0,0 +1,475 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+from limitador import LimitadorTaxa
+
+ETAPAS = ("apagar", "cargos", "posicoes", "categorias", "canais", "mensagens")
+TIPOS_TEXTO = ("text", "news")
+TIPOS_VOZ = ("voice", "stage_voice")
+
+
+def _canal(nome, tipo, posicao=0, categoria=None, topico=None, bitrate=None, user_limit=None,
+           overwrites=None, mensagens=None):
+    return {
+        "nome": nome,
+        "tipo": tipo,
+        "posicao": posicao or 0,
+        "categoria": categoria,
+        "topico": topico,
+        "bitrate": bitrate,
+        "user_limit": user_limit,
+        "overwrites": overwrites or {},
+        "mensagens": mensagens or []
+    }
+
+
+def normalizar_backup(dados):
+    """Converte os formatos de backup dos bots para {"cargos": [...], "canais": [...]}
+
+    cong.py grava "cargos"/"canais"; bot.py e Botdc.py gravam 'channels' como
+    dicionário (só canais de texto têm 'topic'); bot7.py grava 'channels' como
+    lista com 'type'. Categorias citadas pelos canais mas não salvas viram
+    canais do tipo "category".
+    """
+    if "cargos" in dados:
+        cargos = [
+            {"nome": c["nome"], "cor": c["cor"], "permissoes": c["permissoes"], "posicao": c.get("posicao")}
+            for c in dados["cargos"]
+        ]
+        canais = [
+            _canal(c["nome"], c["tipo"], c.get("posicao"), c.get("categoria"), c.get("topico"),
+                   c.get("bitrate"), c.get("user_limit"), c.get("overwrites"), c.get("mensagens"))
+            for c in dados["canais"]
+        ]
+    else:
+        cargos = [
+            {"nome": r["name"], "cor": r["color"], "permissoes": r["permissions"], "posicao": r.get("position")}
+            for r in dados.get("roles", [])
+        ]
+        brutos = dados.get("channels", [])
+        if isinstance(brutos, dict):
+            brutos = list(brutos.values())
+        canais = [
+            _canal(c["name"], c.get("type") or ("text" if "topic" in c else "voice"), c.get("position"),
+                   c.get("category"), c.get("topic"), c.get("bitrate"), c.get("user_limit"))
+            for c in brutos
+        ]
+
+    categorias = {c["nome"] for c in canais if c["tipo"] == "category"}
+    for canal in list(canais):
+        if canal["categoria"] and canal["categoria"] not in categorias:
+            categorias.add(canal["categoria"])
+            canais.append(_canal(canal["categoria"], "category"))
+
+    return {"cargos": cargos, "canais": canais}
+
+
+def _espera_429(erro):
+    """Segundos pedidos pela API num 429, ou None se o erro não for de rate limit"""
+    retry_after = getattr(erro, "retry_after", None)
+    if retry_after is not None:
+        return float(retry_after)
+    if getattr(erro, "status", None) != 429:
+        return None
+    cabecalhos = getattr(getattr(erro, "response", None), "headers", None) or {}
+    try:
+        return float(cabecalhos.get("Retry-After", 1.0))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class RestauradorServidor:
+    """Restaura um backup como um grafo de dependências
+
+    planejar() compara o servidor com o backup e gera só as operações
+    necessárias; aplicar() executa o plano como um grafo
+    cargos → categorias → canais (já com overwrites) → mensagens. Cada
+    operação espera só pelas suas dependências, então tudo que é
+    independente roda em paralelo, limitado por um semáforo e pelo
+    LimitadorTaxa compartilhado. Respostas 429 são repetidas após o
+    retry_after. O relatório traz tempo, acertos e falhas por etapa.
+    """
+
+    def __init__(self, limitador=None, concorrencia=10, tentativas=4):
+        self.limitador = limitador or LimitadorTaxa()
+        self.concorrencia = concorrencia
+        self.tentativas = tentativas
+
+    async def _chamar(self, funcao, *args, **kwargs):
+        for tentativa in range(self.tentativas):
+            await self.limitador.aguardar()
+            try:
+                return await funcao(*args, **kwargs)
+            except Exception as e:
+                espera = _espera_429(e)
+                if espera is None or tentativa == self.tentativas - 1:
+                    raise
+                self.limitador.penalizar(espera)
+
+    async def _executar(self, nos, relatorio):
+        """Roda os nós (chave, etapa, dependências, fabrica) respeitando as dependências
+
+        fabrica(resultados) recebe {dependência: objeto criado ou None} e
+        devolve o objeto criado; falhas viram None para quem depende delas.
+        """
+        semaforo = asyncio.Semaphore(self.concorrencia)
+        tarefas = {}
+
+        async def rodar(etapa, dependencias, fabrica):
+            resultados = {}
+            for dependencia in dependencias:
+                resultados[dependencia] = await tarefas[dependencia]
+
+            dados = relatorio[etapa]
+            async with semaforo:
+                inicio = time.monotonic()
+                try:
+                    objeto = await fabrica(resultados)
+                    dados["ok"] += 1
+                except Exception as e:
+                    objeto = None
+                    dados["falhas"] += 1
+                    if len(dados["erros"]) < 5:
+                        dados["erros"].append(str(e))
+                dados["_inicio"] = min(dados.get("_inicio", inicio), inicio)
+                dados["segundos"] = max(dados["segundos"], time.monotonic() - dados["_inicio"])
+            return objeto
+
+        for chave, etapa, dependencias, fabrica in nos:
+            tarefas[chave] = asyncio.ensure_future(rodar(etapa, dependencias, fabrica))
+        await asyncio.gather(*tarefas.values())
+
+    def _nos_apagar(self, guild, apagar_canais, apagar_cargos):
+        nos = []
+        if apagar_canais:
+            for channel in list(guild.channels):
+                nos.append((("apagar", "canal", channel.id), "apagar", (), lambda _, c=channel: self._chamar(c.delete)))
+        if apagar_cargos:
+            topo = guild.me.top_role
+            for role in list(guild.roles):
+                if role.is_default() or role.managed or role >= topo:
+                    continue
+                nos.append((("apagar", "cargo", role.id), "apagar", (), lambda _, r=role: self._chamar(r.delete)))
+        return nos
+
+    def planejar(self, guild, backup, vazio=False):
+        """Compara o servidor com o backup e lista só as operações necessárias
+
+        Cargos são pareados pelo nome; canais por nome + tipo + categoria
+        (duplicados são pareados pela posição; sem categoria no backup, vale
+        a de qualquer canal com o mesmo nome e tipo) e diferenças de posição,
+        tópico, overwrites, bitrate ou limite viram edições. Com vazio=True
+        o servidor é tratado como vazio (restauração completa).
+        """
+        # Import local: o armazém de snapshots usa este módulo sem o discord.py instalado
+        import discord
+
+        topo = guild.me.top_role
+        operacoes = []
+
+        cargos_vivos = {}
+        canais_vivos = {}
+        if not vazio:
+            for role in sorted(guild.roles, key=lambda r: r.position):
+                if not role.is_default() and not role.managed:
+                    cargos_vivos.setdefault(role.name, []).append(role)
+            for channel in sorted(guild.channels, key=lambda c: c.position):
+                identidade = (channel.name, str(channel.type), channel.category.name if channel.category else None)
+                canais_vivos.setdefault(identidade, []).append(channel)
+
+        for cargo in backup["cargos"]:
+            existentes = cargos_vivos.get(cargo["nome"])
+            if not existentes:
+                operacoes.append({"acao": "criar", "tipo": "cargo", "nome": cargo["nome"], "dados": cargo})
+                continue
+            role = existentes.pop(0)
+            if role >= topo:
+                # Acima do bot: não dá para editar, mas também não é duplicado
+                continue
+            campos = []
+            if role.color.value != cargo["cor"]:
+                campos.append("cor")
+            if role.permissions.value != cargo["permissoes"]:
+                campos.append("permissoes")
+            if campos:
+                operacoes.append({"acao": "editar", "tipo": "cargo", "nome": cargo["nome"], "dados": cargo,
+                                  "objeto": role, "campos": campos})
+
+        for canal in sorted(backup["canais"], key=lambda c: (c["tipo"] != "category", c["posicao"])):
+            existentes = canais_vivos.get((canal["nome"], canal["tipo"], canal["categoria"]))
+            if not existentes and canal["categoria"] is None:
+                # Backups antigos do bot7.py não gravavam a categoria: vale qualquer uma
+                existentes = next((vivos for (nome, tipo_vivo, _), vivos in canais_vivos.items()
+                                   if nome == canal["nome"] and tipo_vivo == canal["tipo"] and vivos), None)
+            if canal["tipo"] != "category" and canal["tipo"] not in TIPOS_TEXTO + TIPOS_VOZ:
+                # Tipos que não sabemos recriar (fórum, palco...) só são preservados
+                if existentes:
+                    existentes.pop(0)
+                continue
+            tipo = "categoria" if canal["tipo"] == "category" else "canal"
+            if not existentes:
+                operacoes.append({"acao": "criar", "tipo": tipo, "nome": canal["nome"], "dados": canal})
+                continue
+            channel = existentes.pop(0)
+            campos = [campo for campo, atual in (
+                ("posicao", channel.position),
+                ("topico", getattr(channel, "topic", None)),
+                ("bitrate", getattr(channel, "bitrate", None)),
+                ("user_limit", getattr(channel, "user_limit", None))
+            ) if canal[campo] not in (None, "") and canal[campo] != atual]
+            if canal["overwrites"] and canal["overwrites"] != {
+                alvo.name: [permissao.value for permissao in overwrite.pair()]
+                for alvo, overwrite in channel.overwrites.items() if isinstance(alvo, discord.Role)
+            }:
+                campos.append("overwrites")
+            if campos:
+                operacoes.append({"acao": "editar", "tipo": tipo, "nome": canal["nome"], "dados": canal,
+                                  "objeto": channel, "campos": campos})
+
+        for sobras in canais_vivos.values():
+            for channel in sobras:
+                tipo = "categoria" if isinstance(channel, discord.CategoryChannel) else "canal"
+                operacoes.append({"acao": "apagar", "tipo": tipo, "nome": channel.name, "objeto": channel})
+        for sobras in cargos_vivos.values():
+            for role in sobras:
+                if role < topo:
+                    operacoes.append({"acao": "apagar", "tipo": "cargo", "nome": role.name, "objeto": role})
+
+        for operacao in operacoes:
+            operacao["chamadas"] = 1
+            if operacao["acao"] == "criar" and operacao["tipo"] == "canal" and operacao["dados"]["tipo"] in TIPOS_TEXTO:
+                operacao["chamadas"] += len(operacao["dados"]["mensagens"][:5])
+
+        ordenar = vazio and any(cargo["posicao"] for cargo in backup["cargos"])
+        return {
+            "operacoes": operacoes,
+            "ordenar_cargos": ordenar,
+            "chamadas": sum(operacao["chamadas"] for operacao in operacoes) + (1 if ordenar else 0)
+        }
+
+    def _overwrites(self, guild, canal, resultados, chave_cargo):
+        import discord
+
+        mapa = {}
+        for nome, (allow, deny) in canal["overwrites"].items():
+            if nome == "@everyone":
+                alvo = guild.default_role
+            elif nome in chave_cargo:
+                alvo = resultados.get(chave_cargo[nome])
+            else:
+                alvo = discord.utils.get(guild.roles, name=nome)
+            if alvo is not None:
+                mapa[alvo] = discord.PermissionOverwrite.from_pair(discord.Permissions(allow), discord.Permissions(deny))
+        return mapa
+
+    def _nos_plano(self, guild, plano):
+        """Nós de criação/edição (dependentes entre si) e nós de remoção (rodam depois)"""
+        import discord
+
+        nos = []
+        remocoes = []
+        chave_cargo = {}
+        chave_categoria = {}
+        posicoes = {}
+
+        for indice, operacao in enumerate(plano["operacoes"]):
+            if operacao["tipo"] != "cargo" or operacao["acao"] != "criar":
+                continue
+            cargo = operacao["dados"]
+            chave = ("cargo", indice)
+            chave_cargo.setdefault(cargo["nome"], chave)
+            if cargo["posicao"]:
+                posicoes[chave] = cargo["posicao"]
+        for indice, operacao in enumerate(plano["operacoes"]):
+            if operacao["tipo"] == "categoria" and operacao["acao"] == "criar":
+                chave_categoria.setdefault(operacao["nome"], ("categoria", indice))
+
+        def dependencias(canal):
+            chaves = tuple(chave_cargo[nome] for nome in canal["overwrites"] if nome in chave_cargo)
+            if canal["categoria"] in chave_categoria:
+                chaves += (chave_categoria[canal["categoria"]],)
+            return chaves
+
+        def opcoes(canal, campos, resultados):
+            valores = {}
+            if "posicao" in campos:
+                valores["position"] = canal["posicao"]
+            if "topico" in campos and canal["topico"]:
+                valores["topic"] = canal["topico"]
+            if "bitrate" in campos and canal["bitrate"]:
+                valores["bitrate"] = canal["bitrate"]
+            if "user_limit" in campos and canal["user_limit"]:
+                valores["user_limit"] = canal["user_limit"]
+            if "overwrites" in campos and canal["overwrites"]:
+                valores["overwrites"] = self._overwrites(guild, canal, resultados, chave_cargo)
+            return valores
+
+        todos = ("posicao", "topico", "bitrate", "user_limit", "overwrites")
+
+        for indice, operacao in enumerate(plano["operacoes"]):
+            acao, tipo = operacao["acao"], operacao["tipo"]
+            chave = (tipo, indice)
+
+            if acao == "apagar":
+                remocoes.append((chave, "apagar", (), lambda _, o=operacao["objeto"]: self._chamar(o.delete)))
+
+            elif tipo == "cargo" and acao == "criar":
+                async def criar_cargo(_, cargo=operacao["dados"]):
+                    return await self._chamar(
+                        guild.create_role,
+                        name=cargo["nome"],
+                        color=discord.Color(cargo["cor"]),
+                        permissions=discord.Permissions(cargo["permissoes"])
+                    )
+                nos.append((chave, "cargos", (), criar_cargo))
+
+            elif tipo == "cargo":
+                async def editar_cargo(_, operacao=operacao):
+                    cargo = operacao["dados"]
+                    valores = {}
+                    if "cor" in operacao["campos"]:
+                        valores["color"] = discord.Color(cargo["cor"])
+                    if "permissoes" in operacao["campos"]:
+                        valores["permissions"] = discord.Permissions(cargo["permissoes"])
+                    return await self._chamar(operacao["objeto"].edit, **valores)
+                nos.append((chave, "cargos", (), editar_cargo))
+
+            elif acao == "editar":
+                async def editar_canal(resultados, operacao=operacao):
+                    valores = opcoes(operacao["dados"], operacao["campos"], resultados)
+                    return await self._chamar(operacao["objeto"].edit, **valores)
+                etapa = "categorias" if tipo == "categoria" else "canais"
+                nos.append((chave, etapa, dependencias(operacao["dados"]), editar_canal))
+
+            elif tipo == "categoria":
+                async def criar_categoria(resultados, canal=operacao["dados"]):
+                    return await self._chamar(guild.create_category, canal["nome"], **opcoes(canal, todos, resultados))
+                nos.append((chave, "categorias", dependencias(operacao["dados"]), criar_categoria))
+
+            else:
+                canal = operacao["dados"]
+                criar = guild.create_text_channel if canal["tipo"] in TIPOS_TEXTO else guild.create_voice_channel
+
+                async def criar_canal(resultados, canal=canal, criar=criar):
+                    valores = opcoes(canal, todos, resultados)
+                    if canal["categoria"]:
+                        categoria = resultados.get(chave_categoria.get(canal["categoria"]))
+                        if categoria is None:
+                            categoria = discord.utils.get(guild.categories, name=canal["categoria"])
+                        if categoria is not None:
+                            valores["category"] = categoria
+                    return await self._chamar(criar, canal["nome"], **valores)
+                nos.append((chave, "canais", dependencias(canal), criar_canal))
+
+                if canal["mensagens"] and canal["tipo"] in TIPOS_TEXTO:
+                    async def semear(resultados, canal=canal, chave=chave):
+                        novo = resultados[chave]
+                        if novo is None:
+                            raise RuntimeError(f"canal {canal['nome']} não foi criado")
+                        # Mensagens do mesmo canal em ordem; canais diferentes em paralelo
+                        for msg_data in canal["mensagens"][:5]:
+                            embed = discord.Embed(description=msg_data["conteudo"], color=0x00ff00)
+                            embed.set_author(name=msg_data["autor"])
+                            embed.set_footer(text=f"Backup: {msg_data['timestamp']}")
+                            await self._chamar(novo.send, embed=embed)
+                    nos.append((("mensagens", indice), "mensagens", (chave,), semear))
+
+        if plano["ordenar_cargos"] and posicoes:
+            # Cargos criados em paralelo nascem fora de ordem: uma única chamada reordena todos
+            async def ordenar_cargos(resultados):
+                mapa = {resultados[chave]: posicao for chave, posicao in posicoes.items() if resultados[chave]}
+                if mapa:
+                    await self._chamar(guild.edit_role_positions, positions=mapa)
+            nos.append((("posicoes",), "posicoes", tuple(posicoes), ordenar_cargos))
+
+        return nos, remocoes
+
+    async def aplicar(self, guild, plano, relatorio=None):
+        """Executa um plano de planejar(); remoções só depois de criar/editar o resto"""
+        relatorio = relatorio or _relatorio_vazio()
+        inicio = time.monotonic()
+
+        nos, remocoes = self._nos_plano(guild, plano)
+        await self._executar(nos, relatorio)
+        await self._executar(remocoes, relatorio)
+
+        for dados in relatorio.values():
+            if isinstance(dados, dict):
+                dados.pop("_inicio", None)
+        relatorio["total_segundos"] = relatorio.get("total_segundos", 0.0) + time.monotonic() - inicio
+        return relatorio
+
+    async def restaurar(self, guild, backup, apagar_canais=True, apagar_cargos=True):
+        """Apaga o servidor atual (em paralelo) e recria o backup normalizado"""
+        relatorio = _relatorio_vazio()
+        inicio = time.monotonic()
+        await self._executar(self._nos_apagar(guild, apagar_canais, apagar_cargos), relatorio)
+        relatorio["total_segundos"] = time.monotonic() - inicio
+        return await self.aplicar(guild, self.planejar(guild, backup, vazio=True), relatorio)
+
+    async def reconciliar(self, guild, backup, simular=False):
+        """Aplica só as diferenças entre o servidor e o backup
+
+        Devolve (plano, relatório); com simular=True nada é executado e o
+        relatório é None.
+        """
+        plano = self.planejar(guild, backup)
+        if simular:
+            return plano, None
+        return plano, await self.aplicar(guild, plano)
+
+
+def _relatorio_vazio():
+    return {etapa: {"ok": 0, "falhas": 0, "segundos": 0.0, "erros": []} for etapa in ETAPAS}
+
+
+def estimar_restauracao_completa(guild, backup):
+    """Chamadas de API de apagar tudo e recriar (para comparar com o plano)"""
+    topo = guild.me.top_role
+    cargos = sum(1 for role in guild.roles if not role.is_default() and not role.managed and role < topo)
+    criacoes = len(backup["cargos"]) + sum(
+        1 + (len(canal["mensagens"][:5]) if canal["tipo"] in TIPOS_TEXTO else 0)
+        for canal in backup["canais"] if canal["tipo"] in ("category",) + TIPOS_TEXTO + TIPOS_VOZ
+    )
+    return len(guild.channels) + cargos + criacoes
+
+
+def resumir_plano(plano, limite=15):
+    """Texto do plano: contagem por ação, primeiras operações e chamadas estimadas"""
+    contagem = {}
+    for operacao in plano["operacoes"]:
+        chave = f"{operacao['acao']} {operacao['tipo']}"
+        contagem[chave] = contagem.get(chave, 0) + 1
+    if not contagem:
+        return "Nada a fazer: o servidor já está igual ao backup."
+
+    linhas = [", ".join(f"{quantidade}x {chave}" for chave, quantidade in sorted(contagem.items()))]
+    for operacao in plano["operacoes"][:limite]:
+        detalhe = f" ({', '.join(operacao['campos'])})" if operacao.get("campos") else ""
+        linhas.append(f"• {operacao['acao']} {operacao['tipo']} `{operacao['nome']}`{detalhe}")
+    if len(plano["operacoes"]) > limite:
+        linhas.append(f"... e mais {len(plano['operacoes']) - limite}")
+    linhas.append(f"Chamadas de API estimadas: {plano['chamadas']}")
+    return "\n".join(linhas)
+
+def resumir(relatorio):
+    """Texto curto com tempo e falhas de cada etapa"""
+    linhas = []
+    for etapa in ETAPAS:
+        dados = relatorio[etapa]
+        if not dados["ok"] and not dados["falhas"]:
+            continue
+        linha = f"**{etapa}**: {dados['ok']} ok, {dados['falhas']} falhas, {dados['segundos']:.1f}s"
+        if dados["erros"]:
+            linha += f" ({dados['erros'][0]})"
+        linhas.append(linha)
+    linhas.append(f"Tempo total: {relatorio['total_segundos']:.1f}s")
+    return "\n".join(linhas)
+
+
+def canal_resumo(guild, canal):
+    """Canal onde o comando foi usado, ou o primeiro canal de texto se ele foi apagado"""
+    if guild.get_channel(canal.id) is not None:
+        return canal
+    return guild.text_channels[0] if guild.text_channels else None
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import random
+import time
+from collections import Counter, deque
+
+from ia_cliente import DEEPSEEK_URL, responder_em_partes
+
+GROK_URL = 'https://api.x.ai/v1/chat/completions'
+
+
+class Provedor:
+    """Uma API de chat com médias móveis (EWMA) de latência e de erro e um disjuntor
+
+    Depois de `limite_falhas` falhas seguidas o circuito abre e o provedor
+    fica fora por `espera` segundos; passado esse tempo uma única chamada de
+    teste (meio-aberto) decide se ele volta ou fica fora de novo.
+    """
+
+    def __init__(self, nome, cliente, url, chave, modelo, alfa=0.2, limite_falhas=3, espera=30.0, janela=100):
+        self.nome = nome
+        self.cliente = cliente
+        self.url = url
+        self.chave = chave
+        self.modelo = modelo
+        self.alfa = alfa
+        self.limite_falhas = limite_falhas
+        self.espera = espera
+        self.latencia = None
+        self.taxa_erro = 0.0
+        self.amostras = deque(maxlen=janela)
+        self.falhas_seguidas = 0
+        self.aberto_ate = 0.0
+        self.testando = False
+        self.chamadas = 0
+        self.falhas = 0
+        self.aberturas = 0
+
+    @property
+    def estado(self):
+        if not self.aberto_ate:
+            return "fechado"
+        if time.monotonic() < self.aberto_ate:
+            return "aberto"
+        return "meio-aberto"
+
+    def disponivel(self):
+        estado = self.estado
+        if estado == "meio-aberto":
+            return not self.testando
+        return estado == "fechado"
+
+    def preparar(self, payload):
+        return {**payload, 'model': self.modelo}
+
+    def p90(self):
+        """Percentil 90 das últimas latências (None até haver amostras suficientes)"""
+        if len(self.amostras) < 5:
+            return None
+        ordenadas = sorted(self.amostras)
+        return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.9))]
+
+    def pontuacao(self):
+        """Menor é melhor: latência média penalizada pela taxa de erro"""
+        latencia = self.latencia if self.latencia is not None else 1.0
+        return latencia * (1 + 4 * self.taxa_erro)
+
+    def iniciar_chamada(self):
+        self.chamadas += 1
+        if self.estado == "meio-aberto":
+            self.testando = True
+        return time.monotonic()
+
+    def sucesso(self, inicio):
+        segundos = time.monotonic() - inicio
+        self.latencia = segundos if self.latencia is None else self.alfa * segundos + (1 - self.alfa) * self.latencia
+        self.amostras.append(segundos)
+        self.taxa_erro *= 1 - self.alfa
+        self.falhas_seguidas = 0
+        self.aberto_ate = 0.0
+        self.testando = False
+
+    def falha(self):
+        self.falhas += 1
+        self.taxa_erro = self.alfa + (1 - self.alfa) * self.taxa_erro
+        self.falhas_seguidas += 1
+        if self.testando or self.falhas_seguidas >= self.limite_falhas:
+            if self.estado != "aberto":
+                self.aberturas += 1
+            self.aberto_ate = time.monotonic() + self.espera
+        self.testando = False
+
+    def cancelada(self):
+        """Chamada abandonada (outro provedor respondeu antes): não conta como falha"""
+        self.testando = False
+
+    async def completar(self, payload):
+        """Texto da resposta ou None; exceções e respostas recusadas contam como falha"""
+        inicio = self.iniciar_chamada()
+        try:
+            texto = await self.cliente.completar(self.url, self.chave, self.preparar(payload))
+        except asyncio.CancelledError:
+            self.cancelada()
+            raise
+        except Exception:
+            texto = None
+        if texto is None:
+            self.falha()
+        else:
+            self.sucesso(inicio)
+        return texto
+
+    def estatisticas(self):
+        p90 = self.p90()
+        return {
+            'estado': self.estado,
+            'latencia_ms': self.latencia * 1000 if self.latencia is not None else None,
+            'p90_ms': p90 * 1000 if p90 is not None else None,
+            'taxa_erro': self.taxa_erro,
+            'chamadas': self.chamadas,
+            'falhas': self.falhas,
+            'aberturas': self.aberturas
+        }
+
+
+class RoteadorIA:
+    """Escolhe o provedor de cada pedido pelo histórico de latência e de erros
+
+    Provedores com o circuito aberto são pulados e, se o escolhido falha, o
+    próximo é tentado. Com `hedge`, quando o primeiro não responde dentro do
+    seu p90 (ou de `hedge_inicial` enquanto não há amostras) o mesmo pedido
+    vai também para o próximo e vale a primeira resposta. Uma fração
+    `exploracao` dos pedidos começa por outro provedor, para que a média de
+    quem ficou lento uma vez volte a ser medida. Cada decisão é contada em
+    `decisoes`.
+    """
+
+    def __init__(self, provedores, hedge=True, hedge_minimo=0.3, hedge_inicial=3.0, exploracao=0.05):
+        self.provedores = provedores
+        self.hedge = hedge
+        self.hedge_minimo = hedge_minimo
+        self.hedge_inicial = hedge_inicial
+        self.exploracao = exploracao
+        self.decisoes = Counter()
+
+    def ordenar(self):
+        disponiveis = [p for p in self.provedores if p.disponivel()]
+        disponiveis.sort(key=lambda p: p.pontuacao())
+        if len(disponiveis) > 1 and random.random() < self.exploracao:
+            disponiveis.insert(0, disponiveis.pop(random.randrange(1, len(disponiveis))))
+            self.decisoes['exploracao'] += 1
+        return disponiveis
+
+    async def completar(self, payload):
+        """Texto da primeira resposta válida, ou None se nenhum provedor respondeu"""
+        candidatos = self.ordenar()
+        if not candidatos:
+            self.decisoes['sem_provedor'] += 1
+            return None
+        self.decisoes[f'primario:{candidatos[0].nome}'] += 1
+
+        pendentes = {}
+        hedges = set()
+        proximo = 0
+
+        def disparar():
+            nonlocal proximo
+            provedor = candidatos[proximo]
+            proximo += 1
+            tarefa = asyncio.ensure_future(provedor.completar(payload))
+            pendentes[tarefa] = (provedor, time.monotonic())
+            return tarefa
+
+        try:
+            while True:
+                if not pendentes:
+                    if proximo >= len(candidatos):
+                        return None
+                    if proximo:
+                        self.decisoes['failover'] += 1
+                    disparar()
+
+                espera = None
+                if self.hedge and len(pendentes) == 1 and proximo < len(candidatos):
+                    provedor, inicio = next(iter(pendentes.values()))
+                    p90 = provedor.p90()
+                    limite = max(self.hedge_minimo, p90) if p90 is not None else self.hedge_inicial
+                    espera = max(0.0, limite - (time.monotonic() - inicio))
+
+                prontos, _ = await asyncio.wait(pendentes, timeout=espera, return_when=asyncio.FIRST_COMPLETED)
+                if not prontos:
+                    self.decisoes['hedge'] += 1
+                    hedges.add(disparar())
+                    continue
+
+                for tarefa in prontos:
+                    provedor, _ = pendentes.pop(tarefa)
+                    texto = tarefa.result()
+                    if texto is not None:
+                        if tarefa in hedges:
+                            self.decisoes['hedge_venceu'] += 1
+                        return texto
+        finally:
+            for tarefa in pendentes:
+                tarefa.cancel()
+
+    async def transmitir(self, payload):
+        """Gera os pedaços da resposta pelo melhor provedor (sem hedge)
+
+        Se um provedor falha antes do primeiro pedaço, o próximo é tentado;
+        se cai no meio, a transmissão termina com o que já chegou.
+        """
+        candidatos = self.ordenar()
+        if not candidatos:
+            self.decisoes['sem_provedor'] += 1
+            return
+        for indice, provedor in enumerate(candidatos):
+            self.decisoes['failover' if indice else f'primario:{provedor.nome}'] += 1
+            inicio = provedor.iniciar_chamada()
+            recebeu = False
+            concluida = False
+            try:
+                async for pedaco in provedor.cliente.transmitir(provedor.url, provedor.chave, provedor.preparar(payload)):
+                    recebeu = True
+                    yield pedaco
+                if recebeu:
+                    provedor.sucesso(inicio)
+                    concluida = True
+                    return
+            except Exception:
+                if recebeu:
+                    provedor.falha()
+                    concluida = True
+                    return
+            finally:
+                if not concluida and recebeu:
+                    # Quem consumia a transmissão desistiu no meio
+                    provedor.cancelada()
+            provedor.falha()
+
+    async def responder(self, canal, payload, respostas=None, enviar=None):
+        """Como ClienteIA.responder, passando pelo roteador"""
+        return await responder_em_partes(canal, self.transmitir(payload), payload['messages'], respostas, enviar)
+
+    def estatisticas(self):
+        return {
+            'provedores': {p.nome: p.estatisticas() for p in self.provedores},
+            'decisoes': dict(self.decisoes)
+        }
+
+
+def provedores_padrao(cliente, deepseek_key, grok_key=None, modelo_deepseek='deepseek-chat', modelo_grok='grok-beta'):
+    """DeepSeek e, se houver chave, Grok como segunda opção, na mesma sessão HTTP"""
+    provedores = []
+    if deepseek_key:
+        provedores.append(Provedor('deepseek', cliente, DEEPSEEK_URL, deepseek_key, modelo_deepseek))
+    if grok_key:
+        provedores.append(Provedor('grok', cliente, GROK_URL, grok_key, modelo_grok))
+    return provedores
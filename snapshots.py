@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+from restauracao import normalizar_backup
+
+
+def _serializar(objeto):
+    return json.dumps(objeto, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def _ler_json(conteudo):
+    """Blobs novos são gzip; os gravados antes da compressão são JSON puro"""
+    if conteudo[:2] == b'\x1f\x8b':
+        conteudo = gzip.decompress(conteudo)
+    return json.loads(conteudo)
+
+
+def _gravar_atomico(caminho, conteudo):
+    temporario = caminho + '.tmp'
+    with open(temporario, 'wb') as f:
+        f.write(conteudo)
+    os.replace(temporario, caminho)
+
+
+class ArmazemSnapshots:
+    """Backups incrementais endereçados por conteúdo
+
+    Cargos, canais (com overwrites) e páginas de mensagens viram blobs
+    gravados uma única vez em blobs/<sha256> (gzip; o hash é do JSON sem
+    compressão, então a deduplicação não depende do nível de compressão). Cada backup é só um manifesto
+    pequeno com os hashes, então um servidor que não mudou não ocupa disco
+    de novo e listar, comparar e podar backups só lê manifestos.
+
+    Um backup grava seus blobs antes do manifesto (às vezes entre awaits),
+    então `podar` não apaga blobs tocados há menos de `carencia` segundos
+    (reaproveitar um blob atualiza o mtime) nem arquivos .tmp em escrita.
+    Gravação de blobs, `salvar` e `podar` passam pela mesma trava, para
+    poderem rodar em threads.
+    """
+
+    def __init__(self, diretorio, tamanho_pagina=50, carencia=3600):
+        self.diretorio = diretorio
+        self.tamanho_pagina = tamanho_pagina
+        self.carencia = carencia
+        self._trava = threading.RLock()
+        self.dir_blobs = os.path.join(diretorio, 'blobs')
+        self.dir_manifestos = os.path.join(diretorio, 'manifestos')
+        os.makedirs(self.dir_blobs, exist_ok=True)
+        os.makedirs(self.dir_manifestos, exist_ok=True)
+
+    # Blobs
+
+    def _caminho_blob(self, hash_blob):
+        return os.path.join(self.dir_blobs, hash_blob[:2], hash_blob)
+
+    def guardar_blob(self, objeto):
+        """Grava o objeto se ele ainda não existir e devolve o hash"""
+        conteudo = _serializar(objeto)
+        hash_blob = hashlib.sha256(conteudo).hexdigest()
+        caminho = self._caminho_blob(hash_blob)
+        with self._trava:
+            if os.path.exists(caminho):
+                # Reaproveitado: renova o mtime para a poda não levar o blob antes do manifesto
+                os.utime(caminho)
+            else:
+                os.makedirs(os.path.dirname(caminho), exist_ok=True)
+                _gravar_atomico(caminho, gzip.compress(conteudo, compresslevel=6, mtime=0))
+        return hash_blob
+
+    def ler_blob(self, hash_blob):
+        with open(self._caminho_blob(hash_blob), 'rb') as f:
+            return _ler_json(f.read())
+
+    def guardar_cargo(self, cargo):
+        return {"nome": cargo["nome"], "blob": self.guardar_blob(cargo)}
+
+    def guardar_canal(self, canal):
+        """Separa as mensagens em páginas; canais sem mensagens novas reaproveitam os blobs"""
+        mensagens = canal.get("mensagens", [])
+        dados = {chave: valor for chave, valor in canal.items() if chave != "mensagens"}
+        return {
+            "nome": canal["nome"],
+            "tipo": canal["tipo"],
+            "blob": self.guardar_blob(dados),
+            "paginas": [
+                self.guardar_blob(mensagens[i:i + self.tamanho_pagina])
+                for i in range(0, len(mensagens), self.tamanho_pagina)
+            ]
+        }
+
+    # Manifestos
+
+    def _dir_guild(self, guild_id):
+        return os.path.join(self.dir_manifestos, str(guild_id))
+
+    def listar(self, guild_id):
+        """Manifestos do servidor, do mais antigo ao mais novo"""
+        try:
+            nomes = sorted(os.listdir(self._dir_guild(guild_id)))
+        except OSError:
+            return []
+        manifestos = []
+        for nome in nomes:
+            if nome.endswith('.json'):
+                try:
+                    with open(os.path.join(self._dir_guild(guild_id), nome), 'r', encoding='utf-8') as f:
+                        manifestos.append(json.load(f))
+                except FileNotFoundError:
+                    # Podado (em outra thread) entre o listdir e o open
+                    continue
+        return manifestos
+
+    def ler_manifesto(self, guild_id, snapshot_id):
+        caminho = os.path.join(self._dir_guild(guild_id), f"{os.path.basename(snapshot_id)}.json")
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def salvar_manifesto(self, guild_id, nome, cargos, canais):
+        """Registra um backup a partir das entradas de guardar_cargo/guardar_canal
+
+        Devolve (manifesto, inalterado). Se nada mudou desde o último backup,
+        nenhum arquivo novo é criado e o último manifesto é devolvido.
+        """
+        with self._trava:
+            return self._salvar_manifesto(guild_id, nome, cargos, canais)
+
+    def _salvar_manifesto(self, guild_id, nome, cargos, canais):
+        canais = sorted(canais, key=lambda c: (c["tipo"], c["nome"], c["blob"]))
+        anteriores = self.listar(guild_id)
+        pai = anteriores[-1] if anteriores else None
+        if pai and pai["cargos"] == cargos and pai["canais"] == canais:
+            return pai, True
+
+        agora = datetime.datetime.now()
+        conteudo = {"cargos": cargos, "canais": canais}
+        manifesto = {
+            "id": f"{agora.strftime('%Y%m%d_%H%M%S')}_{hashlib.sha256(_serializar(conteudo)).hexdigest()[:8]}",
+            "guild_id": guild_id,
+            "nome": nome,
+            "data": str(agora),
+            "pai": pai["id"] if pai else None,
+            **conteudo
+        }
+        os.makedirs(self._dir_guild(guild_id), exist_ok=True)
+        _gravar_atomico(os.path.join(self._dir_guild(guild_id), f"{manifesto['id']}.json"), _serializar(manifesto))
+        return manifesto, False
+
+    def salvar(self, guild_id, nome, backup):
+        """Atalho para um backup já normalizado ({"cargos": [...], "canais": [...]})"""
+        with self._trava:
+            return self.salvar_manifesto(
+                guild_id, nome,
+                [self.guardar_cargo(cargo) for cargo in backup["cargos"]],
+                [self.guardar_canal(canal) for canal in backup["canais"]]
+            )
+
+    def montar(self, guild_id, snapshot_id):
+        """Reconstrói o backup completo (formato normalizado) a partir do manifesto"""
+        manifesto = self.ler_manifesto(guild_id, snapshot_id)
+        canais = []
+        for entrada in manifesto["canais"]:
+            canal = self.ler_blob(entrada["blob"])
+            canal["mensagens"] = [msg for pagina in entrada["paginas"] for msg in self.ler_blob(pagina)]
+            canais.append(canal)
+        return normalizar_backup({
+            "cargos": [self.ler_blob(entrada["blob"]) for entrada in manifesto["cargos"]],
+            "canais": canais
+        })
+
+    def carregar(self, guild_id, referencia):
+        """Backup normalizado a partir de um id de snapshot, de uma exportação .ndjson.gz
+        ou de um arquivo JSON antigo"""
+        if os.path.isfile(referencia):
+            if referencia.endswith('.ndjson.gz'):
+                return normalizar_backup(montar_exportacao(ler_exportacao(referencia)))
+            with open(referencia, 'r', encoding='utf-8') as f:
+                return normalizar_backup(json.load(f))
+        return self.montar(guild_id, referencia)
+
+    # Exportação em arquivo único
+
+    def exportar(self, guild_id, snapshot_id, caminho):
+        """Grava o snapshot num .ndjson.gz, um registro por linha
+
+        Os blobs são lidos e escritos um de cada vez, então a memória usada
+        não depende do tamanho do histórico de mensagens.
+        """
+        manifesto = self.ler_manifesto(guild_id, snapshot_id)
+        temporario = caminho + '.tmp'
+        with gzip.open(temporario, 'wt', encoding='utf-8') as f:
+            def escrever(registro):
+                f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+
+            escrever({"t": "servidor", "id": manifesto["id"], "guild_id": guild_id,
+                      "nome": manifesto["nome"], "data": manifesto["data"]})
+            for entrada in manifesto["cargos"]:
+                escrever({"t": "cargo", **self.ler_blob(entrada["blob"])})
+            for indice, entrada in enumerate(manifesto["canais"]):
+                escrever({"t": "canal", "i": indice, **self.ler_blob(entrada["blob"])})
+                for pagina in entrada["paginas"]:
+                    escrever({"t": "mensagens", "i": indice, "mensagens": self.ler_blob(pagina)})
+        os.replace(temporario, caminho)
+        return caminho
+
+    def importar(self, guild_id, caminho):
+        """Guarda uma exportação .ndjson.gz no armazém, canal por canal"""
+        cabecalho = None
+        cargos = []
+        entradas = []
+        canal = None
+        for registro in ler_exportacao(caminho):
+            tipo = registro.pop("t")
+            if tipo == "servidor":
+                cabecalho = registro
+            elif tipo == "cargo":
+                cargos.append(self.guardar_cargo(registro))
+            elif tipo == "canal":
+                if canal is not None:
+                    entradas.append(self.guardar_canal(canal))
+                registro.pop("i")
+                canal = {**registro, "mensagens": []}
+            elif tipo == "mensagens" and canal is not None:
+                canal["mensagens"].extend(registro["mensagens"])
+        if canal is not None:
+            entradas.append(self.guardar_canal(canal))
+        nome = cabecalho["nome"] if cabecalho else str(guild_id)
+        return self.salvar_manifesto(guild_id, nome, cargos, entradas)
+
+    def diff(self, antigo, novo):
+        """Compara dois manifestos sem ler blobs: o que entrou, saiu ou mudou"""
+        def comparar(entradas_antigas, entradas_novas, identidade):
+            antes = {identidade(e): e for e in entradas_antigas}
+            depois = {identidade(e): e for e in entradas_novas}
+            return {
+                "novos": sorted(k[0] for k in depois.keys() - antes.keys()),
+                "removidos": sorted(k[0] for k in antes.keys() - depois.keys()),
+                "alterados": sorted(k[0] for k in antes.keys() & depois.keys() if antes[k] != depois[k])
+            }
+
+        return {
+            "cargos": comparar(antigo["cargos"], novo["cargos"], lambda e: (e["nome"],)),
+            "canais": comparar(antigo["canais"], novo["canais"], lambda e: (e["nome"], e["tipo"]))
+        }
+
+    def podar(self, guild_id, manter=20):
+        """Apaga os manifestos mais antigos e os blobs que ninguém mais referencia
+
+        Blobs tocados há menos de `carencia` segundos e arquivos .tmp ficam:
+        podem ser de um backup (de qualquer servidor) ainda sem manifesto.
+        Devolve (manifestos removidos, blobs removidos).
+        """
+        with self._trava:
+            return self._podar(guild_id, manter)
+
+    def _podar(self, guild_id, manter):
+        antigos = self.listar(guild_id)[:-manter] if manter else self.listar(guild_id)
+        if not antigos:
+            return 0, 0
+        for manifesto in antigos:
+            os.remove(os.path.join(self._dir_guild(guild_id), f"{manifesto['id']}.json"))
+
+        referenciados = set()
+        for guild in os.listdir(self.dir_manifestos):
+            for manifesto in self.listar(guild):
+                referenciados.update(e["blob"] for e in manifesto["cargos"])
+                for entrada in manifesto["canais"]:
+                    referenciados.add(entrada["blob"])
+                    referenciados.update(entrada["paginas"])
+
+        limite = time.time() - self.carencia
+        blobs_removidos = 0
+        for prefixo in os.listdir(self.dir_blobs):
+            pasta = os.path.join(self.dir_blobs, prefixo)
+            for hash_blob in os.listdir(pasta):
+                if hash_blob in referenciados or hash_blob.endswith('.tmp'):
+                    continue
+                caminho = os.path.join(pasta, hash_blob)
+                try:
+                    if os.path.getmtime(caminho) >= limite:
+                        continue
+                    os.remove(caminho)
+                except FileNotFoundError:
+                    continue
+                blobs_removidos += 1
+        return len(antigos), blobs_removidos
+
+
+def ler_exportacao(caminho):
+    """Lê uma exportação .ndjson.gz sob demanda, um registro por vez"""
+    with gzip.open(caminho, 'rt', encoding='utf-8') as f:
+        for linha in f:
+            if linha.strip():
+                yield json.loads(linha)
+
+
+def montar_exportacao(registros):
+    """Junta os registros de ler_exportacao no formato {"cargos", "canais"}"""
+    cargos = []
+    canais = []
+    for registro in registros:
+        tipo = registro.pop("t")
+        if tipo == "cargo":
+            cargos.append(registro)
+        elif tipo == "canal":
+            registro.pop("i")
+            registro.setdefault("mensagens", [])
+            canais.append(registro)
+        elif tipo == "mensagens":
+            canais[-1]["mensagens"].extend(registro["mensagens"])
+    return {"cargos": cargos, "canais": canais}
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import itertools
+import time
+from collections import OrderedDict, deque
+
+
+class Tarefa:
+    __slots__ = ('id', 'guild_id', 'nome', 'grupo', 'dono', 'trabalho', 'estado',
+                 'criada', 'iniciada', 'terminada', 'prazo', 'erro')
+
+    def __init__(self, tarefa_id, guild_id, nome, trabalho, grupo=None, dono=None, prazo=None):
+        self.id = tarefa_id
+        self.guild_id = guild_id
+        self.nome = nome
+        self.grupo = grupo
+        self.dono = dono
+        self.trabalho = trabalho
+        self.estado = "na fila"
+        self.criada = time.monotonic()
+        self.iniciada = None
+        self.terminada = None
+        self.prazo = prazo
+        self.erro = None
+
+    def segundos(self):
+        """Tempo na fila (se ainda não começou) ou de execução"""
+        if self.iniciada is None:
+            return time.monotonic() - self.criada
+        return (self.terminada or time.monotonic()) - self.iniciada
+
+
+class FilaTarefas:
+    """Fila de trabalhos lentos com `trabalhadores` fixos e rodízio entre servidores
+
+    Cada servidor tem sua própria fila e os trabalhadores passam por eles em
+    rodízio, então um servidor com muitos pedidos não atrasa os outros. No
+    máximo `por_guild` tarefas de um servidor rodam ao mesmo tempo e tarefas
+    do mesmo `grupo` (ex.: backup e restauração) nunca rodam juntas no mesmo
+    servidor. Tarefas que esperam além do `prazo` são descartadas (o token da
+    interação do Discord vale 15 minutos).
+    """
+
+    def __init__(self, trabalhadores=4, por_guild=2, max_fila_guild=10, prazo=14 * 60, historico=200):
+        self.trabalhadores = trabalhadores
+        self.por_guild = por_guild
+        self.max_fila_guild = max_fila_guild
+        self.prazo = prazo
+        self.historico = historico
+        self._filas = {}
+        self._rodizio = deque()
+        self._rodando = {}
+        self._grupos = set()
+        self._tarefas = OrderedDict()
+        self._ids = itertools.count(1)
+        self._condicao = asyncio.Condition()
+        self._workers = []
+        self.concluidas = 0
+        self.falhas = 0
+        self.expiradas = 0
+
+    def iniciar(self):
+        if not self._workers:
+            self._workers = [asyncio.ensure_future(self._trabalhador()) for _ in range(self.trabalhadores)]
+
+    async def fechar(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def enviar(self, guild_id, nome, trabalho, grupo=None, dono=None):
+        """Põe `trabalho` (função async sem argumentos) na fila do servidor
+
+        Devolve a Tarefa, ou None se a fila do servidor estiver cheia.
+        """
+        fila = self._filas.setdefault(guild_id, deque())
+        if len(fila) >= self.max_fila_guild:
+            return None
+        tarefa = Tarefa(next(self._ids), guild_id, nome, trabalho, grupo, dono,
+                        time.monotonic() + self.prazo if self.prazo else None)
+        fila.append(tarefa)
+        if guild_id not in self._rodizio:
+            self._rodizio.append(guild_id)
+        self._registrar(tarefa)
+        asyncio.ensure_future(self._avisar())
+        return tarefa
+
+    def _registrar(self, tarefa):
+        self._tarefas[tarefa.id] = tarefa
+        while len(self._tarefas) > self.historico:
+            antiga = next(iter(self._tarefas.values()))
+            if antiga.terminada is None:
+                break
+            del self._tarefas[antiga.id]
+
+    async def _avisar(self):
+        async with self._condicao:
+            self._condicao.notify_all()
+
+    def posicao(self, tarefa):
+        """Quantas tarefas estão na frente desta (0 = começa assim que houver trabalhador)"""
+        fila = self._filas.get(tarefa.guild_id, ())
+        indice = next((i for i, outra in enumerate(fila) if outra is tarefa), 0)
+        if self._rodando.get(tarefa.guild_id, 0) >= self.por_guild or (tarefa.guild_id, tarefa.grupo) in self._grupos:
+            indice += 1
+        return indice
+
+    def _proxima(self):
+        """Próxima tarefa pelo rodízio entre servidores, respeitando os limites"""
+        for _ in range(len(self._rodizio)):
+            guild_id = self._rodizio[0]
+            self._rodizio.rotate(-1)
+            if self._rodando.get(guild_id, 0) >= self.por_guild:
+                continue
+            fila = self._filas[guild_id]
+            for tarefa in fila:
+                if tarefa.grupo is None or (guild_id, tarefa.grupo) not in self._grupos:
+                    fila.remove(tarefa)
+                    if not fila:
+                        del self._filas[guild_id]
+                        self._rodizio.remove(guild_id)
+                    return tarefa
+        return None
+
+    async def _trabalhador(self):
+        while True:
+            async with self._condicao:
+                tarefa = self._proxima()
+                while tarefa is None:
+                    await self._condicao.wait()
+                    tarefa = self._proxima()
+                self._rodando[tarefa.guild_id] = self._rodando.get(tarefa.guild_id, 0) + 1
+                if tarefa.grupo is not None:
+                    self._grupos.add((tarefa.guild_id, tarefa.grupo))
+
+            try:
+                await self._executar(tarefa)
+            finally:
+                async with self._condicao:
+                    self._rodando[tarefa.guild_id] -= 1
+                    if not self._rodando[tarefa.guild_id]:
+                        del self._rodando[tarefa.guild_id]
+                    self._grupos.discard((tarefa.guild_id, tarefa.grupo))
+                    self._condicao.notify_all()
+
+    async def _executar(self, tarefa):
+        tarefa.iniciada = time.monotonic()
+        if tarefa.prazo is not None and tarefa.iniciada > tarefa.prazo:
+            tarefa.estado = "expirada"
+            tarefa.terminada = tarefa.iniciada
+            self.expiradas += 1
+            return
+        tarefa.estado = "executando"
+        try:
+            await tarefa.trabalho()
+            tarefa.estado = "concluída"
+            self.concluidas += 1
+        except Exception as e:
+            tarefa.estado = "falhou"
+            tarefa.erro = str(e)
+            self.falhas += 1
+            print(f"Erro na tarefa {tarefa.nome} #{tarefa.id}: {e}")
+        finally:
+            tarefa.terminada = time.monotonic()
+            tarefa.trabalho = None
+
+    def obter(self, tarefa_id):
+        return self._tarefas.get(tarefa_id)
+
+    def listar(self, guild_id, limite=10):
+        """Tarefas recentes do servidor, da mais nova para a mais antiga"""
+        tarefas = [t for t in reversed(self._tarefas.values()) if t.guild_id == guild_id]
+        return tarefas[:limite]
+
+    def estatisticas(self):
+        return {
+            'na_fila': sum(len(fila) for fila in self._filas.values()),
+            'executando': sum(self._rodando.values()),
+            'concluidas': self.concluidas,
+            'falhas': self.falhas,
+            'expiradas': self.expiradas
+        }
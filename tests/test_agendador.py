@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agendador import Agendador
+from banco import BancoAssincrono
+
+
+def _disparar_dois_bots(caminho):
+    disparos = {'bt': [], 'bot7': []}
+
+    async def executar():
+        banco = BancoAssincrono(caminho)
+        agendadores = {}
+        try:
+            for bot in disparos:
+                agendador = Agendador(banco, bot=bot)
+
+                async def tratador(dados, atraso, bot=bot):
+                    disparos[bot].append(dados)
+
+                agendador.registrar('lembrete', tratador)
+                agendadores[bot] = agendador
+            await agendadores['bt'].agendar(0, 'lembrete', 'do bt')
+            await agendadores['bot7'].agendar(0, 'lembrete', 'do bot7')
+            for agendador in agendadores.values():
+                agendador.iniciar()
+            await asyncio.sleep(0.2)
+        finally:
+            for agendador in agendadores.values():
+                await agendador.fechar()
+            banco.fechar()
+
+    asyncio.run(executar())
+    return disparos
+
+
+def test_bots_no_mesmo_banco_so_disparam_os_proprios(tmp_path):
+    disparos = _disparar_dois_bots(str(tmp_path / 'bot_data.db'))
+
+    assert disparos == {'bt': ['do bt'], 'bot7': ['do bot7']}
+
+
+def test_agendamentos_antigos_disparam_uma_vez_so(tmp_path):
+    caminho = str(tmp_path / 'bot_data.db')
+    conn = sqlite3.connect(caminho)
+    conn.execute('CREATE TABLE agendamentos (id INTEGER PRIMARY KEY AUTOINCREMENT, quando REAL NOT NULL, '
+                 'tipo TEXT NOT NULL, dados TEXT)')
+    conn.execute("""INSERT INTO agendamentos (quando, tipo, dados) VALUES (0, 'lembrete', '"antigo"')""")
+    conn.commit()
+    conn.close()
+
+    disparos = _disparar_dois_bots(caminho)
+
+    assert sorted(disparos['bt'] + disparos['bot7']) == ['antigo', 'do bot7', 'do bt']
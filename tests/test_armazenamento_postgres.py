@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import random
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import armazenamento
+from armazenamento import MotorPostgres, RepositorioEconomia
+
+# Banco descartável para os testes de integração (as migrações criam as tabelas nele)
+BANCO_URL_TESTE = os.environ.get('BANCO_URL_TESTE')
+
+
+class _PoolFalso:
+    def __init__(self):
+        self.terminado = False
+
+    def terminate(self):
+        self.terminado = True
+
+
+def test_aberturas_simultaneas_criam_um_pool_e_migram_uma_vez(monkeypatch):
+    pools = []
+    migracoes = []
+
+    async def create_pool(dsn, min_size, max_size):
+        await asyncio.sleep(0.01)
+        pools.append(_PoolFalso())
+        return pools[-1]
+
+    async def migrar(pool):
+        await asyncio.sleep(0.01)
+        migracoes.append(pool)
+        return 1
+
+    monkeypatch.setattr(armazenamento, 'asyncpg', types.SimpleNamespace(create_pool=create_pool))
+    motor = MotorPostgres('postgres://teste', 'villain')
+    monkeypatch.setattr(motor, '_migrar', migrar)
+
+    async def abrir_juntos():
+        return await asyncio.gather(*(motor._conexoes() for _ in range(20)))
+
+    abertos = asyncio.run(abrir_juntos())
+
+    assert len(pools) == 1
+    assert migracoes == pools
+    assert all(pool is pools[0] for pool in abertos)
+    assert motor.versao == 1
+
+
+def test_migracao_que_falha_fecha_o_pool_e_deixa_tentar_de_novo(monkeypatch):
+    pools = []
+    tentativas = []
+
+    async def create_pool(dsn, min_size, max_size):
+        pools.append(_PoolFalso())
+        return pools[-1]
+
+    async def migrar(pool):
+        tentativas.append(pool)
+        if len(tentativas) == 1:
+            raise RuntimeError("banco fora do ar")
+        return 1
+
+    monkeypatch.setattr(armazenamento, 'asyncpg', types.SimpleNamespace(create_pool=create_pool))
+    motor = MotorPostgres('postgres://teste', 'villain')
+    monkeypatch.setattr(motor, '_migrar', migrar)
+
+    async def abrir_duas_vezes():
+        with pytest.raises(RuntimeError):
+            await motor._conexoes()
+        return await motor._conexoes()
+
+    pool = asyncio.run(abrir_duas_vezes())
+
+    assert pools[0].terminado
+    assert pool is pools[1] and not pool.terminado
+
+
+@pytest.mark.skipif(not BANCO_URL_TESTE, reason="defina BANCO_URL_TESTE com um Postgres descartável")
+def test_repositorio_no_postgres():
+    pytest.importorskip('asyncpg')
+
+    async def executar():
+        motor = MotorPostgres(BANCO_URL_TESTE, 'villain')
+        try:
+            await asyncio.gather(*(motor._conexoes() for _ in range(5)))
+            assert motor.versao == armazenamento.ESQUEMAS['villain'][-1][0]
+            economia = RepositorioEconomia(motor)
+            de, para = random.sample(range(10 ** 12, 10 ** 13), 2)
+
+            assert await economia.resgatar_daily(de, 100) == 100
+            assert await economia.resgatar_daily(de, 100) is None
+            assert await economia.transferir(de, para, 30)
+            assert not await economia.transferir(de, para, 1000)
+            assert await economia.apostar(de, 10, 0) == 60
+            assert await economia.apostar(para, 1000, 0) is None
+            assert (await economia.saldo(de))[0] == 60
+            assert (await economia.saldo(para))[0] == 30
+        finally:
+            motor.fechar()
+
+    asyncio.run(executar())
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+discord = pytest.importorskip('discord')
+pytest.importorskip('requests')
+
+from limitador import LimitadorTaxa
+
+LATENCIA = 0.005
+
+
+class _Historico:
+    """Conta quantas buscas de histórico estão em andamento ao mesmo tempo"""
+
+    def __init__(self):
+        self.ativas = 0
+        self.maximo = 0
+
+
+class _CanalTexto(discord.TextChannel):
+    type = discord.ChannelType.text
+    category = None
+    overwrites = {}
+
+    def __init__(self, nome, posicao, historico, mensagens=3, falhar=False):
+        self.name = nome
+        self.position = posicao
+        self.topic = f"tópico de {nome}"
+        self._historico = historico
+        self._mensagens = mensagens
+        self._falhar = falhar
+
+    async def history(self, limit):
+        self._historico.ativas += 1
+        self._historico.maximo = max(self._historico.maximo, self._historico.ativas)
+        try:
+            await asyncio.sleep(LATENCIA)
+            if self._falhar:
+                raise RuntimeError("403 Forbidden")
+            for i in range(min(limit, self._mensagens)):
+                mensagem = type('Mensagem', (), {})()
+                mensagem.author = "membro#0001"
+                mensagem.content = f"{self.name} {i}"
+                mensagem.created_at = "2024-01-01 00:00:00"
+                yield mensagem
+        finally:
+            self._historico.ativas -= 1
+
+
+class _CanalVoz:
+    def __init__(self, nome, posicao):
+        self.name = nome
+        self.type = discord.ChannelType.voice
+        self.position = posicao
+        self.category = None
+        self.overwrites = {}
+
+
+class _Servidor:
+    def __init__(self, canais_texto, historico):
+        self.id = 42
+        self.name = "servidor falso"
+        cargo = type('Cargo', (), {})()
+        cargo.name = "mod"
+        cargo.color = type('Cor', (), {'value': 0xff0000})()
+        cargo.permissions = type('Permissoes', (), {'value': 8})()
+        cargo.position = 1
+        self.roles = [cargo]
+        self.channels = [_CanalTexto(f"texto-{i}", i, historico, falhar=(i == 7)) for i in range(canais_texto)]
+        self.channels += [_CanalVoz(f"voz-{i}", canais_texto + i) for i in range(10)]
+
+
+@pytest.fixture
+def cong(tmp_path, monkeypatch):
+    # cong.py cria o bot (e o imperio.db) ao ser importado
+    for chave in ('DISCORD_TOKEN', 'GROK_API_KEY', 'DEEPSEEK_API_KEY'):
+        monkeypatch.setenv(chave, 'teste')
+    monkeypatch.chdir(tmp_path)
+    import cong
+    return cong
+
+
+def test_backup_captura_milhares_de_canais_em_paralelo(cong):
+    historico = _Historico()
+    guild = _Servidor(2000, historico)
+    sistema = cong.SistemaBackup()
+    sistema.limitador = LimitadorTaxa(taxa=1_000_000)
+    chamadas = []
+
+    async def progresso(feitos, total):
+        chamadas.append((feitos, total))
+
+    snapshot_id, relatorio = asyncio.run(sistema.criar_backup(guild, progresso, concorrencia=50))
+
+    # Sequencial seriam 2000 * 5 ms = 10 s
+    assert 1 < historico.maximo <= 50
+    assert relatorio["canais"] == 2010
+    assert relatorio["falhas"] == 1
+    assert relatorio["mensagens"] == 1999 * 3
+    assert relatorio["segundos"] < 5
+    assert chamadas == [(feitos, 2010) for feitos in range(1, 2011)]
+
+    backup = sistema.carregar(guild.id, snapshot_id)
+    canais = {canal["nome"]: canal for canal in backup["canais"]}
+    assert len(canais) == 2010
+    assert [m["conteudo"] for m in canais["texto-1999"]["mensagens"]] == ["texto-1999 0", "texto-1999 1", "texto-1999 2"]
+    assert canais["texto-7"]["mensagens"] == []
+    assert canais["voz-3"]["tipo"] == "voice"
+    assert [cargo["nome"] for cargo in backup["cargos"]] == ["mod"]
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import CacheRespostas, normalizar_pergunta
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ("Oiiii!!", "oi"),
+    ("  Tudo   BEM??? ", "tudo bem"),
+    ("Olá, <@123> você está aí?", "ola voce esta ai"),
+    ("2+2", "2 + 2"),
+    ("quanto é 1.5 x 2?", "quanto e 1.5 x 2"),
+])
+def test_normalizar_pergunta(texto, esperado):
+    assert normalizar_pergunta(texto) == esperado
+
+
+@pytest.mark.parametrize('perguntas', [
+    ("2+2", "2-2", "2*2", "2/2", "2^2", "2=2"),
+    ("1000", "10", "100"),
+    ("1.5", "15", "1,5"),
+    ("(2+3)*4", "2+3*4"),
+])
+def test_perguntas_de_sentido_diferente_tem_chaves_diferentes(perguntas):
+    cache = CacheRespostas()
+    chaves = {cache.chave([{"role": "user", "content": pergunta}]) for pergunta in perguntas}
+    assert len(chaves) == len(perguntas)
+
+
+def test_variacoes_de_escrita_tem_a_mesma_chave():
+    cache = CacheRespostas()
+    chaves = {cache.chave([{"role": "user", "content": pergunta}])
+              for pergunta in ("Quanto é 2+2?", "quanto e 2 + 2", "QUANTO É 2+2!!!")}
+    assert len(chaves) == 1
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import datetime
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from armazenamento import MotorSQLite, RepositorioEconomia
+from extrato import Extrato
+
+USUARIOS = 20
+OPERACOES = 2000
+
+
+def _repositorio(caminho):
+    motor = MotorSQLite(caminho, 'villain')
+    return motor, RepositorioEconomia(motor, Extrato('economy', 'wallet', ('user_id',)))
+
+
+def test_moedas_se_conservam_com_transferencias_apostas_e_dailies_em_paralelo(tmp_path):
+    caminho = str(tmp_path / 'villain_bot.db')
+    # Dois motores no mesmo arquivo: duas conexões, como dois processos
+    repositorios = [_repositorio(caminho), _repositorio(caminho)]
+    sorteio = random.Random(22)
+    esperado = {'criadas': 0}
+
+    async def daily(economia, user_id):
+        ganho = await economia.resgatar_daily(user_id, 100, intervalo=datetime.timedelta(0))
+        if ganho is not None:
+            esperado['criadas'] += ganho
+
+    async def apostar(economia, user_id, aposta, premio):
+        if await economia.apostar(user_id, aposta, premio) is not None:
+            esperado['criadas'] += premio - aposta
+
+    async def executar():
+        await asyncio.gather(*(daily(repositorios[0][1], user_id) for user_id in range(USUARIOS)))
+        operacoes = []
+        for i in range(OPERACOES):
+            economia = repositorios[i % 2][1]
+            de, para = sorteio.sample(range(USUARIOS), 2)
+            escolha = sorteio.random()
+            if escolha < 0.6:
+                operacoes.append(economia.transferir(de, para, sorteio.randint(1, 80)))
+            elif escolha < 0.9:
+                operacoes.append(apostar(economia, de, 20, sorteio.choice([0, 0, 50])))
+            else:
+                operacoes.append(daily(economia, de))
+        resultados = await asyncio.gather(*operacoes, return_exceptions=True)
+        assert not [r for r in resultados if isinstance(r, Exception)]
+
+        economia = repositorios[0][1]
+        saldos = [(await economia.saldo(user_id))[0] for user_id in range(USUARIOS)]
+        assert min(saldos) >= 0
+        assert sum(saldos) == esperado['criadas']
+        for user_id in range(USUARIOS):
+            atual, recalculado, _, _ = await economia.consultar_extrato(user_id)
+            assert atual == recalculado
+
+    try:
+        asyncio.run(executar())
+    finally:
+        for motor, _ in repositorios:
+            motor.fechar()
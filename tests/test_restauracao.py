@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+pytest.importorskip('discord')
+
+from restauracao import RestauradorServidor, normalizar_backup
+
+
+class _Cargo:
+    def __init__(self, nome, posicao, padrao=False):
+        self.id = posicao
+        self.name = nome
+        self.position = posicao
+        self.managed = False
+        self.color = type('Cor', (), {'value': 0})()
+        self.permissions = type('Permissoes', (), {'value': 0})()
+        self._padrao = padrao
+
+    def is_default(self):
+        return self._padrao
+
+    def __ge__(self, outro):
+        return self.position >= outro.position
+
+    def __lt__(self, outro):
+        return self.position < outro.position
+
+
+class _Canal:
+    def __init__(self, nome, tipo, posicao, categoria=None, topico=None):
+        self.id = posicao
+        self.name = nome
+        self.type = tipo
+        self.position = posicao
+        self.category = categoria
+        self.topic = topico
+        self.overwrites = {}
+
+
+class _Servidor:
+    def __init__(self):
+        bot = _Cargo("bot", 10)
+        self.me = type('Membro', (), {'top_role': bot})()
+        self.roles = [_Cargo("@everyone", 0, padrao=True), _Cargo("mod", 1), bot]
+        chat = _Canal("chat", "category", 0)
+        voz = _Canal("voz", "category", 1)
+        self.channels = [
+            chat, voz,
+            _Canal("regras", "text", 2, topico="leia"),
+            _Canal("geral", "text", 3, chat),
+            _Canal("memes", "text", 4, chat),
+            _Canal("sala", "voice", 5, voz),
+        ]
+
+
+def _backup_bot7(guild, com_categoria=True):
+    """O mesmo dicionário que o !backup do bot7.py monta"""
+    canais = []
+    for channel in guild.channels:
+        dados = {'name': channel.name, 'type': str(channel.type), 'position': channel.position}
+        if com_categoria:
+            dados['category'] = channel.category.name if channel.category else None
+        if channel.type == "text":
+            dados['topic'] = channel.topic
+        canais.append(dados)
+    return {
+        'name': 'servidor',
+        'roles': [{'name': r.name, 'color': 0, 'permissions': 0} for r in guild.roles if r.name != "@everyone"],
+        'channels': canais,
+    }
+
+
+@pytest.mark.parametrize('com_categoria', [True, False])
+def test_restaurar_servidor_inalterado_nao_planeja_nada(com_categoria):
+    guild = _Servidor()
+    backup = normalizar_backup(_backup_bot7(guild, com_categoria))
+
+    plano = RestauradorServidor().planejar(guild, backup)
+
+    assert plano["operacoes"] == []
+
+
+def test_canal_fora_da_categoria_continua_sendo_recriado():
+    guild = _Servidor()
+    backup = normalizar_backup(_backup_bot7(guild))
+    for canal in backup["canais"]:
+        if canal["nome"] == "memes":
+            canal["categoria"] = "voz"
+
+    plano = RestauradorServidor().planejar(guild, backup)
+
+    assert sorted((op["acao"], op["nome"]) for op in plano["operacoes"]) == [("apagar", "memes"), ("criar", "memes")]
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snapshots import ArmazemSnapshots
+
+
+def _canal(nome, texto):
+    return {"nome": nome, "tipo": "text", "topico": texto, "mensagens": [{"autor": "a", "conteudo": texto}]}
+
+
+def _blobs(manifesto):
+    hashes = [e["blob"] for e in manifesto["cargos"]]
+    for entrada in manifesto["canais"]:
+        hashes.append(entrada["blob"])
+        hashes.extend(entrada["paginas"])
+    return hashes
+
+
+def _envelhecer(armazem, hash_blob, segundos=7200):
+    caminho = armazem._caminho_blob(hash_blob)
+    antigo = time.time() - segundos
+    os.utime(caminho, (antigo, antigo))
+
+
+def test_poda_de_outro_servidor_nao_apaga_blobs_de_backup_em_andamento(tmp_path):
+    armazem = ArmazemSnapshots(str(tmp_path))
+    # Conteúdo que ninguém referencia mais, mas que o servidor A vai reaproveitar
+    reaproveitado = armazem.guardar_blob({"nome": "mod", "cor": 1, "permissoes": 8})
+    _envelhecer(armazem, reaproveitado)
+    orfao = armazem.guardar_blob({"nome": "sem dono"})
+    _envelhecer(armazem, orfao)
+
+    # A grava os blobs (como criar_backup faz entre awaits) ...
+    cargos = [armazem.guardar_cargo({"nome": "mod", "cor": 1, "permissoes": 8})]
+    canais = [armazem.guardar_canal(_canal("geral", "a1"))]
+    # ... enquanto B faz backups e poda
+    for rodada in range(3):
+        armazem.salvar("B", "b", {"cargos": [], "canais": [_canal("b", f"b{rodada}")]})
+        armazem.podar("B", manter=1)
+    manifesto, _ = armazem.salvar_manifesto("A", "a", cargos, canais)
+
+    for hash_blob in _blobs(manifesto):
+        armazem.ler_blob(hash_blob)
+    assert not os.path.exists(armazem._caminho_blob(orfao))
+
+
+def test_poda_preserva_arquivos_tmp(tmp_path):
+    armazem = ArmazemSnapshots(str(tmp_path))
+    hash_blob = armazem.guardar_blob({"x": 1})
+    temporario = armazem._caminho_blob(hash_blob) + '.tmp'
+    with open(temporario, 'wb') as f:
+        f.write(b'em escrita')
+    antigo = time.time() - 7200
+    os.utime(temporario, (antigo, antigo))
+    armazem.salvar("B", "b", {"cargos": [], "canais": []})
+    armazem.salvar("B", "b", {"cargos": [], "canais": [_canal("b", "b")]})
+
+    armazem.podar("B", manter=1)
+
+    assert os.path.exists(temporario)
+
+
+def test_backups_e_podas_em_threads(tmp_path):
+    armazem = ArmazemSnapshots(str(tmp_path), carencia=0)
+    erros = []
+
+    def servidor(guild_id):
+        try:
+            for rodada in range(30):
+                armazem.salvar(guild_id, guild_id, {
+                    "cargos": [{"nome": "comum", "cor": 0, "permissoes": 0}],
+                    "canais": [_canal("geral", f"{guild_id}{rodada}"), _canal("fixo", "igual")]
+                })
+                armazem.podar(guild_id, manter=2)
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=servidor, args=(guild_id,)) for guild_id in ("A", "B")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not erros
+    for guild_id in ("A", "B"):
+        manifestos = armazem.listar(guild_id)
+        assert len(manifestos) == 2
+        for manifesto in manifestos:
+            for hash_blob in _blobs(manifesto):
+                armazem.ler_blob(hash_blob)